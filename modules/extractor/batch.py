@@ -0,0 +1,461 @@
+"""
+Non-interactive extraction of many videos with a pool of processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from os import makedirs, path
+
+from time import perf_counter
+
+from typing import Callable, List, Optional
+
+from modules.extractor.cache import ResultCache
+
+from modules.extractor.extractor import FrameExtractor
+
+from modules.extractor.output import OutputOptions
+
+from modules.extractor.schedule import FrameSchedule
+
+from modules.extractor.selection import DuplicateFilter, SceneDetector
+
+from modules.extractor.transform import FrameTransform
+
+from modules.utils.utils import table_lines
+
+
+class BatchResult:
+    """
+    Result of the extraction of one video in batch mode.
+
+    ---
+    Attributes
+    ---
+
+        video_file (str)
+    The path of the input video file.
+
+        output_dir (str)
+    The path of the output folder.
+
+        frames (int)
+    Number of images written.
+
+        bytes (int)
+    Total size, in bytes, of the images written.
+
+        seconds (float)
+    Time spent extracting the video.
+
+        error (Optional[str])
+    The error message, if the extraction failed.
+
+        metrics (Optional[dict])
+    The per-stage metrics of the extraction, if it didn't fail. See
+    `modules.extractor.metrics.extraction_metrics()`.
+    """
+
+    def __init__(self, video_file: str, output_dir: str) -> None:
+        self.video_file = video_file
+        self.output_dir = output_dir
+        self.frames = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.error = None
+        self.metrics = None
+
+    @property
+    def throughput(self) -> float:
+        """
+        Number of images written per second.
+        """
+
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+
+def output_dir_for(video_file: str,
+                   output_root: Optional[str],
+                   input_root: Optional[str] = None) -> str:
+    """
+    Return the output folder of a video in batch mode.
+
+    ---
+    Arguments
+    ---
+
+        video_file (str)
+    The path of the input video file.
+
+        output_root (Optional[str])
+    The folder shared by all videos. If empty, the images are saved next to
+    each video.
+
+        input_root (Optional[str], None)
+    The folder of the input videos whose subfolders are kept under the
+    output root, e.g., the common folder of all of them. By default, the
+    folder of the video.
+
+    ---
+    Returns
+    ---
+
+        str
+    The folder named after the video, with the suffix `_images`.
+    """
+
+    output_dir = path.splitext(path.abspath(video_file))[0] + '_images'
+
+    if output_root:
+        output_dir = path.join(
+            output_root,
+            path.relpath(output_dir, input_root
+                         or path.dirname(output_dir)))
+
+    return path.abspath(output_dir)
+
+
+def output_dirs(video_files: List[str],
+                output_root: Optional[str]) -> List[str]:
+    """
+    Return the output folders of the videos of a batch, keeping the
+    subfolders of the videos under their common folder.
+
+    ---
+    Arguments
+    ---
+
+        video_files (List[str])
+    The paths of the input video files.
+
+        output_root (Optional[str])
+    The folder shared by all videos. If empty, the images are saved next to
+    each video.
+
+    ---
+    Returns
+    ---
+
+        List[str]
+    The output folder of each video.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If two videos would be extracted to the same folder, e.g., with the same
+    name and another extension.
+    """
+
+    input_root = path.commonpath([
+        path.dirname(path.abspath(video_file)) for video_file in video_files
+    ]) if video_files else None
+
+    folders = [
+        output_dir_for(video_file, output_root, input_root)
+        for video_file in video_files
+    ]
+
+    videos = {}
+
+    # The images and the manifest of one would replace the other ones.
+    for video_file, output_dir in zip(video_files, folders):
+        if videos.setdefault(output_dir, video_file) != video_file:
+            raise ValueError('{} and {} would be extracted to {}'.format(
+                videos[output_dir], video_file, output_dir))
+
+    return folders
+
+
+def extract_file(video_file: str,
+                 output_dir: str,
+                 extraction_rate: int,
+                 offset: int = 0,
+                 read_mode: str = 'auto',
+                 options: OutputOptions = None,
+                 transform: Optional[FrameTransform] = None,
+                 scene_detector: Optional[SceneDetector] = None,
+                 duplicate_filter: Optional[DuplicateFilter] = None,
+                 schedule: Optional[FrameSchedule] = None,
+                 resume: bool = False,
+                 cache: Optional[ResultCache] = None,
+                 index_mode: str = 'use',
+                 decoder: str = 'opencv',
+                 decoder_threads: int = 0) -> BatchResult:
+    """
+    Extract the selected frames of one video, without raising any error.
+
+    ---
+    Arguments
+    ---
+
+        video_file (str)
+    The path of the input video file.
+
+        output_dir (str)
+    The path of the output folder. See `output_dirs()`.
+
+        extraction_rate (int)
+    The frame interval between one extracted frame and another.
+
+        offset (int, 0)
+    The index of the first frame to be extracted.
+
+        read_mode (str, 'auto')
+    How to reach the selected frames: `'auto'`, `'sequential'` or `'seek'`.
+
+        options (OutputOptions, None)
+    How to encode and store the images. By default, as JPEG files.
+
+        transform (Optional[FrameTransform], None)
+    The crop, resize and color conversion of the frames, if any.
+
+        scene_detector (Optional[SceneDetector], None)
+    The detector of the frames that start a new scene, if any.
+
+        duplicate_filter (Optional[DuplicateFilter], None)
+    The filter of the frames that look like an extracted one, if any.
+
+        schedule (Optional[FrameSchedule], None)
+    The frame indices or times to extract, if any, instead of the ones selected
+    by the extraction rate and the offset.
+
+        resume (bool, False)
+    Set whether to keep the images written by a previous extraction.
+
+        cache (Optional[ResultCache], None)
+    The cache of the images of previous extractions, if any.
+
+        index_mode (str, 'use')
+    Whether to `'use'` the frame index of the video, if any, to `'build'` it
+    if missing, or to `'ignore'` it.
+
+        decoder (str, 'opencv')
+    The backend decoding the frames: `'opencv'`, or `'ffmpeg'`.
+
+        decoder_threads (int, 0)
+    Number of threads of the `ffmpeg` decoder. If 0, chosen by ffmpeg.
+
+    ---
+    Returns
+    ---
+
+        BatchResult
+    The result of the extraction.
+    """
+
+    result = BatchResult(video_file, path.abspath(output_dir))
+
+    start_time = perf_counter()
+
+    try:
+        with FrameExtractor(video_file,
+                            extraction_rate,
+                            offset,
+                            read_mode=read_mode,
+                            transform=transform,
+                            scene_detector=scene_detector,
+                            duplicate_filter=duplicate_filter,
+                            schedule=schedule,
+                            use_index=index_mode != 'ignore',
+                            decoder=decoder,
+                            decoder_threads=decoder_threads) as extractor:
+
+            # Index the video, unless indexed by a previous run.
+            if index_mode == 'build' and extractor.index is None:
+                extractor.build_index()
+
+            extractor.validate()
+
+            makedirs(result.output_dir, exist_ok=True)
+
+            result.frames, result.bytes = extractor.extract(
+                result.output_dir, options, resume=resume, cache=cache)
+
+            result.metrics = extractor.metrics()
+
+    except Exception as e:
+        result.error = str(e) or type(e).__name__
+
+    result.seconds = perf_counter() - start_time
+
+    return result
+
+
+def run_batch(video_files: List[str],
+              output_root: Optional[str],
+              extraction_rate: int,
+              offset: int = 0,
+              jobs: int = 1,
+              read_mode: str = 'auto',
+              options: OutputOptions = None,
+              transform: Optional[FrameTransform] = None,
+              scene_detector: Optional[SceneDetector] = None,
+              duplicate_filter: Optional[DuplicateFilter] = None,
+              schedule: Optional[FrameSchedule] = None,
+              resume: bool = False,
+              cache: Optional[ResultCache] = None,
+              index_mode: str = 'use',
+              decoder: str = 'opencv',
+              decoder_threads: int = 0,
+              on_done: Callable[[BatchResult], None] = None
+              ) -> List[BatchResult]:
+    """
+    Extract the selected frames of many videos with a pool of processes.
+
+    The largest files are submitted first, so the small ones fill the idle
+    processes at the end and all of them finish at about the same time.
+
+    ---
+    Arguments
+    ---
+
+        video_files (List[str])
+    The paths of the input video files.
+
+        output_root (Optional[str])
+    The folder shared by all videos, with the subfolders of the videos under
+    their common folder, or empty to save the images next to them.
+
+        extraction_rate (int)
+    The frame interval between one extracted frame and another.
+
+        offset (int, 0)
+    The index of the first frame to be extracted from each video.
+
+        jobs (int, 1)
+    The number of processes.
+
+        read_mode (str, 'auto')
+    How to reach the selected frames of each video: `'auto'`, `'sequential'`
+    or `'seek'`.
+
+        options (OutputOptions, None)
+    How to encode and store the images. By default, as JPEG files.
+
+        transform (Optional[FrameTransform], None)
+    The crop, resize and color conversion of the frames, if any.
+
+        scene_detector (Optional[SceneDetector], None)
+    The detector of the frames that start a new scene, if any.
+
+        duplicate_filter (Optional[DuplicateFilter], None)
+    The filter of the frames that look like an extracted one, if any.
+
+        schedule (Optional[FrameSchedule], None)
+    The frame indices or times to extract from each video, if any.
+
+        resume (bool, False)
+    Set whether to keep the images written by a previous extraction of each
+    video, so the videos already extracted are only checked.
+
+        cache (Optional[ResultCache], None)
+    The cache of the images of previous extractions, shared by the processes,
+    if any.
+
+        index_mode (str, 'use')
+    Whether to `'use'` the frame index of each video, if any, to `'build'` it
+    if missing, or to `'ignore'` it.
+
+        decoder (str, 'opencv')
+    The backend decoding the frames of each video: `'opencv'`, or `'ffmpeg'`.
+
+        decoder_threads (int, 0)
+    Number of threads of each `ffmpeg` decoder. If 0, chosen by ffmpeg.
+
+        on_done (Callable[[BatchResult], None], None)
+    Called in the main process as soon as each video is extracted.
+
+    ---
+    Returns
+    ---
+
+        List[BatchResult]
+    The results, in the order of `video_files`.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If two videos would be extracted to the same folder, before extracting
+    any of them.
+    """
+
+    folders = dict(zip(video_files, output_dirs(video_files, output_root)))
+
+    # Largest files first. The missing ones fail right away, at the end.
+    ordered = sorted(
+        video_files,
+        key=lambda file: path.getsize(file) if path.isfile(file) else -1,
+        reverse=True)
+
+    results = {}
+
+    with ProcessPoolExecutor(max(1, int(jobs))) as executor:
+        futures = [
+            executor.submit(extract_file, video_file, folders[video_file],
+                            extraction_rate, offset, read_mode, options,
+                            transform, scene_detector, duplicate_filter,
+                            schedule, resume, cache, index_mode, decoder,
+                            decoder_threads)
+            for video_file in ordered
+        ]
+
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                results[result.video_file] = result
+
+                if on_done is not None:
+                    on_done(result)
+
+        # Don't start the pending videos.
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+
+            raise
+
+    return [results[video_file] for video_file in video_files]
+
+
+def summary_table(results: List[BatchResult]) -> List[str]:
+    """
+    Format the results of a batch as the lines of a table.
+
+    ---
+    Arguments
+    ---
+
+        results (List[BatchResult])
+    The results of the extractions.
+
+    ---
+    Returns
+    ---
+
+        List[str]
+    The header, one line per video and a line with the totals.
+    """
+
+    rows = [('File', 'Frames', 'Bytes', 'Seconds', 'Frames/s', 'Status')]
+
+    for result in results:
+        rows.append((path.basename(result.video_file), str(result.frames),
+                     str(result.bytes), '{:.3f}'.format(result.seconds),
+                     '{:.1f}'.format(result.throughput), result.error
+                     or 'OK'))
+
+    failed = sum(result.error is not None for result in results)
+
+    rows.append(
+        ('Total', str(sum(result.frames for result in results)),
+         str(sum(result.bytes for result in results)),
+         '{:.3f}'.format(sum(result.seconds for result in results)), '',
+         '{} failed'.format(failed) if failed else 'OK'))
+
+    # Align the file names and the status to the left, the numbers to the
+    # right.
+    return table_lines(rows, (0, -1))
@@ -0,0 +1,440 @@
+"""
+Throughput benchmark of the extraction on synthetic videos.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from os import cpu_count, makedirs, path
+
+from platform import platform, python_version
+
+from shutil import rmtree
+
+from tempfile import mkdtemp
+
+from time import perf_counter
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+
+import numpy as np
+
+from modules.extractor.extractor import FrameExtractor
+
+from modules.extractor.output import OutputOptions
+
+# Synthetic videos of the full suite: width, height, number of frames, FOURCC
+# and container extension.
+BENCHMARK_VIDEOS = ((320, 240, 500, 'MJPG', 'avi'),
+                    (1280, 720, 300, 'MJPG', 'avi'),
+                    (1280, 720, 300, 'mp4v', 'mp4'),
+                    (1920, 1080, 150, 'XVID', 'avi'))
+
+# Extraction rates of the full suite.
+BENCHMARK_RATES = (1, 10)
+
+# Offsets of the full suite, as fractions of the number of frames.
+BENCHMARK_OFFSETS = (0.0, 0.5)
+
+# Output settings of the full suite: image format and output mode.
+BENCHMARK_OUTPUTS = (('jpg', 'files'), ('png', 'files'), ('npy', 'files'),
+                     ('jpg', 'tar'))
+
+# Smaller suite, for a quick check.
+QUICK_VIDEOS = ((320, 240, 200, 'MJPG', 'avi'), )
+QUICK_RATES = (1, 10)
+QUICK_OFFSETS = (0.0, )
+QUICK_OUTPUTS = (('jpg', 'files'), ('npy', 'files'))
+
+# Fraction by which a speed may drop before being flagged as a slowdown.
+DEFAULT_TOLERANCE = 0.1
+
+# Measures compared against a baseline, all of them the higher the better.
+COMPARED_MEASURES = ('decoded_fps', 'written_fps')
+
+
+def video_name(width: int, height: int, frames: int, fourcc: str) -> str:
+    """
+    Return the filename, without extension, of a synthetic video.
+    """
+
+    return '{}x{}_{}_{}'.format(width, height, frames, fourcc.lower())
+
+
+def make_video(output_dir: str,
+               width: int,
+               height: int,
+               frames: int,
+               fourcc: str,
+               extension: str,
+               fps: float = 25.0) -> Optional[str]:
+    """
+    Write a synthetic video, if not written yet.
+
+    The frames have a moving gradient, a moving square and some fixed noise,
+    so they are neither trivial to encode nor random. The same arguments
+    always give the same video.
+
+    ---
+    Arguments
+    ---
+
+        output_dir (str)
+    The path of the folder of the videos.
+
+        width (int)
+    The frames width.
+
+        height (int)
+    The frames height.
+
+        frames (int)
+    The number of frames.
+
+        fourcc (str)
+    The four characters code of the codec.
+
+        extension (str)
+    The container extension, without the leading dot.
+
+        fps (float, 25.0)
+    The frame rate.
+
+    ---
+    Returns
+    ---
+
+        Optional[str]
+    The path of the video, or None if the codec is not available.
+    """
+
+    video_file = path.join(
+        output_dir, '{}.{}'.format(video_name(width, height, frames, fourcc),
+                                   extension))
+
+    if path.isfile(video_file):
+        return video_file
+
+    makedirs(output_dir, exist_ok=True)
+
+    writer = cv2.VideoWriter(video_file, cv2.VideoWriter_fourcc(*fourcc), fps,
+                             (width, height))
+
+    try:
+        if not writer.isOpened():
+            return None
+
+        noise = np.random.RandomState(0).randint(0, 32, (height, width, 3),
+                                                 dtype=np.uint8)
+
+        columns = np.arange(width, dtype=np.uint16)
+        frame = np.empty((height, width, 3), np.uint8)
+
+        size = max(min(width, height) // 4, 1)
+
+        for i in range(frames):
+            frame[:] = ((columns + i * 4) % 256).astype(np.uint8)[None, :,
+                                                                   None]
+            frame += noise
+
+            # A square crossing the frame.
+            left = (i * 8) % max(width - size, 1)
+            top = (i * 4) % max(height - size, 1)
+            frame[top:top + size, left:left + size] = (i * 16 % 256, 64, 192)
+
+            writer.write(frame)
+
+    finally:
+        writer.release()
+
+    # Some builds open a writer for a codec they can't encode.
+    if not path.isfile(video_file) or path.getsize(video_file) == 0:
+        return None
+
+    return video_file
+
+
+def make_videos(output_dir: str,
+                videos: Tuple[Tuple[int, int, int, str, str],
+                              ...] = BENCHMARK_VIDEOS) -> List[str]:
+    """
+    Write the synthetic videos of a suite, skipping the codecs not available.
+
+    ---
+    Arguments
+    ---
+
+        output_dir (str)
+    The path of the folder of the videos.
+
+        videos (Tuple[Tuple[int, int, int, str, str], ...], BENCHMARK_VIDEOS)
+    The width, the height, the number of frames, the FOURCC and the container
+    extension of each video.
+
+    ---
+    Returns
+    ---
+
+        List[str]
+    The paths of the videos written.
+    """
+
+    video_files = [make_video(output_dir, *video) for video in videos]
+
+    return [video_file for video_file in video_files if video_file is not None]
+
+
+def benchmark_cases(
+        videos: List[str],
+        rates: Tuple[int, ...] = BENCHMARK_RATES,
+        offsets: Tuple[float, ...] = BENCHMARK_OFFSETS,
+        outputs: Tuple[Tuple[str, str], ...] = BENCHMARK_OUTPUTS
+) -> List[dict]:
+    """
+    Return every combination of video, extraction rate, offset and output.
+
+    ---
+    Arguments
+    ---
+
+        videos (List[str])
+    The paths of the videos.
+
+        rates (Tuple[int, ...], BENCHMARK_RATES)
+    The extraction rates.
+
+        offsets (Tuple[float, ...], BENCHMARK_OFFSETS)
+    The offsets, as fractions of the number of frames.
+
+        outputs (Tuple[Tuple[str, str], ...], BENCHMARK_OUTPUTS)
+    The image formats and output modes.
+
+    ---
+    Returns
+    ---
+
+        List[dict]
+    The cases, each one with its `id`, `video`, `extraction_rate`,
+    `offset_fraction`, `format` and `mode`.
+    """
+
+    return [{
+        'id':
+        '{}/r{}/o{:g}/{}/{}'.format(
+            path.splitext(path.basename(video))[0], rate, offset,
+            image_format, mode),
+        'video':
+        video,
+        'extraction_rate':
+        rate,
+        'offset_fraction':
+        offset,
+        'format':
+        image_format,
+        'mode':
+        mode
+    } for video in videos for rate in rates for offset in offsets
+            for image_format, mode in outputs]
+
+
+def peak_rss() -> Optional[float]:
+    """
+    Return the peak resident memory of the current process, in MB, if the
+    system reports it.
+    """
+
+    try:
+        from resource import RUSAGE_SELF, getrusage
+
+    # Not available on Windows.
+    except ImportError:
+        return None
+
+    # Reported in kilobytes on Linux and in bytes on macOS.
+    peak = getrusage(RUSAGE_SELF).ru_maxrss
+
+    return peak / (1024 * 1024 if platform().startswith('macOS') else 1024)
+
+
+def run_case(case: dict, work_dir: str) -> dict:
+    """
+    Extract a video as defined by a case and measure it.
+
+    It should run in a new process, so the peak memory is its own.
+
+    ---
+    Arguments
+    ---
+
+        case (dict)
+    The case. See `benchmark_cases()`.
+
+        work_dir (str)
+    The path of the folder where to write the images, removed afterwards.
+
+    ---
+    Returns
+    ---
+
+        dict
+    The case, with the `seconds` of the extraction, the `decoded` frames,
+    including the ones only grabbed, the `written` frames, the `bytes`
+    written, the `decoded_fps`, the `written_fps`, the `peak_rss_mb` and the
+    time spent in each of the `stages`.
+    """
+
+    output_dir = mkdtemp(dir=work_dir)
+
+    try:
+        with FrameExtractor(case['video'], case['extraction_rate']) as (
+                extractor):
+            extractor.offset = int(extractor.frames * case['offset_fraction'])
+
+            options = OutputOptions(mode=case['mode'],
+                                    image_format=case['format'])
+
+            start_time = perf_counter()
+
+            written, size = extractor.extract(output_dir, options)
+
+            seconds = perf_counter() - start_time
+
+            # The frames only grabbed are decoded too, just not converted to
+            # an image, so a sparse selection doesn't look like a slow decoder.
+            decoded = extractor.counters.decoded + extractor.counters.skipped
+
+            stages = extractor.metrics()['stages']
+
+    finally:
+        rmtree(output_dir, ignore_errors=True)
+
+    return dict(case,
+                seconds=seconds,
+                decoded=decoded,
+                written=written,
+                bytes=size,
+                decoded_fps=decoded / seconds if seconds > 0 else 0.0,
+                written_fps=written / seconds if seconds > 0 else 0.0,
+                peak_rss_mb=peak_rss(),
+                stages=stages)
+
+
+def run_benchmark(cases: List[dict],
+                  work_dir: str,
+                  repeat: int = 1,
+                  on_result: Callable[[dict], None] = None) -> dict:
+    """
+    Run the cases one at a time, each one in a new process, keeping the
+    fastest of some repetitions.
+
+    ---
+    Arguments
+    ---
+
+        cases (List[dict])
+    The cases. See `benchmark_cases()`.
+
+        work_dir (str)
+    The path of the folder where to write the images.
+
+        repeat (int, 1)
+    The number of runs of each case.
+
+        on_result (Callable[[dict], None], None)
+    Called with the result of each case.
+
+    ---
+    Returns
+    ---
+
+        dict
+    The `environment` and the `results`, ready to be saved as JSON.
+    """
+
+    makedirs(work_dir, exist_ok=True)
+
+    results = []
+
+    for case in cases:
+        runs = []
+
+        for _ in range(max(int(repeat), 1)):
+
+            # A new process for each run, so nothing is warmed up or shared.
+            with ProcessPoolExecutor(1) as executor:
+                runs.append(executor.submit(run_case, case, work_dir).result())
+
+        result = min(runs, key=lambda run: run['seconds'])
+        result['runs'] = len(runs)
+
+        results.append(result)
+
+        if on_result is not None:
+            on_result(result)
+
+    return {'environment': environment(), 'results': results}
+
+
+def environment() -> dict:
+    """
+    Return the versions of the software the benchmark ran with.
+    """
+
+    return {
+        'platform': platform(),
+        'python': python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'cpus': cpu_count()
+    }
+
+
+def compare_results(results: dict,
+                    baseline: dict,
+                    tolerance: float = DEFAULT_TOLERANCE
+                    ) -> List[Tuple[str, str, float, float, bool]]:
+    """
+    Compare the speeds of the cases run in both benchmarks.
+
+    ---
+    Arguments
+    ---
+
+        results (dict)
+    The new benchmark. See `run_benchmark()`.
+
+        baseline (dict)
+    The stored benchmark.
+
+        tolerance (float, DEFAULT_TOLERANCE)
+    The fraction by which a speed may drop before being a slowdown.
+
+    ---
+    Returns
+    ---
+
+        List[Tuple[str, str, float, float, bool]]
+    The case id, the measure, its baseline and new values, and whether it is
+    a slowdown.
+    """
+
+    stored = {
+        result['id']: result
+        for result in baseline.get('results', [])
+    }  # type: Dict[str, dict]
+
+    rows = []
+
+    for result in results['results']:
+        if result['id'] not in stored:
+            continue
+
+        for measure in COMPARED_MEASURES:
+            before = stored[result['id']].get(measure) or 0.0
+            after = result.get(measure) or 0.0
+
+            rows.append((result['id'], measure, before, after,
+                         after < before * (1 - tolerance)))
+
+    return rows
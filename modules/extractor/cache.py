@@ -0,0 +1,537 @@
+"""
+Local cache of extracted images, keyed by the video and the parameters.
+"""
+
+from contextlib import contextmanager
+
+from glob import escape, glob
+
+from hashlib import blake2b, sha256
+
+from json import dumps, loads
+
+from os import (O_CREAT, O_EXCL, O_WRONLY, close, getpid, link, listdir,
+                makedirs, open as open_fd, path, remove, rename, replace, stat,
+                utime)
+
+from shutil import copy2, rmtree
+
+from time import sleep, time
+
+from typing import Iterator, Optional, Tuple
+
+from uuid import uuid4
+
+from modules.extractor.constants import (CACHE_LOCK_TIMEOUT,
+                                         DEFAULT_CACHE_SIZE,
+                                         FINGERPRINT_BLOCK_SIZE,
+                                         FINGERPRINT_BLOCKS,
+                                         MANIFEST_FILENAME)
+
+from modules.extractor.manifest import ExtractionManifest
+
+# Linux ioctl that makes a file share the blocks of another one.
+FICLONE = 0x40049409
+
+# Filename of the description of each cache entry.
+ENTRY_FILENAME = 'entry.json'
+
+
+def video_fingerprint(video_file: str,
+                      blocks: int = FINGERPRINT_BLOCKS,
+                      block_size: int = FINGERPRINT_BLOCK_SIZE) -> str:
+    """
+    Return a fingerprint of a video file, without reading all of it.
+
+    It hashes the size and the modification time of the file, and some blocks
+    spread evenly over it, including the first and the last ones.
+
+    ---
+    Arguments
+    ---
+
+        video_file (str)
+    The path of the video file.
+
+        blocks (int, FINGERPRINT_BLOCKS)
+    The number of blocks hashed.
+
+        block_size (int, FINGERPRINT_BLOCK_SIZE)
+    The size, in bytes, of each block.
+
+    ---
+    Returns
+    ---
+
+        str
+    The fingerprint, as a hexadecimal string.
+    """
+
+    info = stat(video_file)
+
+    digest = blake2b(digest_size=16)
+    digest.update('{}:{}'.format(info.st_size, info.st_mtime_ns).encode())
+
+    # The start of each block, the last one ending at the end of the file.
+    last = max(info.st_size - block_size, 0)
+
+    starts = sorted({
+        last * i // max(blocks - 1, 1)
+        for i in range(max(int(blocks), 1))
+    })
+
+    with open(video_file, 'rb') as file:
+        for start in starts:
+            file.seek(start)
+            digest.update(file.read(block_size))
+
+    return digest.hexdigest()
+
+
+def link_file(source: str, target: str) -> str:
+    """
+    Make a file with the contents of another one, sharing its data if possible.
+
+    A reflink is a copy on write, so each file can be changed independently. A
+    hardlink is the same file, so changing one changes the other.
+
+    ---
+    Arguments
+    ---
+
+        source (str)
+    The path of the existing file.
+
+        target (str)
+    The path of the new file. It is replaced, if it exists.
+
+    ---
+    Returns
+    ---
+
+        str
+    How the file was made: `'reflink'`, `'hardlink'` or `'copy'`.
+    """
+
+    if path.lexists(target):
+        remove(target)
+
+    try:
+
+        # Try to share the blocks, in the file systems that support it.
+        import fcntl
+
+        with open(source, 'rb') as source_file, open(target,
+                                                     'wb') as target_file:
+            fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+
+        return 'reflink'
+
+    # Not supported by the system or by the file system.
+    except (ImportError, OSError):
+        if path.lexists(target):
+            remove(target)
+
+    try:
+        link(source, target)
+
+        return 'hardlink'
+
+    # E.g., in different file systems.
+    except OSError:
+        copy2(source, target)
+
+        return 'copy'
+
+
+class ResultCache:
+    """
+    Folder of the images of previous extractions, evicting the least recently
+    used ones beyond a size limit.
+
+    Each entry is a folder named by a hash of the video fingerprint and of the
+    extraction parameters, with the images, the manifest and a description
+    file, whose modification time is the last use. An entry is created in a
+    temporary folder and renamed when complete, so it is never seen partially.
+    The entries and the statistics can be shared by many processes.
+
+    ---
+    Attributes
+    ---
+
+        cache_dir (str)
+    The path of the cache folder.
+
+        max_size (int)
+    The maximum total size, in bytes, of the entries.
+
+        hits (int)
+    Number of lookups by this instance that found an entry.
+
+        misses (int)
+    Number of lookups by this instance that didn't find an entry.
+
+        link_method (Optional[str])
+    How the images of the last entry found were linked: `'reflink'`,
+    `'hardlink'` or `'copy'`.
+    """
+
+    def __init__(self,
+                 cache_dir: str,
+                 max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            cache_dir (str)
+        The path of the cache folder, created if needed.
+
+            max_size (int, DEFAULT_CACHE_SIZE)
+        The maximum total size, in bytes, of the entries.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If the maximum size is not positive.
+        """
+
+        if max_size < 1:
+            raise ValueError('The cache size must be greater than zero')
+
+        self.cache_dir = path.abspath(cache_dir)
+        self.max_size = int(max_size)
+
+        self.hits = 0
+        self.misses = 0
+        self.link_method = None
+
+        makedirs(path.join(self.cache_dir, 'entries'), exist_ok=True)
+        makedirs(path.join(self.cache_dir, 'tmp'), exist_ok=True)
+
+    def key(self, video_file: str, params: dict) -> str:
+        """
+        Return the key of the images of an extraction.
+
+        ---
+        Arguments
+        ---
+
+            video_file (str)
+        The path of the video file.
+
+            params (dict)
+        The extraction parameters, with JSON values only.
+
+        ---
+        Returns
+        ---
+
+            str
+        The key, as a hexadecimal string.
+        """
+
+        return sha256(
+            dumps([video_fingerprint(video_file), params],
+                  sort_keys=True).encode()).hexdigest()
+
+    def fetch(self, key: str,
+              output_dir: str) -> Optional[Tuple[int, int, str]]:
+        """
+        Link the images of an entry to a folder, if it exists.
+
+        ---
+        Arguments
+        ---
+
+            key (str)
+        The key of the entry.
+
+            output_dir (str)
+        The path of an existing output folder.
+
+        ---
+        Returns
+        ---
+
+            Optional[Tuple[int, int, str]]
+        The number and the total size of the images, and how the first file
+        was linked, or None if there is no such entry.
+        """
+
+        entry_dir = self._entry_dir(key)
+
+        try:
+            with open(path.join(entry_dir, ENTRY_FILENAME)) as file:
+                entry = loads(file.read())
+
+            # Mark the entry as the most recently used.
+            utime(path.join(entry_dir, ENTRY_FILENAME))
+
+            method = None
+
+            for name in entry['names']:
+                linked = link_file(path.join(entry_dir, name),
+                                   path.join(output_dir, name))
+
+                method = method or linked
+
+            # The manifest is rewritten by the next extraction to the folder.
+            copy2(path.join(entry_dir, MANIFEST_FILENAME),
+                  path.join(output_dir, MANIFEST_FILENAME))
+
+            # Drop the parts of a previous manifest.
+            for part in glob(
+                    escape(path.join(output_dir, MANIFEST_FILENAME)) +
+                    '.[0-9]*'):
+                remove(part)
+
+        # No entry, or it was evicted meanwhile.
+        except (OSError, ValueError):
+            self.misses += 1
+            self._count('misses')
+
+            return None
+
+        self.hits += 1
+        self._count('hits')
+
+        self.link_method = method or 'copy'
+
+        return entry['images'], entry['bytes'], method or 'copy'
+
+    def store(self, key: str, output_dir: str) -> bool:
+        """
+        Add the images of an extraction to the cache, evicting the least
+        recently used entries if needed.
+
+        ---
+        Arguments
+        ---
+
+            key (str)
+        The key of the entry.
+
+            output_dir (str)
+        The path of the output folder, with the images and the manifest of
+        a complete extraction.
+
+        ---
+        Returns
+        ---
+
+            bool
+        True if the entry was stored, False if it is larger than the cache.
+        """
+
+        manifest_file = path.join(output_dir, MANIFEST_FILENAME)
+
+        with open(manifest_file) as file:
+            params = loads(file.readline())['params']
+
+        records = ExtractionManifest(manifest_file, params).load()
+
+        names = [name for _, name, _ in records.values()]
+        size = sum(size for _, _, size in records.values())
+
+        if size > self.max_size:
+            return False
+
+        # Make the entry aside, so it is never seen partially.
+        temp_dir = path.join(self.cache_dir, 'tmp',
+                             '{}-{}-{}'.format(key, getpid(), uuid4().hex))
+
+        makedirs(temp_dir)
+
+        try:
+            for name in names:
+                link_file(path.join(output_dir, name),
+                          path.join(temp_dir, name))
+
+            # Merge the parts of the manifest, if any.
+            with ExtractionManifest(path.join(temp_dir, MANIFEST_FILENAME),
+                                    params) as manifest:
+                manifest.begin()
+
+                for extracted_index, (frame_index, name,
+                                      image_size) in sorted(records.items()):
+                    manifest.add((extracted_index, frame_index), name,
+                                 image_size)
+
+            with open(path.join(temp_dir, ENTRY_FILENAME), 'w') as file:
+                file.write(
+                    dumps({
+                        'names': names,
+                        'images': len(names),
+                        'bytes': size
+                    }))
+
+            with self._locked():
+                if path.isdir(self._entry_dir(key)):
+                    rmtree(self._entry_dir(key))
+
+                rename(temp_dir, self._entry_dir(key))
+
+                self._evict(key)
+
+        finally:
+            if path.isdir(temp_dir):
+                rmtree(temp_dir, ignore_errors=True)
+
+        return True
+
+    def stats(self) -> dict:
+        """
+        Return the statistics of the cache, shared by all its users.
+
+        ---
+        Returns
+        ---
+
+            dict
+        The number of `entries`, their total `size`, in bytes, and the total
+        of `hits`, `misses` and `evictions`.
+        """
+
+        with self._locked():
+            counts = self._read_counts()
+            entries = self._entries()
+
+        return {
+            'entries': len(entries),
+            'size': sum(size for _, size, _ in entries),
+            'hits': counts.get('hits', 0),
+            'misses': counts.get('misses', 0),
+            'evictions': counts.get('evictions', 0)
+        }
+
+    def _count(self, name: str, value: int = 1) -> None:
+        """
+        Add to a shared statistic.
+        """
+
+        with self._locked():
+            counts = self._read_counts()
+            counts[name] = counts.get(name, 0) + value
+
+            self._write_counts(counts)
+
+    def _entries(self) -> list:
+        """
+        Return the key, the size and the last use of each entry.
+        """
+
+        entries = []
+
+        for key in listdir(path.join(self.cache_dir, 'entries')):
+            entry_file = path.join(self._entry_dir(key), ENTRY_FILENAME)
+
+            try:
+                with open(entry_file) as file:
+                    size = loads(file.read())['bytes']
+
+                entries.append((key, size, stat(entry_file).st_mtime))
+
+            # An entry being removed by another process.
+            except (OSError, ValueError, KeyError):
+                continue
+
+        return entries
+
+    def _entry_dir(self, key: str) -> str:
+        """
+        Return the path of the folder of an entry.
+        """
+
+        return path.join(self.cache_dir, 'entries', key)
+
+    def _evict(self, keep: str) -> None:
+        """
+        Remove the least recently used entries beyond the size limit, with the
+        lock held.
+        """
+
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+
+        for key, size, _ in entries:
+            if total <= self.max_size:
+                break
+
+            if key == keep:
+                continue
+
+            rmtree(self._entry_dir(key), ignore_errors=True)
+
+            total -= size
+            evicted += 1
+
+        if evicted:
+            counts = self._read_counts()
+            counts['evictions'] = counts.get('evictions', 0) + evicted
+
+            self._write_counts(counts)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Hold the lock of the cache folder, shared by all processes.
+        """
+
+        lock_file = path.join(self.cache_dir, '.lock')
+        start_time = time()
+
+        while True:
+            try:
+                close(open_fd(lock_file, O_CREAT | O_EXCL | O_WRONLY))
+
+                break
+
+            except FileExistsError:
+
+                # Break the lock left by a killed process.
+                if time() - start_time > CACHE_LOCK_TIMEOUT:
+                    try:
+                        remove(lock_file)
+
+                    except OSError:
+                        pass
+
+                    start_time = time()
+
+                sleep(0.01)
+
+        try:
+            yield
+
+        finally:
+            remove(lock_file)
+
+    def _read_counts(self) -> dict:
+        """
+        Read the shared statistics, with the lock held.
+        """
+
+        try:
+            with open(path.join(self.cache_dir, 'stats.json')) as file:
+                return loads(file.read())
+
+        except (OSError, ValueError):
+            return {}
+
+    def _write_counts(self, counts: dict) -> None:
+        """
+        Replace the shared statistics at once, with the lock held.
+        """
+
+        temp_file = path.join(self.cache_dir, 'tmp',
+                              'stats-{}.json'.format(getpid()))
+
+        with open(temp_file, 'w') as file:
+            file.write(dumps(counts))
+
+        replace(temp_file, path.join(self.cache_dir, 'stats.json'))
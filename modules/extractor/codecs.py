@@ -0,0 +1,235 @@
+"""
+Image formats and encoder parameters for the extracted frames.
+"""
+
+from io import BytesIO
+
+from time import perf_counter
+
+from typing import Any, List, Optional, Tuple
+
+import cv2
+
+from numpy.lib.format import write_array
+
+# Formats of the extracted images. The `npy` format stores the raw BGR array,
+# without compression.
+IMAGE_FORMATS = ('jpg', 'png', 'webp', 'npy')
+
+
+class ImageCodec:
+    """
+    Encoder of the extracted images in some format.
+
+    ---
+    Attributes
+    ---
+
+        image_format (str)
+    One of `IMAGE_FORMATS`.
+
+        extension (str)
+    The extension of the image files, with the leading dot.
+
+        params (List[int])
+    The `cv2.imencode()` parameters, as flag and value pairs.
+
+        label (str)
+    A short description of the format and its settings.
+    """
+
+    def __init__(self,
+                 image_format: str = 'jpg',
+                 quality: Optional[int] = None,
+                 png_compression: Optional[int] = None,
+                 jpeg_optimize: bool = False,
+                 jpeg_progressive: bool = False) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            image_format (str, 'jpg')
+        One of `IMAGE_FORMATS`.
+
+            quality (Optional[int], None)
+        The JPEG or WebP quality, from 0 to 100, where 0 is 1 for WebP. By
+        default, the OpenCV one.
+
+            png_compression (Optional[int], None)
+        The PNG compression level, from 0 to 9. By default, the OpenCV one.
+
+            jpeg_optimize (bool, False)
+        Set whether to optimize the JPEG Huffman tables.
+
+            jpeg_progressive (bool, False)
+        Set whether to encode progressive JPEG images.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If some parameter is invalid, or doesn't apply to the format.
+        """
+
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError('The image format must be one of {}'.format(
+                ', '.join(IMAGE_FORMATS)))
+
+        if quality is not None and not 0 <= quality <= 100:
+            raise ValueError('The quality must be between 0 and 100')
+
+        if png_compression is not None and not 0 <= png_compression <= 9:
+            raise ValueError('The PNG compression must be between 0 and 9')
+
+        # Never ignored silently, e.g., a quality with a lossless format.
+        if quality is not None and image_format not in ('jpg', 'webp'):
+            raise ValueError('The quality only applies to the jpg and webp '
+                             'formats')
+
+        if png_compression is not None and image_format != 'png':
+            raise ValueError('The PNG compression only applies to the png '
+                             'format')
+
+        if (jpeg_optimize or jpeg_progressive) and image_format != 'jpg':
+            raise ValueError('The JPEG settings only apply to the jpg format')
+
+        self.image_format = image_format
+        self.extension = '.' + image_format
+
+        self.params = []
+
+        # Describe the settings, for the codecs comparison.
+        settings = []
+
+        if image_format == 'jpg':
+            if quality is not None:
+                self.params += [cv2.IMWRITE_JPEG_QUALITY, quality]
+                settings.append('quality={}'.format(quality))
+
+            if jpeg_optimize:
+                self.params += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+                settings.append('optimize')
+
+            if jpeg_progressive:
+                self.params += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+                settings.append('progressive')
+
+        elif image_format == 'png':
+            if png_compression is not None:
+                self.params += [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+                settings.append('compression={}'.format(png_compression))
+
+        elif image_format == 'webp':
+            if quality is not None:
+
+                # The lowest WebP quality is 1.
+                quality = max(quality, 1)
+
+                self.params += [cv2.IMWRITE_WEBP_QUALITY, quality]
+                settings.append('quality={}'.format(quality))
+
+        self.label = ' '.join([image_format] + settings)
+
+    def encode(self, image: Any) -> Any:
+        """
+        Encode an image.
+
+        ---
+        Arguments
+        ---
+
+            image (numpy.ndarray)
+        The image to encode.
+
+        ---
+        Returns
+        ---
+
+            bytes-like
+        The encoded image.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If the image could not be encoded.
+        """
+
+        # Store the raw array with a `.npy` header.
+        if self.image_format == 'npy':
+            buffer = BytesIO()
+            write_array(buffer, image, allow_pickle=False)
+
+            return buffer.getbuffer()
+
+        encoded, data = cv2.imencode(self.extension, image, self.params)
+
+        if not encoded:
+            raise ValueError('Could not encode the image as {}'.format(
+                self.image_format))
+
+        return data
+
+
+# Codecs compared by default, from the fastest to the smallest output.
+COMPARED_CODECS = (ImageCodec('npy'), ImageCodec('jpg', 75),
+                   ImageCodec('jpg', 95), ImageCodec('jpg', 95, None, True),
+                   ImageCodec('jpg', 95, None, False, True),
+                   ImageCodec('png', None, 1), ImageCodec('png', None, 3),
+                   ImageCodec('png', None, 9), ImageCodec('webp', 80),
+                   ImageCodec('webp', 100))
+
+
+def compare_codecs(images: List[Any],
+                   codecs: List[ImageCodec] = None
+                   ) -> List[Tuple[ImageCodec, float, float]]:
+    """
+    Measure the encode time and the size of some images with each codec.
+
+    ---
+    Arguments
+    ---
+
+        images (List[numpy.ndarray])
+    A sample of images from the input video.
+
+        codecs (List[ImageCodec], None)
+    The codecs to compare. By default, the `COMPARED_CODECS`.
+
+    ---
+    Returns
+    ---
+
+        List[Tuple[ImageCodec, float, float]]
+    Each codec, with its mean encode time, in milliseconds, and its mean
+    number of bytes per image.
+    """
+
+    # If no codecs were provided,...
+    if codecs is None:
+
+        # ... use the default ones.
+        codecs = COMPARED_CODECS
+
+    results = []
+
+    for codec in codecs:
+        total_time = total_size = 0
+
+        for image in images:
+            start_time = perf_counter()
+
+            data = codec.encode(image)
+
+            total_time += perf_counter() - start_time
+            total_size += memoryview(data).nbytes
+
+        count = max(len(images), 1)
+
+        results.append(
+            (codec, total_time * 1000 / count, total_size / count))
+
+    return results
@@ -0,0 +1,90 @@
+"""
+Constants used by the extractor methods.
+"""
+
+# Minimum distance, in frames, between two selected frames for seeking to be
+# faster than grabbing the frames in between.
+SEEK_MIN_STRIDE = 48
+
+# Default number of threads encoding and writing the images.
+DEFAULT_WRITERS = 4
+
+# Default number of frames waiting to be encoded and written.
+DEFAULT_QUEUE_SIZE = 16
+
+# Extensions of the video files searched in a folder, in batch mode.
+VIDEO_EXTENSIONS = ('.3gp', '.avi', '.flv', '.m4v', '.mkv', '.mov', '.mp4',
+                    '.mpeg', '.mpg', '.mts', '.ts', '.webm', '.wmv')
+
+# Default maximum size, in bytes, of each tar shard.
+DEFAULT_SHARD_SIZE = 256 * 1024 * 1024
+
+# Size, in bytes, of the tar blocks.
+TAR_BLOCK_SIZE = 512
+
+# Default number of frames sampled to compare the image codecs.
+DEFAULT_CODEC_SAMPLES = 10
+
+# Width, in pixels, of the downscaled copies compared by the scene detector.
+SCENE_PROXY_WIDTH = 64
+
+# Number of bins of the histograms compared by the scene detector.
+SCENE_HISTOGRAM_BINS = 32
+
+# Default maximum number of kept frame hashes remembered by the duplicate
+# filter. The oldest ones are forgotten first.
+DEFAULT_DEDUP_CAPACITY = 100000
+
+# Number of bits of the perceptual hashes.
+HASH_BITS = 64
+
+# Minimum number of bits of each chunk of a hash in the index of the duplicate
+# filter. Smaller chunks match most hashes, so they would barely filter them.
+HASH_MIN_CHUNK_BITS = 8
+
+# Tolerance, in seconds, when matching the frame times to the scheduled ones.
+TIME_TOLERANCE = 0.0005
+
+# Filename of the manifest of the images written to an output folder.
+MANIFEST_FILENAME = 'manifest.jsonl'
+
+# Number of manifest records written to disk at once.
+MANIFEST_BATCH_SIZE = 256
+
+# Size, in bytes, of each block of a video file hashed for its fingerprint.
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+
+# Number of blocks of a video file hashed for its fingerprint.
+FINGERPRINT_BLOCKS = 16
+
+# Default maximum size, in bytes, of the result cache.
+DEFAULT_CACHE_SIZE = 4 * 1024 * 1024 * 1024
+
+# Time, in seconds, after which the lock of the result cache is broken.
+CACHE_LOCK_TIMEOUT = 30
+
+# Period, in seconds, between two rewrites of the Prometheus textfile.
+METRICS_INTERVAL = 15.0
+
+# Prefix of the names of the exported Prometheus metrics.
+METRICS_PREFIX = 'video_frame_extractor'
+
+# Filename of the cache of the video metadata, in the folder of the videos.
+PROBE_CACHE_FILENAME = '.video-probe.json'
+
+# Version of the format of the probe cache, to discard the old ones.
+PROBE_CACHE_VERSION = 1
+
+# Extension of the frame index sidecar, appended to the video filename.
+FRAME_INDEX_EXTENSION = '.fidx'
+
+# Extension of the array file of the frames, in the dataset output mode.
+DATASET_EXTENSION = '.npy'
+
+# Extension of the index of the frames, in the dataset output mode.
+DATASET_INDEX_EXTENSION = '.index.npy'
+
+# Longest filter graph passed to ffmpeg as an argument. A longer one, e.g., of
+# many scattered frames, is written to a file instead, since the length of an
+# argument, or of the whole command line on Windows, is limited.
+FFMPEG_MAX_FILTER_ARGUMENT = 4096
@@ -0,0 +1,323 @@
+"""
+Storing of the extracted frames as a single memory-mapped array file.
+"""
+
+from os import path, remove, replace
+
+from struct import pack
+
+from time import perf_counter
+
+from typing import Any, Callable, Tuple
+
+import numpy as np
+
+from modules.extractor.constants import (DATASET_EXTENSION,
+                                         DATASET_INDEX_EXTENSION)
+
+from modules.extractor.writer import WriteCounters, WriteError
+
+# Extension of the files being written, appended to the filename.
+TEMP_EXTENSION = '.part'
+
+# Record of each frame in the index file.
+INDEX_DTYPE = np.dtype([('frame_index', '<i8'), ('timestamp', '<f8')])
+
+
+def dataset_files(output_dir: str, prefix: str) -> Tuple[str, str]:
+    """
+    Return the paths of the array file and of the index file of a dataset.
+
+    ---
+    Arguments
+    ---
+
+        output_dir (str)
+    The path of the output folder.
+
+        prefix (str)
+    The filename prefix, e.g., the video name.
+
+    ---
+    Returns
+    ---
+
+        Tuple[str, str]
+    The paths of the array file and of the index file.
+    """
+
+    return (path.join(output_dir, prefix + DATASET_EXTENSION),
+            path.join(output_dir, prefix + DATASET_INDEX_EXTENSION))
+
+
+def write_npy_header(file: Any, shape: Tuple[int, ...], dtype: Any,
+                     size: int) -> None:
+    """
+    Write the header of a NPY version 1.0 file, padded to a given size so it
+    can replace the header of an existing file.
+
+    ---
+    Arguments
+    ---
+
+        file (file)
+    The file, at its beginning.
+
+        shape (Tuple[int, ...])
+    The array shape.
+
+        dtype (numpy.dtype)
+    The array data type.
+
+        size (int)
+    The size, in bytes, of the header, including the magic string, which
+    must be large enough.
+    """
+
+    header = repr({
+        'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        'fortran_order': False,
+        'shape': tuple(shape)
+    })
+
+    # The magic string, the version and the length take 10 bytes.
+    header = header.ljust(size - 10 - 1) + '\n'
+
+    file.write(b'\x93NUMPY\x01\x00' + pack('<H', len(header)) +
+               header.encode('latin1'))
+
+
+class FrameDataset:
+    """
+    Single NPY file of all the extracted frames, stacked in an array of shape
+    `(frames, height, width, channels)`, with an index of the frame indices
+    and times.
+
+    The file is preallocated for the number of selected frames, and each
+    frame is copied into its row through a memory map, so there is no
+    encoding at all. If fewer frames are added, e.g., rejected by the
+    selection by content, the file is shrunk when closed. The index is a NPY
+    file of records with the `frame_index` and the `timestamp` of each row.
+
+    Both files are written with a temporary extension, and renamed only when
+    complete, so they can be read back with `numpy.load(file, mmap_mode='r')`
+    and sliced without decoding or copying anything.
+
+    ---
+    Attributes
+    ---
+
+        file (str)
+    The path of the array file.
+
+        index_file (str)
+    The path of the index file.
+
+        frame_shape (Tuple[int, ...])
+    The shape of each frame, with the channels last.
+
+        counters (WriteCounters)
+    Counters of the frames stored, with the time spent copying them.
+    """
+
+    def __init__(self,
+                 output_dir: str,
+                 prefix: str,
+                 frames: int,
+                 frame_shape: Tuple[int, ...],
+                 dtype: Any = np.uint8,
+                 on_written: Callable[[Any, str, int], None] = None) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            output_dir (str)
+        The path of an existing output folder.
+
+            prefix (str)
+        The filename prefix, e.g., the video name.
+
+            frames (int)
+        The maximum number of frames, e.g., the number of selected frames.
+
+            frame_shape (Tuple[int, ...])
+        The shape of each frame. A grayscale frame gets a single channel.
+
+            dtype (numpy.dtype, numpy.uint8)
+        The data type of the frames.
+
+            on_written (Callable[[Any, str, int], None], None)
+        Called with the tag, the filename and the size of each frame stored.
+
+        ---
+        Raises
+        ---
+
+            WriteError
+        If the file could not be created.
+        """
+
+        self.file, self.index_file = dataset_files(output_dir, prefix)
+
+        # The channels are always the last axis.
+        if len(frame_shape) == 2:
+            frame_shape = tuple(frame_shape) + (1, )
+
+        self.frame_shape = tuple(frame_shape)
+        self.on_written = on_written
+
+        self.counters = WriteCounters()
+
+        try:
+            self._array = np.lib.format.open_memmap(
+                self.file + TEMP_EXTENSION, 'w+', dtype,
+                (max(int(frames), 0), ) + self.frame_shape)
+
+        except OSError as e:
+            raise WriteError('Could not create {}: {}'.format(
+                self.file, e.strerror or e)) from e
+
+        self._index = np.zeros(len(self._array), INDEX_DTYPE)
+
+    def __enter__(self) -> 'FrameDataset':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close(complete=exc_info[0] is None)
+
+    @property
+    def written(self) -> int:
+        """
+        Number of frames already stored.
+        """
+
+        return self.counters.written
+
+    @property
+    def bytes(self) -> int:
+        """
+        Total size, in bytes, of the frames already stored.
+        """
+
+        return self.counters.bytes
+
+    @property
+    def full(self) -> bool:
+        """
+        Whether there is no row left for another frame.
+        """
+
+        return self.written >= len(self._array)
+
+    def add(self,
+            image: Any,
+            frame_index: int,
+            timestamp: float,
+            tag: Any = None) -> None:
+        """
+        Copy a frame into the next row.
+
+        ---
+        Arguments
+        ---
+
+            image (numpy.ndarray)
+        The frame, with the frame shape, or without the channel axis if it
+        has a single channel.
+
+            frame_index (int)
+        The index of the frame in the video.
+
+            timestamp (float)
+        The time of the frame in the video, in seconds.
+
+            tag (Any, None)
+        Some value passed to `on_written` after the frame is stored.
+
+        ---
+        Raises
+        ---
+
+            WriteError
+        If all the rows are already used, or the frame has another shape.
+        """
+
+        if self.full:
+            raise WriteError('No room left in {}'.format(self.file))
+
+        row = self.written
+
+        start_time = perf_counter()
+
+        try:
+            self._array[row] = image.reshape(self.frame_shape)
+
+        except ValueError as e:
+            raise WriteError('Frame of shape {} in a dataset of {}'.format(
+                image.shape, self.frame_shape)) from e
+
+        self._index[row] = frame_index, timestamp
+
+        self.counters.write_time += perf_counter() - start_time
+        self.counters.submitted += 1
+        self.counters.written += 1
+        self.counters.bytes += self._array[row].nbytes
+
+        if self.on_written is not None:
+            self.on_written(tag, path.basename(self.file),
+                            self._array[row].nbytes)
+
+    def close(self, complete: bool = True) -> None:
+        """
+        Shrink the array file to the frames stored, write the index and move
+        both files to their final paths.
+
+        ---
+        Arguments
+        ---
+
+            complete (bool, True)
+        Set whether the extraction completed. If not, the files are removed.
+        """
+
+        # Already closed.
+        if self._array is None:
+            return
+
+        rows = self.written
+
+        shape = (rows, ) + self._array.shape[1:]
+        dtype = self._array.dtype
+        offset = self._array.offset
+        row_size = dtype.itemsize * int(np.prod(self.frame_shape))
+
+        # Flush the rows and drop the only reference to the memory map, which
+        # closes it, so the file can be resized.
+        self._array.flush()
+        self._array = None
+
+        temp_file = self.file + TEMP_EXTENSION
+        temp_index = self.index_file + TEMP_EXTENSION
+
+        try:
+            if not complete:
+                return
+
+            # Fewer frames than rows, so rewrite the shape in the header.
+            if rows < len(self._index):
+                with open(temp_file, 'r+b') as file:
+                    write_npy_header(file, shape, dtype, offset)
+                    file.truncate(offset + rows * row_size)
+
+            with open(temp_index, 'wb') as file:
+                np.save(file, self._index[:rows])
+
+            # The index first, so a dataset file always has its index.
+            replace(temp_index, self.index_file)
+            replace(temp_file, self.file)
+
+        finally:
+            for file in (temp_file, temp_index):
+                if path.exists(file):
+                    remove(file)
@@ -0,0 +1,323 @@
+"""
+Decoder backends other than OpenCV, reading the selected frames of a video.
+"""
+
+from os import remove
+
+from shutil import which
+
+from subprocess import DEVNULL, PIPE, Popen
+
+from tempfile import NamedTemporaryFile, TemporaryFile
+
+from time import perf_counter
+
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from modules.extractor.constants import FFMPEG_MAX_FILTER_ARGUMENT
+
+from modules.extractor.reader import ReadCounters
+
+from modules.extractor.transform import BufferRing
+
+
+class DecodeError(IOError):
+    """
+    Raised when a decoder fails, e.g., on a corrupt video file.
+    """
+
+
+def ffmpeg_available() -> bool:
+    """
+    Check whether the `ffmpeg` binary is in the PATH.
+
+    ---
+    Returns
+    ---
+
+        bool
+    True if it is.
+    """
+
+    return which('ffmpeg') is not None
+
+
+def frame_runs(targets: Iterable[int]) -> List[Tuple[int, int, int]]:
+    """
+    Group the frame indices into runs of evenly spaced frames.
+
+    ---
+    Arguments
+    ---
+
+        targets (Iterable[int])
+    The sorted and unique frame indices.
+
+    ---
+    Returns
+    ---
+
+        List[Tuple[int, int, int]]
+    The first index, the last index and the step of each run.
+    """
+
+    runs = []
+
+    for frame_index in targets:
+        if runs:
+            first, last, step = runs[-1]
+
+            # The second frame of a run sets its step.
+            if first == last or frame_index - last == step:
+                runs[-1] = (first, frame_index, frame_index - last)
+
+                continue
+
+        runs.append((frame_index, frame_index, 1))
+
+    return runs
+
+
+def select_expression(offset: int,
+                      extraction_rate: int,
+                      targets: Optional[Iterable[int]] = None) -> str:
+    """
+    Return the expression of the ffmpeg `select` filter keeping only the
+    selected frames, by their index in the video.
+
+    ---
+    Arguments
+    ---
+
+        offset (int)
+    The index of the first frame to be extracted.
+
+        extraction_rate (int)
+    The frame interval between one extracted frame and another.
+
+        targets (Optional[Iterable[int]], None)
+    If defined, the indices of the frames to extract instead.
+
+    ---
+    Returns
+    ---
+
+        str
+    The expression, with the commas escaped for a filter graph.
+    """
+
+    if targets is None:
+        return 'gte(n\\,{0})*not(mod(n-{0}\\,{1}))'.format(
+            offset, extraction_rate)
+
+    terms = []
+
+    # Each run of evenly spaced frames is a single term, so the filter doesn't
+    # test each frame against every target.
+    for first, last, step in frame_runs(targets):
+        if first == last:
+            terms.append('eq(n\\,{})'.format(first))
+
+        else:
+            terms.append('between(n\\,{0}\\,{1})*not(mod(n-{0}\\,{2}))'.format(
+                first, last, step))
+
+    return '+'.join(terms) or '0'
+
+
+def ffmpeg_command(video_file: str,
+                   expression: str,
+                   threads: int = 0,
+                   filter_file: Optional[str] = None) -> List[str]:
+    """
+    Return the command decoding the selected frames of a video to raw BGR
+    images on the standard output.
+
+    ---
+    Arguments
+    ---
+
+        video_file (str)
+    The path of the video file.
+
+        expression (str)
+    The expression of the `select` filter, from `select_expression()`.
+
+        threads (int, 0)
+    Number of decoding threads. If 0, chosen by ffmpeg.
+
+        filter_file (Optional[str], None)
+    If defined, the path of a file with the filter graph, passed instead of
+    the expression.
+
+    ---
+    Returns
+    ---
+
+        List[str]
+    The command line.
+    """
+
+    # The filter graph, or the file with it.
+    video_filter = (['-vf', 'select={}'.format(expression)]
+                    if filter_file is None else
+                    ['-filter_script:v', filter_file])
+
+    # Passing the frames through, neither duplicated nor dropped to keep a
+    # frame rate, so each one is the next selected frame.
+    return [
+        'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-threads',
+        str(threads), '-i', video_file, '-map', '0:v:0', '-an', '-sn'
+    ] + video_filter + [
+        '-vsync', '0', '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1'
+    ]
+
+
+def read_ffmpeg(video_file: str,
+                width: int,
+                height: int,
+                frame_indices: Iterable[int],
+                expression: str,
+                counters: ReadCounters,
+                ring: Optional[BufferRing] = None,
+                threads: int = 0) -> Iterator[Tuple[int, Any]]:
+    """
+    Read the selected frames from an `ffmpeg` process, which decodes the
+    video and drops the other frames before they leave it.
+
+    ---
+    Arguments
+    ---
+
+        video_file (str)
+    The path of the video file.
+
+        width (int)
+    The frames width.
+
+        height (int)
+    The frames height.
+
+        frame_indices (Iterable[int])
+    The sorted indices of the frames kept by the filter, in the order they
+    are output.
+
+        expression (str)
+    The expression of the `select` filter, from `select_expression()`.
+
+        counters (ReadCounters)
+    Counters to update with the frames read and the time spent.
+
+        ring (Optional[BufferRing], None)
+    The ring or the pool of arrays to store the frames. If None, a new array
+    is allocated for each frame.
+
+        threads (int, 0)
+    Number of decoding threads. If 0, chosen by ffmpeg.
+
+    ---
+    Yields
+    ---
+
+        Tuple[int, numpy.ndarray]
+    The index and the BGR image of each selected frame.
+
+    ---
+    Raises
+    ---
+
+        DecodeError
+    If ffmpeg can't be started or fails, e.g., if the file is not a valid
+    video file.
+    """
+
+    shape = (height, width, 3)
+    frame_size = height * width * 3
+
+    filter_file = None
+
+    # Too long for the command line, e.g., with many scattered frames.
+    if len(expression) > FFMPEG_MAX_FILTER_ARGUMENT:
+        with NamedTemporaryFile('w', suffix='.txt', delete=False) as file:
+            file.write('select={}'.format(expression))
+
+        filter_file = file.name
+
+    # A file, so the error messages can't fill a pipe and block ffmpeg.
+    log = TemporaryFile()
+
+    try:
+        process = Popen(ffmpeg_command(video_file, expression, threads,
+                                       filter_file),
+                        stdin=DEVNULL,
+                        stdout=PIPE,
+                        stderr=log)
+
+    except OSError as e:
+        log.close()
+
+        if filter_file is not None:
+            remove(filter_file)
+
+        raise DecodeError('Could not start ffmpeg: {}'.format(e.strerror
+                                                              or e)) from e
+
+    # The index after the last frame output.
+    position = 0
+
+    try:
+        for frame_index in frame_indices:
+            start_time = perf_counter()
+
+            frame = ring.next(shape) if ring is not None else np.empty(
+                shape, np.uint8)
+
+            view = memoryview(frame).cast('B')
+            size = 0
+
+            # A pipe can return less than asked for.
+            while size < frame_size:
+                read = process.stdout.readinto(view[size:])
+
+                if not read:
+                    break
+
+                size += read
+
+            counters.retrieve_time += perf_counter() - start_time
+
+            # No more frames output, so the exit status tells whether the
+            # video was read completely.
+            if size < frame_size:
+                if process.wait() != 0:
+                    log.seek(0)
+
+                    raise DecodeError('ffmpeg failed: {}'.format(
+                        log.read().decode(errors='replace').strip()))
+
+                return
+
+            # The frames in between were dropped by the decoder.
+            counters.skipped += frame_index - position
+            counters.decoded += 1
+
+            position = frame_index + 1
+
+            yield frame_index, frame
+
+    finally:
+
+        # The reading was stopped before the end, or every frame needed was
+        # read, so the rest of the video doesn't have to be decoded.
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+        process.stdout.close()
+        log.close()
+
+        if filter_file is not None:
+            remove(filter_file)
@@ -0,0 +1,1174 @@
+"""
+Library interface for extracting frames from a video file.
+"""
+
+from itertools import count, islice
+
+from hashlib import sha1
+
+from os import path
+
+from time import perf_counter
+
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+import cv2
+
+import numpy as np
+
+from modules.extractor.cache import ResultCache, video_fingerprint
+
+from modules.extractor.constants import (MANIFEST_FILENAME, SEEK_MIN_STRIDE,
+                                         TIME_TOLERANCE)
+
+from modules.extractor.decoders import (ffmpeg_available, read_ffmpeg,
+                                        select_expression)
+
+from modules.extractor.index import FrameIndex
+
+from modules.extractor.manifest import ExtractionManifest
+
+from modules.extractor.metrics import extraction_metrics
+
+from modules.extractor.output import OutputOptions
+
+from modules.extractor.parallel import extract_parallel
+
+from modules.extractor.reader import (ReadCounters, can_extract_at,
+                                      capture_property, read_seeking,
+                                      read_selected, read_targets, read_times,
+                                      selected_indices)
+
+from modules.extractor.schedule import FrameSchedule
+
+from modules.extractor.selection import DuplicateFilter, SceneDetector
+
+from modules.extractor.sources import STDIN, StreamError, is_stream
+
+from modules.extractor.transform import (BufferPool, BufferRing,
+                                         FrameTransform)
+
+from modules.extractor.writer import WriteCounters, frame_name
+
+# Ways of reaching the selected frames.
+READ_MODES = ('auto', 'sequential', 'seek')
+
+# Backends decoding the video.
+DECODERS = ('opencv', 'ffmpeg')
+
+
+class FrameExtractor:
+    """
+    Extract the frames from a video file, every `extraction_rate`-th frame
+    after `offset`, or the ones of a schedule.
+
+    The frames can be consumed in memory with `iter_frames()`, or saved as
+    image files with `extract()`.
+
+    ---
+    Attributes
+    ---
+
+        video_file (str)
+    The absolute path of the input video file, or `STDIN`.
+
+        is_stream (bool)
+    Whether the video is read from the standard input or a named pipe, so it
+    can be read only once, sequentially, and the total of frames may be
+    unknown.
+
+        frames (int)
+    The total of frames, as reported by the container, or the exact one if
+    the video is indexed.
+
+        fps (float)
+    The frame rate.
+
+        width (int)
+    The frames width.
+
+        height (int)
+    The frames height.
+
+        extraction_rate (int)
+    The frame interval between one extracted frame and another.
+
+        offset (int)
+    The index of the first frame to be extracted.
+
+        read_mode (str)
+    How to reach the selected frames: `'auto'`, `'sequential'` or `'seek'`.
+
+        schedule (Optional[FrameSchedule])
+    If defined, the frame indices or times to extract, instead of the ones
+    selected by the extraction rate and the offset.
+
+        transform (Optional[FrameTransform])
+    The crop, resize and color conversion of the frames, if any.
+
+        scene_detector (Optional[SceneDetector])
+    If defined, only the frames, among the ones selected by the extraction
+    rate and the offset, that start a new scene are extracted.
+
+        duplicate_filter (Optional[DuplicateFilter])
+    If defined, the frames that look like some frame already extracted are
+    skipped.
+
+        counters (ReadCounters)
+    Counters of the frames read by the last extraction.
+
+        write_counters (WriteCounters)
+    Counters of the images written by the last extraction.
+
+        index (Optional[FrameIndex])
+    The time and the keyframe flag of every frame, if the video is indexed.
+
+        decoder (str)
+    The backend decoding the frames: `'opencv'`, or `'ffmpeg'` to drop the
+    frames not selected inside an `ffmpeg` process, ignoring the read mode.
+
+        decoder_threads (int)
+    Number of threads of the `ffmpeg` decoder. If 0, chosen by ffmpeg.
+    """
+
+    def __init__(self,
+                 video_file: str,
+                 extraction_rate: int = 1,
+                 offset: int = 0,
+                 read_mode: str = 'auto',
+                 transform: Optional[FrameTransform] = None,
+                 scene_detector: Optional[SceneDetector] = None,
+                 duplicate_filter: Optional[DuplicateFilter] = None,
+                 schedule: Optional[FrameSchedule] = None,
+                 use_index: bool = True,
+                 decoder: str = 'opencv',
+                 decoder_threads: int = 0) -> None:
+        """
+        Open the video file and read its information.
+
+        ---
+        Arguments
+        ---
+
+            video_file (str)
+        The path of the input video file or named pipe, or `STDIN` to read it
+        from the standard input.
+
+            extraction_rate (int, 1)
+        The frame interval between one extracted frame and another.
+
+            offset (int, 0)
+        The index of the first frame to be extracted.
+
+            read_mode (str, 'auto')
+        How to reach the selected frames.
+
+            transform (Optional[FrameTransform], None)
+        The crop, resize and color conversion of the frames, if any.
+
+            scene_detector (Optional[SceneDetector], None)
+        The detector of the frames that start a new scene, if any.
+
+            duplicate_filter (Optional[DuplicateFilter], None)
+        The filter of the frames that look like an extracted one, if any.
+
+            schedule (Optional[FrameSchedule], None)
+        The frame indices or times to extract, if not every
+        `extraction_rate`-th frame after `offset`.
+
+            use_index (bool, True)
+        Set whether to use the frame index stored next to the video by a
+        previous `build_index()`, if it is still valid.
+
+            decoder (str, 'opencv')
+        The backend decoding the frames.
+
+            decoder_threads (int, 0)
+        Number of threads of the `ffmpeg` decoder. If 0, chosen by ffmpeg.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If the file is not a valid video file.
+        """
+
+        self.video_file = video_file if video_file == STDIN else path.abspath(
+            video_file)
+        self.is_stream = is_stream(video_file)
+
+        self.extraction_rate = extraction_rate
+        self.offset = offset
+        self.read_mode = read_mode
+        self.transform = transform
+        self.scene_detector = scene_detector
+        self.duplicate_filter = duplicate_filter
+        self.schedule = schedule
+        self.decoder = decoder
+        self.decoder_threads = decoder_threads
+
+        self.counters = ReadCounters()
+        self.write_counters = WriteCounters()
+
+        # The extracted indices of the images written by a previous run.
+        self._done = frozenset()
+
+        # The progress of the current extraction.
+        self._processed = 0
+        self._frame_writer = None
+
+        # The elapsed time of the last extraction, or the start of the current
+        # one.
+        self._seconds = 0.0
+        self._start_time = None
+
+        # The schedule of the indices matching the times of the last schedule
+        # resolved with the index, and the schedule and the index it is of.
+        self._resolved = (None, None, None)
+
+        self._video_stream = None
+
+        self._open()
+
+        # Get the total number of frames, the frame rate and the resolution.
+        self.frames = int(self._video_stream.get(
+            capture_property('FRAME_COUNT')))
+        self.fps = float(self._video_stream.get(capture_property('FPS')))
+        self.width = int(self._video_stream.get(
+            capture_property('FRAME_WIDTH')))
+        self.height = int(
+            self._video_stream.get(capture_property('FRAME_HEIGHT')))
+
+        self.index = None
+
+        if use_index and not self.is_stream:
+            self._use_index(FrameIndex.load(self.video_file))
+
+    def __enter__(self) -> 'FrameExtractor':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    @property
+    def duration(self) -> float:
+        """
+        The video duration, in seconds.
+        """
+
+        if self.index is not None and self.index.frames > 1:
+            return self.index.duration
+
+        return self.frames / self.fps if self.fps > 0 else 0.0
+
+    @property
+    def video_name(self) -> str:
+        """
+        The input video filename, without its extension.
+        """
+
+        if self.video_file == STDIN:
+            return 'stdin'
+
+        return path.splitext(path.basename(self.video_file))[0]
+
+    def can_extract_at(self, index: int) -> bool:
+        """
+        Check whether to extract the image from a frame at `index`.
+
+        ---
+        Arguments
+        ---
+
+            index (int)
+        The frame index.
+
+        ---
+        Returns
+        ---
+
+            bool
+        True if the image from the frame can be extracted.
+        """
+
+        return can_extract_at(index, self.extraction_rate, self.offset)
+
+    def timestamp(self, frame_index: int) -> float:
+        """
+        Return the time of a frame in the video, in seconds.
+
+        ---
+        Arguments
+        ---
+
+            frame_index (int)
+        The frame index.
+
+        ---
+        Returns
+        ---
+
+            float
+        The frame time.
+        """
+
+        # The exact time, if the video is indexed.
+        if self.index is not None and 0 <= frame_index < self.index.frames:
+            return self.index.timestamp(frame_index)
+
+        return (1 / self.fps) * frame_index if self.fps > 0 else 0.0
+
+    def build_index(self, counters: Optional[ReadCounters] = None) -> bool:
+        """
+        Read every frame of the video to index it, and store the index next to
+        it, so the next extractions of the video use it too.
+
+        ---
+        Arguments
+        ---
+
+            counters (Optional[ReadCounters], None)
+        Counters to update with the number of frames read, e.g., to show the
+        progress from another thread.
+
+        ---
+        Returns
+        ---
+
+            bool
+        False if the index could not be stored, e.g., in a read-only folder,
+        so only this instance uses it.
+        """
+
+        if self.is_stream:
+            raise ValueError('A stream can\'t be indexed')
+
+        self._use_index(FrameIndex.build(self.video_file, counters))
+
+        try:
+            self.index.save(self.video_file)
+
+        except OSError:
+            return False
+
+        return True
+
+    def validate(self) -> None:
+        """
+        Check whether the extraction parameters are valid.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If some parameter is invalid.
+        """
+
+        if self.read_mode not in READ_MODES:
+            raise ValueError('The read mode must be one of {}'.format(
+                ', '.join(READ_MODES)))
+
+        if self.decoder not in DECODERS:
+            raise ValueError('The decoder must be one of {}'.format(
+                ', '.join(DECODERS)))
+
+        if self.decoder == 'ffmpeg':
+            if self.is_stream:
+                raise ValueError('The ffmpeg decoder can\'t read a stream')
+
+            if not ffmpeg_available():
+                raise ValueError('The ffmpeg decoder needs the ffmpeg binary')
+
+            # The filter selects the frames by index.
+            if self._timed():
+                raise ValueError('The ffmpeg decoder needs the video to be '
+                                 'indexed for a schedule by time')
+
+        # The extraction rate and the offset are replaced by the schedule.
+        if self.schedule is not None:
+            return
+
+        if self.extraction_rate < 1:
+            raise ValueError('The extraction rate must be greater than zero')
+
+        if self.offset < 0:
+            raise ValueError('The offset must be positive')
+
+        # The total of frames of a stream is only an estimate, if known.
+        if not self.is_stream and self.offset >= self.frames:
+            raise ValueError('The offset must be lower than {}'.format(
+                self.frames))
+
+    def iter_frames(self,
+                    buffers: int = 0) -> Iterator[Tuple[int, int, float, Any]]:
+        """
+        Read the selected frames lazily, decoding only the needed ones.
+
+        Each call starts over from the beginning of the video.
+
+        ---
+        Arguments
+        ---
+
+            buffers (int, 0)
+        Number of preallocated arrays reused cyclically for the decoded and
+        the transformed frames, so each frame is overwritten after this number
+        of frames. If 0, a new array is allocated for each frame.
+
+        ---
+        Yields
+        ---
+
+            Tuple[int, int, float, numpy.ndarray]
+        The index among the extracted frames, the index in the video, the time,
+        in seconds, and the BGR image of each selected frame.
+        """
+
+        yield from self._frames(BufferRing(buffers) if buffers > 0 else None)
+
+    def _frames(self, ring: Optional[BufferRing]
+                ) -> Iterator[Tuple[int, int, float, Any]]:
+        """
+        Read the selected frames, storing them in the arrays of a ring or of a
+        pool, if any.
+        """
+
+        self.validate()
+
+        # Start over if the stream was already read.
+        if self._video_stream is None or int(
+                self._video_stream.get(capture_property('POS_FRAMES'))) != 0:
+            if self.is_stream:
+                raise ValueError('A stream can be read only once')
+
+            self._open()
+
+        self.counters = ReadCounters()
+        self.counters.resumed = len(self._done)
+
+        self._processed = 0
+
+        # A decoded frame is needed only until transformed into another array.
+        decoded_ring = ring
+
+        if ring is not None and self.transform is not None and (
+                not self.transform.is_identity):
+            decoded_ring = BufferRing(1)
+
+        reader = self._read(decoded_ring)
+
+        # The frames rejected by the selection by content are never stored.
+        release = decoded_ring.release if decoded_ring is not None else None
+
+        # Keep only the frames that start a new scene.
+        if self.scene_detector is not None:
+            self.scene_detector.reset()
+
+            reader = self._new_scenes(reader, release)
+
+        # Skip the frames that look like an extracted one.
+        if self.duplicate_filter is not None:
+            self.duplicate_filter.reset()
+
+            reader = self._unique(reader, release)
+
+        for extracted_index, (frame_index, frame,
+                              timestamp) in enumerate(reader):
+
+            self._processed = frame_index + 1
+
+            # Some frames before it may have been extracted by a previous run.
+            if self._done:
+                extracted_index = self._position(frame_index)
+
+            if self.transform is not None:
+                frame = self.transform.apply_into(frame, ring)
+
+            yield extracted_index, frame_index, timestamp, frame
+
+        # The backend can't find the frames of some containers without seeking,
+        # e.g., a MP4 file with its index at the end, and just reads nothing.
+        read = self.counters.decoded + self.counters.skipped
+
+        if self.is_stream and read == 0:
+            raise StreamError(
+                'The stream is not readable without seeking; use a fragmented '
+                'or streamable container')
+
+    def extract(self,
+                output_dir: str,
+                options: OutputOptions = None,
+                jobs: int = 1,
+                on_frame: Callable[[int, int, float], None] = None,
+                resume: bool = False,
+                cache: Optional[ResultCache] = None,
+                on_written: Callable[[int, int, str, int], None] = None
+                ) -> Tuple[int, int]:
+        """
+        Save the selected frames as images in a folder.
+
+        When storing image files, a manifest of the parameters and of the
+        images written is kept in the folder, so an interrupted extraction can
+        be resumed, reading only the frames missing. They can also be linked
+        from a cache of previous extractions, without reading the video.
+
+        ---
+        Arguments
+        ---
+
+            output_dir (str)
+        The path of an existing output folder or, in the stream mode, of the
+        file or named pipe to write, or `modules.extractor.sinks.STDOUT`.
+
+            options (OutputOptions, None)
+        How to encode and store the images. By default, as JPEG files.
+
+            jobs (int, 1)
+        Number of processes extracting segments of the video.
+
+            on_frame (Callable[[int, int, float], None], None)
+        Called with the indices and the time of each frame before it is
+        queued. Not called when there is more than one job.
+
+            resume (bool, False)
+        Set whether to keep the images written by a previous extraction to the
+        folder, with the same parameters.
+
+            cache (Optional[ResultCache], None)
+        The cache where to look for the images of an identical extraction, and
+        where to store them otherwise. Only used when storing image files.
+
+            on_written (Callable[[int, int, str, int], None], None)
+        Called from the writer threads with the indices, the filename and the
+        size of each image right after it is stored. Not called when there is
+        more than one job or the images are linked from the cache.
+
+        ---
+        Returns
+        ---
+
+            Tuple[int, int]
+        The number and the total size, in bytes, of the images stored by this
+        extraction.
+        """
+
+        # If no options were provided,...
+        if options is None:
+
+            # ... use the default ones.
+            options = OutputOptions()
+
+        self.validate()
+        options.validate()
+
+        # The numbering depends on every previous frame.
+        if jobs > 1 and (self.scene_detector is not None
+                         or self.duplicate_filter is not None):
+            raise ValueError(
+                'The selection by content can\'t be split into segments')
+
+        # The frame matching a time is known only after reading the previous
+        # ones, unless the video is indexed.
+        if jobs > 1 and self._timed():
+            raise ValueError(
+                'A schedule by time can\'t be split into segments')
+
+        # A stream can be read only by a single process.
+        if jobs > 1 and self.is_stream:
+            raise ValueError('A stream can\'t be split into segments')
+
+        # The images of all the segments would be mixed in the same stream.
+        if jobs > 1 and options.mode == 'stream':
+            raise ValueError(
+                'The stream output can\'t be split into segments')
+
+        # The rows are allocated up front.
+        if options.mode == 'dataset' and self.frames < 1:
+            raise ValueError('The dataset output needs the total of frames')
+
+        # The rows of the frames of each segment are known only at the end.
+        if jobs > 1 and options.mode == 'dataset':
+            raise ValueError(
+                'The dataset output can\'t be split into segments')
+
+        # Each segment would be decoded from the start of the video.
+        if jobs > 1 and self.decoder == 'ffmpeg':
+            raise ValueError(
+                'The ffmpeg decoder can\'t split the video into segments')
+
+        if resume:
+            self._check_resumable(options)
+
+        self._start_time = perf_counter()
+
+        try:
+            return self._extract_resumable(output_dir, options, jobs, on_frame,
+                                           resume, cache, on_written)
+
+        finally:
+            self._seconds = perf_counter() - self._start_time
+            self._start_time = None
+
+    def _extract_resumable(self,
+                           output_dir: str,
+                           options: OutputOptions,
+                           jobs: int,
+                           on_frame: Callable[[int, int, float], None],
+                           resume: bool,
+                           cache: Optional[ResultCache],
+                           on_written: Callable[[int, int, str, int], None]
+                           ) -> Tuple[int, int]:
+        """
+        Save the selected frames as images, recording them in a manifest and
+        in the cache, if storing image files.
+        """
+
+        # Only the image files of a video file can be checked and kept on
+        # resume.
+        if options.mode != 'files' or self.is_stream:
+            return self._extract(output_dir, options, jobs, on_frame,
+                                 on_written=on_written)
+
+        params = self._manifest_params(options)
+
+        # Link the images of an identical extraction, without reading anything.
+        if cache is not None:
+            key = cache.key(self.video_file, params)
+            cached = cache.fetch(key, output_dir)
+
+            if cached is not None:
+                self.counters = ReadCounters()
+                self.write_counters = WriteCounters()
+
+                self._frame_writer = None
+
+                return cached[:2]
+
+        with ExtractionManifest(path.join(output_dir, MANIFEST_FILENAME),
+                                params) as manifest:
+            self._done = frozenset(manifest.begin(resume))
+
+            try:
+                written, size = self._extract(output_dir, options, jobs,
+                                              on_frame, manifest, on_written)
+
+            finally:
+                self._done = frozenset()
+
+        if cache is not None:
+            cache.store(key, output_dir)
+
+        return written, size
+
+    def _extract(self,
+                 output_dir: str,
+                 options: OutputOptions,
+                 jobs: int,
+                 on_frame: Callable[[int, int, float], None] = None,
+                 manifest: Optional[ExtractionManifest] = None,
+                 on_written: Callable[[int, int, str, int], None] = None
+                 ) -> Tuple[int, int]:
+        """
+        Save the selected frames as images, skipping the ones already done.
+        """
+
+        def stored(tag: Tuple[int, int, float], name: str, size: int) -> None:
+            """
+            Record an image stored and report it.
+            """
+
+            if manifest is not None:
+                manifest.add(tag[:2], name, size)
+
+            if on_written is not None:
+                on_written(*tag[:2], name, size)
+
+        self._processed = 0
+        self._frame_writer = None
+
+        self.write_counters = WriteCounters()
+
+        # Split the video into segments extracted by a pool of processes.
+        if jobs > 1:
+            self.counters, self.write_counters = extract_parallel(
+                self.video_file, output_dir, self.video_name, self.fps,
+                self.frames, self.offset, self.extraction_rate, jobs, options,
+                self.transform, self._frame_schedule(),
+                manifest.file if manifest is not None else None, self._done,
+                self.index)
+
+            self.counters.resumed = len(self._done)
+
+            return self.write_counters.written, self.write_counters.bytes
+
+        # All the frames in a single array file, without encoding them.
+        if options.mode == 'dataset':
+            return self._extract_dataset(output_dir, options, on_frame,
+                                         on_written)
+
+        with options.open_writer(
+                output_dir, self.video_name, stored if manifest is not None
+                or on_written is not None else None) as frame_writer:
+            self._frame_writer = frame_writer
+
+            # A frame is reused only after the writer is done with it.
+            pool = BufferPool(frame_writer.capacity + 1)
+
+            for extracted_index, frame_index, timestamp, frame in (
+                    self._frames(pool)):
+                if on_frame is not None:
+                    on_frame(extracted_index, frame_index, timestamp)
+
+                frame_writer.submit(
+                    frame_name(self.video_name, extracted_index, frame_index,
+                               timestamp), frame,
+                    (extracted_index, frame_index, timestamp), pool.release)
+
+        self.write_counters = frame_writer.counters
+
+        return frame_writer.written, frame_writer.bytes
+
+    def _extract_dataset(self,
+                         output_dir: str,
+                         options: OutputOptions,
+                         on_frame: Callable[[int, int, float], None] = None,
+                         on_written: Callable[[int, int, str, int],
+                                              None] = None
+                         ) -> Tuple[int, int]:
+        """
+        Copy the selected frames into the rows of a single array file.
+        """
+
+        shape = (self.height, self.width, 3)
+
+        if self.transform is not None:
+            shape = self.transform.output_shape(shape)
+
+        with options.open_dataset(
+                output_dir, self.video_name, self._selected_count(), shape,
+                (lambda tag, name, size: on_written(*tag, name, size))
+                if on_written is not None else None) as dataset:
+            self._frame_writer = dataset
+
+            # Each frame is copied right away, so a single array is reused.
+            for extracted_index, frame_index, timestamp, frame in (
+                    self._frames(BufferRing(1))):
+
+                # The container reported fewer frames than there are.
+                if dataset.full:
+                    break
+
+                if on_frame is not None:
+                    on_frame(extracted_index, frame_index, timestamp)
+
+                dataset.add(frame, frame_index, timestamp,
+                            (extracted_index, frame_index))
+
+        self.write_counters = dataset.counters
+
+        return dataset.written, dataset.bytes
+
+    def progress(self) -> Tuple[int, int, int, int]:
+        """
+        Return the progress of the current or last extraction. It can be
+        called from any thread while `extract()` runs in another one.
+
+        Not updated when there is more than one job.
+
+        ---
+        Returns
+        ---
+
+            Tuple[int, int, int, int]
+        The number of frames processed, that is, the index after the last
+        frame read, the number of frames decoded, and the number and the total
+        size, in bytes, of the images stored.
+        """
+
+        frame_writer = self._frame_writer
+
+        if frame_writer is None:
+            return self._processed, self.counters.decoded, 0, 0
+
+        return (self._processed, self.counters.decoded, frame_writer.written,
+                frame_writer.bytes)
+
+    def metrics(self) -> dict:
+        """
+        Return the per-stage metrics of the current or last extraction. It can
+        be called from any thread while `extract()` runs in another one.
+
+        Not updated until the end when there is more than one job.
+
+        ---
+        Returns
+        ---
+
+            dict
+        The metrics. See `modules.extractor.metrics.extraction_metrics()`.
+        """
+
+        frame_writer = self._frame_writer
+        start_time = self._start_time
+
+        return extraction_metrics(
+            self.counters, frame_writer.counters
+            if frame_writer is not None else self.write_counters,
+            perf_counter() -
+            start_time if start_time is not None else self._seconds)
+
+    def sample(self, count: int) -> List[Any]:
+        """
+        Read some frames spread evenly over the video.
+
+        ---
+        Arguments
+        ---
+
+            count (int)
+        The number of frames.
+
+        ---
+        Returns
+        ---
+
+            List[numpy.ndarray]
+        The BGR images of the frames.
+        """
+
+        # Start over from the beginning of the video.
+        self._open()
+
+        reader = read_seeking(self._video_stream, 0,
+                              max(1, self.frames // max(count, 1)),
+                              self.frames)
+
+        return [frame for _, frame in islice(reader, count)]
+
+    def release(self) -> None:
+        """
+        Close the video file.
+        """
+
+        if self._video_stream is not None:
+            self._video_stream.release()
+
+            self._video_stream = None
+
+    def _open(self) -> None:
+        """
+        Open the video stream at its first frame.
+        """
+
+        self.release()
+
+        self._video_stream = cv2.VideoCapture(
+            'pipe:0' if self.video_file == STDIN else self.video_file)
+
+        if not self._video_stream.isOpened():
+            self.release()
+
+            raise ValueError('Not a valid video file: {}'.format(
+                self.video_file))
+
+    def _check_resumable(self, options: OutputOptions) -> None:
+        """
+        Check whether the images selected can be matched to the ones of a
+        previous extraction, without reading the frames before them.
+        """
+
+        if options.mode != 'files':
+            raise ValueError('Only the extraction to image files can be '
+                             'resumed')
+
+        if self.is_stream:
+            raise ValueError('A stream can\'t be resumed')
+
+        if self.scene_detector is not None or (self.duplicate_filter
+                                               is not None):
+            raise ValueError('The selection by content can\'t be resumed')
+
+        if self._timed():
+            raise ValueError('A schedule by time can\'t be resumed')
+
+    def _manifest_params(self, options: OutputOptions) -> dict:
+        """
+        Return the parameters that must not change for an extraction to be
+        resumed.
+        """
+
+        # The selected frames.
+        if self.schedule is None:
+            selection = {
+                'extraction_rate': self.extraction_rate,
+                'offset': self.offset
+            }
+
+        elif self.schedule.interval is not None:
+            selection = {'every': self.schedule.interval}
+
+        elif self.schedule.times is not None:
+            selection = {'at': self.schedule.times.tolist()}
+
+        else:
+            selection = {
+                'frames':
+                sha1(self.schedule.indices.astype('<i8').tobytes()).hexdigest()
+            }
+
+        # The times are matched to the frames of the index, if any, or to the
+        # times read from the video, which may differ.
+        if self.schedule is not None and self.schedule.is_timed:
+            selection['indexed'] = self.index is not None
+
+        # A video replaced under the same name is extracted again.
+        return {
+            'video': self.video_name,
+            'video_fingerprint': video_fingerprint(self.video_file),
+            'frames': self.frames,
+            'selection': selection,
+            'transform': None if self.transform is None else {
+                'size': self.transform.size,
+                'scale': self.transform.scale,
+                'fit': self.transform.fit,
+                'crop': self.transform.crop,
+                'grayscale': self.transform.grayscale
+            },
+            'scene_detector': None if self.scene_detector is None else {
+                'threshold': self.scene_detector.threshold,
+                'method': self.scene_detector.method
+            },
+            'duplicate_filter': None if self.duplicate_filter is None else {
+                'max_distance': self.duplicate_filter.index.max_distance,
+                'capacity': self.duplicate_filter.index.capacity
+            },
+            'format': options.codec().label
+        }
+
+    def _use_index(self, index: Optional[FrameIndex]) -> None:
+        """
+        Use the exact number of frames and times of an index, if any.
+        """
+
+        # An empty index is of a video the backend can't read.
+        if index is None or index.frames == 0:
+            return
+
+        self.index = index
+        self.frames = index.frames
+
+    def _timed(self) -> bool:
+        """
+        Check whether the frames matching the times of the schedule are known
+        only by reading the video.
+        """
+
+        return self.schedule is not None and self.schedule.is_timed and (
+            self.index is None)
+
+    def _frame_schedule(self) -> Optional[FrameSchedule]:
+        """
+        Return the schedule, with its times replaced by the matching frames if
+        the video is indexed.
+        """
+
+        if self.schedule is None or not self.schedule.is_timed or (
+                self.index is None):
+            return self.schedule
+
+        schedule, index, resolved = self._resolved
+
+        # Resolved once for each schedule, since it is used for every frame.
+        if schedule is self.schedule and index is self.index:
+            return resolved
+
+        if self.schedule.interval is not None:
+
+            # Every multiple of the interval up to the last frame.
+            last = self.index.times[-1] + TIME_TOLERANCE
+            times = self.schedule.interval * np.arange(
+                int(last // self.schedule.interval) + 1)
+
+        else:
+            times = self.schedule.times
+
+        resolved = FrameSchedule(indices=self.index.frames_at(times))
+
+        self._resolved = (self.schedule, self.index, resolved)
+
+        return resolved
+
+    def _position(self, frame_index: int) -> int:
+        """
+        Return the index among the extracted frames of a selected frame.
+        """
+
+        if self.schedule is not None:
+            return self._frame_schedule().position(frame_index)
+
+        return (frame_index - self.offset) // self.extraction_rate
+
+    def _selected_count(self) -> int:
+        """
+        Return the number of frames selected, before the selection by content,
+        as far as it is known without reading the video.
+        """
+
+        if self.schedule is None:
+            return len(range(self.offset, self.frames, self.extraction_rate))
+
+        # At most a frame for each time.
+        if self._timed():
+            if self.schedule.interval is not None:
+                return int(self.duration // self.schedule.interval) + 1
+
+            return len(self.schedule.times)
+
+        return sum(1 for frame_index in self._frame_schedule().targets()
+                   if frame_index < self.frames)
+
+    def _pending(self) -> Iterator[int]:
+        """
+        Return the indices of the selected frames not extracted yet by a
+        previous run.
+        """
+
+        if self.schedule is not None:
+            targets = self._frame_schedule().targets()
+
+        else:
+            targets = selected_indices(self.offset, self.extraction_rate,
+                                       self.frames)
+
+        return (frame_index for extracted_index, frame_index in enumerate(
+            targets) if extracted_index not in self._done)
+
+    def _read(self, ring: Optional[BufferRing] = None
+              ) -> Iterator[Tuple[int, Any, float]]:
+        """
+        Read the selected frames with the strategy of the read mode, decoding
+        them into the arrays of a ring, if any.
+        """
+
+        # The frames not selected never leave the decoder.
+        if self.decoder == 'ffmpeg':
+            return self._read_ffmpeg(ring)
+
+        # Reaching the frames only by grabbing, as a stream can't be seeked.
+        if self.read_mode == 'sequential' or self.is_stream:
+            min_stride = None
+
+        else:
+            min_stride = 1 if self.read_mode == 'seek' else SEEK_MIN_STRIDE
+
+        # Match the times against the time of each frame.
+        if self._timed():
+            return read_times(self._video_stream, self.schedule.targets(),
+                              self.counters, ring)
+
+        # Seek only where it saves decoding, if the keyframes are known.
+        keyframes = self.index.keyframes if self.index is not None else None
+
+        # Jump over the frames extracted by a previous run.
+        if self._done:
+            reader = read_targets(self._video_stream, self._pending(),
+                                  self.counters, min_stride, keyframes, ring)
+
+        # Jump from one scheduled frame to the next.
+        elif self.schedule is not None:
+            reader = read_targets(self._video_stream,
+                                  self._frame_schedule().targets(),
+                                  self.counters, min_stride, keyframes, ring)
+
+        # Read every frame, decoding only the selected ones.
+        elif min_stride is None:
+            reader = read_selected(self._video_stream, self.can_extract_at,
+                                   self.counters, ring=ring)
+
+        # Jump straight to the selected frames. In the automatic mode, the
+        # closer ones are still reached by grabbing.
+        else:
+            reader = read_seeking(self._video_stream, self.offset,
+                                  self.extraction_rate, self.frames,
+                                  self.counters, min_stride, keyframes, ring)
+
+        return ((frame_index, frame, self.timestamp(frame_index))
+                for frame_index, frame in reader)
+
+    def _read_ffmpeg(self, ring: Optional[BufferRing] = None
+                     ) -> Iterator[Tuple[int, Any, float]]:
+        """
+        Read the selected frames from an `ffmpeg` process, selecting them with
+        a filter on their index, as the OpenCV readers do.
+        """
+
+        targets = None
+
+        # Jump over the frames extracted by a previous run.
+        if self._done:
+            targets = list(self._pending())
+
+        # Keep only the scheduled frames.
+        elif self.schedule is not None:
+            targets = list(self._frame_schedule().targets())
+
+        reader = read_ffmpeg(
+            self.video_file, self.width, self.height,
+            count(self.offset, self.extraction_rate)
+            if targets is None else targets,
+            select_expression(self.offset, self.extraction_rate, targets),
+            self.counters, ring, self.decoder_threads)
+
+        return ((frame_index, frame, self.timestamp(frame_index))
+                for frame_index, frame in reader)
+
+    def _new_scenes(self,
+                    reader: Iterator[Tuple[int, Any, float]],
+                    release: Callable[[Any], None] = None
+                    ) -> Iterator[Tuple[int, Any, float]]:
+        """
+        Filter the frames that start a new scene, passing the arrays of the
+        others to `release`, if any, so they store the next frames.
+        """
+
+        for frame_index, frame, timestamp in reader:
+            start_time = perf_counter()
+
+            accepted = self.scene_detector.accept(frame)
+
+            self.counters.selection_time += perf_counter() - start_time
+
+            if accepted:
+                yield frame_index, frame, timestamp
+            else:
+                self.counters.rejected += 1
+
+                if release is not None:
+                    release(frame)
+
+    def _unique(self,
+                reader: Iterator[Tuple[int, Any, float]],
+                release: Callable[[Any], None] = None
+                ) -> Iterator[Tuple[int, Any, float]]:
+        """
+        Filter the frames that don't look like an extracted one, passing the
+        arrays of the others to `release`, if any, so they store the next
+        frames.
+        """
+
+        for frame_index, frame, timestamp in reader:
+            start_time = perf_counter()
+
+            accepted = self.duplicate_filter.accept(frame)
+
+            self.counters.selection_time += perf_counter() - start_time
+
+            if accepted:
+                yield frame_index, frame, timestamp
+            else:
+                self.counters.duplicates += 1
+
+                if release is not None:
+                    release(frame)
@@ -0,0 +1,358 @@
+"""
+Exact table of the frames of a video, stored as a binary sidecar file.
+"""
+
+from os import getpid, path, remove, replace, stat
+
+from struct import Struct
+
+from typing import Iterable, Optional
+
+import cv2
+
+import numpy as np
+
+from modules.extractor.constants import FRAME_INDEX_EXTENSION, TIME_TOLERANCE
+
+from modules.extractor.reader import (ReadCounters, capture_property, grab,
+                                      keyframe_before)
+
+# Identifier and version of the sidecar format.
+INDEX_MAGIC = b'VFEFIDX1'
+
+# Header of the sidecar: magic, video size, video modification time, number
+# of frames and whether the keyframes are known.
+INDEX_HEADER = Struct('<8sQqQ?')
+
+
+def index_file(video_file: str) -> str:
+    """
+    Return the path of the frame index sidecar of a video.
+
+    ---
+    Arguments
+    ---
+
+        video_file (str)
+    The path of the video file.
+
+    ---
+    Returns
+    ---
+
+        str
+    The path of the sidecar, next to the video.
+    """
+
+    return video_file + FRAME_INDEX_EXTENSION
+
+
+class FrameIndex:
+    """
+    Presentation time and keyframe flag of every frame of a video, as read by
+    a full pass over it.
+
+    The number of frames is exact, unlike the one reported by some
+    containers, and the times are the real ones of the variable frame rate
+    videos. The sidecar file stores the times as 64 bits floats and the
+    keyframe flags as bits, after a header with the size and the modification
+    time of the video, so a changed video is indexed again.
+
+    ---
+    Attributes
+    ---
+
+        times (numpy.ndarray)
+    The time of each frame, in seconds.
+
+        keyframes (Optional[numpy.ndarray])
+    The sorted indices of the keyframes, or None if the video library doesn't
+    report them, or not for the frames it returns. See `build()`.
+    """
+
+    def __init__(self,
+                 times: Iterable[float],
+                 keyframes: Optional[Iterable[int]] = None) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            times (Iterable[float])
+        The time of each frame, in seconds.
+
+            keyframes (Optional[Iterable[int]], None)
+        The indices of the keyframes, if known.
+        """
+
+        self.times = np.asarray(list(times), np.float64)
+        self.keyframes = None if keyframes is None else np.unique(
+            np.asarray(list(keyframes), np.int64))
+
+    @property
+    def frames(self) -> int:
+        """
+        The exact number of frames.
+        """
+
+        return int(self.times.size)
+
+    @property
+    def duration(self) -> float:
+        """
+        The time after the last frame, in seconds, assuming it lasts as long as
+        the previous one.
+        """
+
+        if self.times.size < 2:
+            return 0.0
+
+        return float(self.times[-1] + (self.times[-1] - self.times[-2]))
+
+    @classmethod
+    def build(cls,
+              video_file: str,
+              counters: Optional[ReadCounters] = None) -> 'FrameIndex':
+        """
+        Index a video by grabbing all its frames, without decoding them.
+
+        The keyframe flag reported by OpenCV is the one of the last packet
+        read, which is the packet of the frame grabbed only if the decoder
+        has no delay, e.g., without B-frames. Otherwise, the flags are of the
+        packets read ahead, so the keyframes are stored only if the first
+        frame, always a keyframe, is flagged.
+
+        ---
+        Arguments
+        ---
+
+            video_file (str)
+        The path of the video file.
+
+            counters (Optional[ReadCounters], None)
+        Counters to update with the number of frames grabbed, e.g., to show
+        the progress from another thread.
+
+        ---
+        Returns
+        ---
+
+            FrameIndex
+        The index.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If the file is not a valid video file.
+        """
+
+        # If no counters were provided,...
+        if counters is None:
+
+            # ... use some that will be discarded.
+            counters = ReadCounters()
+
+        video_stream = cv2.VideoCapture(video_file)
+
+        if not video_stream.isOpened():
+            raise ValueError('Not a valid video file: {}'.format(video_file))
+
+        time_prop = capture_property('POS_MSEC')
+
+        # Not reported by every OpenCV version and backend.
+        try:
+            keyframe_prop = capture_property('LRF_HAS_KEY_FRAME')
+
+        except AttributeError:
+            keyframe_prop = None
+
+        times = []
+        keyframes = []
+
+        try:
+            while grab(video_stream, counters):
+                counters.skipped += 1
+
+                if keyframe_prop is not None and video_stream.get(
+                        keyframe_prop) > 0:
+                    keyframes.append(len(times))
+
+                times.append(video_stream.get(time_prop) / 1000)
+
+        finally:
+            video_stream.release()
+
+        # With a decoder delay, the first frame is returned after reading the
+        # packets of the next ones, which are not keyframes, so the flags are
+        # shifted by the delay.
+        if keyframes and keyframes[0] != 0:
+            keyframes = []
+
+        # A backend that reports nothing doesn't know the keyframes.
+        return cls(times, keyframes or None)
+
+    @classmethod
+    def load(cls, video_file: str) -> Optional['FrameIndex']:
+        """
+        Read the sidecar of a video, if it exists and the video didn't change.
+
+        ---
+        Arguments
+        ---
+
+            video_file (str)
+        The path of the video file.
+
+        ---
+        Returns
+        ---
+
+            Optional[FrameIndex]
+        The index, or None if there is no valid sidecar.
+        """
+
+        try:
+            info = stat(video_file)
+
+            with open(index_file(video_file), 'rb') as file:
+                magic, size, mtime_ns, frames, has_keyframes = (
+                    INDEX_HEADER.unpack(file.read(INDEX_HEADER.size)))
+
+                if magic != INDEX_MAGIC or size != info.st_size or (
+                        mtime_ns != info.st_mtime_ns):
+                    return None
+
+                times = np.fromfile(file, np.float64, frames)
+                flags = np.fromfile(file, np.uint8, (frames + 7) // 8)
+
+        # No sidecar, or a truncated one.
+        except (OSError, ValueError):
+            return None
+
+        if times.size != frames or flags.size != (frames + 7) // 8:
+            return None
+
+        index = cls(())
+        index.times = times
+
+        if has_keyframes:
+            index.keyframes = np.flatnonzero(
+                np.unpackbits(flags, count=frames)).astype(np.int64)
+
+            # Shifted by a decoder delay, if stored by an older version.
+            if index.keyframes.size and index.keyframes[0] != 0:
+                index.keyframes = None
+
+        return index
+
+    def save(self, video_file: str) -> None:
+        """
+        Write the sidecar of the indexed video at once.
+
+        ---
+        Arguments
+        ---
+
+            video_file (str)
+        The path of the video file.
+        """
+
+        info = stat(video_file)
+
+        flags = np.zeros(self.frames, np.uint8)
+
+        if self.keyframes is not None:
+            flags[self.keyframes] = 1
+
+        temp_file = '{}.{}.tmp'.format(index_file(video_file), getpid())
+
+        try:
+            with open(temp_file, 'wb') as file:
+                file.write(
+                    INDEX_HEADER.pack(INDEX_MAGIC, info.st_size,
+                                      info.st_mtime_ns, self.frames,
+                                      self.keyframes is not None))
+                file.write(self.times.astype('<f8').tobytes())
+                file.write(np.packbits(flags).tobytes())
+
+            replace(temp_file, index_file(video_file))
+
+        finally:
+            if path.exists(temp_file):
+                remove(temp_file)
+
+    def timestamp(self, frame_index: int) -> float:
+        """
+        Return the time of a frame, in seconds.
+
+        ---
+        Arguments
+        ---
+
+            frame_index (int)
+        The frame index.
+
+        ---
+        Returns
+        ---
+
+            float
+        The frame time.
+        """
+
+        return float(self.times[frame_index])
+
+    def frames_at(self, times: Iterable[float]) -> np.ndarray:
+        """
+        Return the first frame at or after each time, as `read_times()` finds
+        them, without reading the video.
+
+        ---
+        Arguments
+        ---
+
+            times (Iterable[float])
+        The times, in seconds.
+
+        ---
+        Returns
+        ---
+
+            numpy.ndarray
+        The sorted and unique frame indices. The times after the last frame
+        have none.
+        """
+
+        indices = np.searchsorted(
+            self.times,
+            np.asarray(list(times), np.float64) - TIME_TOLERANCE)
+
+        return np.unique(indices[indices < self.frames])
+
+    def keyframe_before(self, frame_index: int) -> int:
+        """
+        Return the last keyframe at or before a frame, where the decoding of
+        the frame starts after a seek.
+
+        ---
+        Arguments
+        ---
+
+            frame_index (int)
+        The frame index.
+
+        ---
+        Returns
+        ---
+
+            int
+        The keyframe index, or `frame_index` itself if the keyframes are not
+        known.
+        """
+
+        if self.keyframes is None:
+            return frame_index
+
+        return keyframe_before(self.keyframes, frame_index)
@@ -0,0 +1,286 @@
+"""
+Manifest of the images written to an output folder, to resume an extraction.
+"""
+
+from glob import escape, glob
+
+from json import dumps, loads
+
+from os import fsync, path, remove
+
+from threading import Lock
+
+from typing import Dict, List, Optional, Tuple
+
+from modules.extractor.constants import MANIFEST_BATCH_SIZE
+
+# The image filename and size of an extracted frame, by its extracted index.
+Records = Dict[int, Tuple[int, str, int]]
+
+
+def part_file(file: str, index: int) -> str:
+    """
+    Return the path of a part of a manifest, written by a separate process.
+
+    ---
+    Arguments
+    ---
+
+        file (str)
+    The path of the manifest.
+
+        index (int)
+    The index of the part.
+
+    ---
+    Returns
+    ---
+
+        str
+    The path of the part.
+    """
+
+    return '{}.{:03d}'.format(file, index)
+
+
+class ExtractionManifest:
+    """
+    Record of the parameters of an extraction and of every image written.
+
+    It is a JSON lines file, with the parameters on the first line, followed
+    by the extracted index, the frame index, the filename and the size of each
+    image. An image is recorded only after it is completely written, and the
+    records are flushed to disk in batches, so a killed extraction loses at
+    most a batch of records, and its images are written again on resume.
+
+    When a video is split into segments, each process records its images in
+    a part of the manifest, merged on the next resume.
+    """
+
+    def __init__(self,
+                 file: str,
+                 params: Optional[dict] = None,
+                 batch_size: int = MANIFEST_BATCH_SIZE) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            file (str)
+        The path of the manifest.
+
+            params (Optional[dict], None)
+        The parameters of the extraction, with JSON values only. None for a
+        part of a manifest.
+
+            batch_size (int, MANIFEST_BATCH_SIZE)
+        Number of records written to disk at once.
+        """
+
+        self.file = file
+        self.params = params
+        self.batch_size = max(int(batch_size), 1)
+
+        self._pending = []  # type: List[str]
+        self._lock = Lock()
+        self._stream = None
+
+    def __enter__(self) -> 'ExtractionManifest':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def begin(self, resume: bool = False) -> Records:
+        """
+        Start recording the images of an extraction.
+
+        ---
+        Arguments
+        ---
+
+            resume (bool, False)
+        Set whether to keep the images of a previous extraction with the same
+        parameters, if any. Otherwise, the manifest starts over.
+
+        ---
+        Returns
+        ---
+
+            Records
+        The images already written, by their extracted index.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If resuming and the parameters of the manifest differ.
+        """
+
+        records = self.load() if resume and path.isfile(self.file) else {}
+
+        # Merge the parts and drop the images missing on disk.
+        with open(self.file, 'w') as stream:
+            stream.write(dumps({'params': self.params}) + '\n')
+
+            for extracted_index, record in sorted(records.items()):
+                stream.write(dumps([extracted_index, *record]) + '\n')
+
+        for part in glob(escape(self.file) + '.[0-9]*'):
+            remove(part)
+
+        self.open()
+
+        return records
+
+    def load(self) -> Records:
+        """
+        Read the images recorded by a previous extraction, in the manifest
+        and its parts, keeping only the ones still on disk.
+
+        ---
+        Returns
+        ---
+
+            Records
+        The images, by their extracted index.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If there is no manifest, or its parameters differ.
+        """
+
+        if not path.isfile(self.file):
+            raise ValueError('There is no extraction to resume in {}'.format(
+                path.dirname(self.file)))
+
+        with open(self.file) as lines:
+            first_line = lines.readline()
+
+        try:
+            params = loads(first_line)['params']
+
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Invalid manifest: {}'.format(self.file))
+
+        self._check(params)
+
+        records = {}
+
+        for file in [self.file] + sorted(
+                glob(escape(self.file) + '.[0-9]*')):
+            with open(file) as lines:
+
+                # Skip the parameters.
+                if file == self.file:
+                    lines.readline()
+
+                for line in lines:
+                    try:
+                        extracted_index, frame_index, name, size = loads(line)
+
+                    # The last line may be incomplete after a crash.
+                    except (TypeError, ValueError):
+                        continue
+
+                    records[extracted_index] = frame_index, name, size
+
+        output_dir = path.dirname(self.file)
+
+        # The files removed or left incomplete are written again.
+        return {
+            extracted_index: (frame_index, name, size)
+            for extracted_index, (frame_index, name, size) in records.items()
+            if path.isfile(path.join(output_dir, name))
+            and path.getsize(path.join(output_dir, name)) == size
+        }
+
+    def open(self) -> None:
+        """
+        Open the manifest to append records, without any parameter check.
+        """
+
+        self._stream = open(self.file, 'a')
+
+    def add(self, frame: Tuple[int, int], name: str, size: int) -> None:
+        """
+        Record an image written. It can be called from many threads.
+
+        ---
+        Arguments
+        ---
+
+            frame (Tuple[int, int])
+        The index among the extracted frames and the index in the video.
+
+            name (str)
+        The image filename, in the output folder.
+
+            size (int)
+        The image size, in bytes.
+        """
+
+        with self._lock:
+            self._pending.append(dumps([*frame, name, size]))
+
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def flush(self) -> None:
+        """
+        Write the pending records to disk.
+        """
+
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        """
+        Write the pending records and close the manifest.
+        """
+
+        if self._stream is None:
+            return
+
+        self.flush()
+
+        self._stream.close()
+        self._stream = None
+
+    def _check(self, params: Optional[dict]) -> None:
+        """
+        Check whether the parameters of the previous extraction are the same.
+        """
+
+        # Compare the values as read back from JSON, e.g., lists for tuples.
+        expected = loads(dumps(self.params))
+
+        if params == expected:
+            return
+
+        changed = sorted(
+            key for key in set(expected) | set(params or {})
+            if (params or {}).get(key) != expected.get(key))
+
+        raise ValueError(
+            'The extraction can\'t be resumed, since its parameters changed: '
+            '{}'.format(', '.join(changed)))
+
+    def _flush(self) -> None:
+        """
+        Write the pending records to disk, with the lock held.
+        """
+
+        if not self._pending or self._stream is None:
+            return
+
+        self._stream.write('\n'.join(self._pending) + '\n')
+        self._stream.flush()
+        fsync(self._stream.fileno())
+
+        self._pending = []
+
@@ -0,0 +1,295 @@
+"""
+Per-stage metrics of an extraction, exported as JSON or Prometheus text.
+"""
+
+from os import getpid, path, replace
+
+from threading import Event, Thread
+
+from time import time
+
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from modules.extractor.constants import METRICS_INTERVAL, METRICS_PREFIX
+
+from modules.extractor.reader import ReadCounters
+
+from modules.extractor.writer import WriteCounters
+
+# Stages of the pipeline, in order.
+STAGES = ('grab', 'retrieve', 'selection', 'wait', 'encode', 'write')
+
+
+def extraction_metrics(read_counters: ReadCounters,
+                       write_counters: WriteCounters,
+                       seconds: float) -> dict:
+    """
+    Gather the counters of an extraction into a single dictionary.
+
+    The encode and write times are summed over all the writer threads, and,
+    with many jobs, all the times are summed over all processes, so they can
+    be greater than the elapsed time.
+
+    ---
+    Arguments
+    ---
+
+        read_counters (ReadCounters)
+    The counters of the frames read.
+
+        write_counters (WriteCounters)
+    The counters of the images written.
+
+        seconds (float)
+    The elapsed time of the extraction, in seconds.
+
+    ---
+    Returns
+    ---
+
+        dict
+    The `seconds`, the `stages` time, the `frames` counts, the `bytes` written,
+    the `queue` depths and the `rates` per second. Ready to be saved as JSON.
+    """
+
+    return {
+        'seconds': seconds,
+        'stages': {
+            'grab': read_counters.grab_time,
+            'retrieve': read_counters.retrieve_time,
+            'selection': read_counters.selection_time,
+            'wait': write_counters.wait_time,
+            'encode': write_counters.encode_time,
+            'write': write_counters.write_time
+        },
+        'frames': {
+            'skipped': read_counters.skipped,
+            'decoded': read_counters.decoded,
+            'rejected': read_counters.rejected,
+            'duplicates': read_counters.duplicates,
+            'resumed': read_counters.resumed,
+            'submitted': write_counters.submitted,
+            'written': write_counters.written
+        },
+        'seeks': read_counters.seeks,
+        'bytes': write_counters.bytes,
+        'queue': {
+            'mean': write_counters.queue_mean,
+            'max': write_counters.queue_max
+        },
+        'rates': {
+            'decoded':
+            read_counters.decoded / seconds if seconds > 0 else 0.0,
+            'written':
+            write_counters.written / seconds if seconds > 0 else 0.0,
+            'bytes': write_counters.bytes / seconds if seconds > 0 else 0.0
+        }
+    }
+
+
+def label_text(labels: Dict[str, str]) -> str:
+    """
+    Format some labels of a Prometheus sample, escaping their values.
+
+    ---
+    Arguments
+    ---
+
+        labels (Dict[str, str])
+    The labels names and values.
+
+    ---
+    Returns
+    ---
+
+        str
+    The labels, in braces, or an empty string if there are none.
+    """
+
+    if not labels:
+        return ''
+
+    return '{{{}}}'.format(','.join('{}="{}"'.format(
+        name,
+        str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+            '\n', '\\n')) for name, value in sorted(labels.items())))
+
+
+def prometheus_text(samples: Iterable[Tuple[Dict[str, str], dict]],
+                    prefix: str = METRICS_PREFIX) -> str:
+    """
+    Format the metrics of some extractions in the Prometheus text format.
+
+    ---
+    Arguments
+    ---
+
+        samples (Iterable[Tuple[Dict[str, str], dict]])
+    The labels, e.g., the video name, and the metrics of each extraction. See
+    `extraction_metrics()`.
+
+        prefix (str, METRICS_PREFIX)
+    The prefix of the metrics names.
+
+    ---
+    Returns
+    ---
+
+        str
+    The text, ending with a newline.
+    """
+
+    samples = list(samples)
+
+    # Each metric: its name, type, help text and samples.
+    families = [
+        ('stage_seconds_total', 'counter', 'Time spent in each stage.',
+         [(dict(labels, stage=stage), metrics['stages'][stage])
+          for labels, metrics in samples for stage in STAGES]),
+        ('frames_total', 'counter', 'Frames by outcome.',
+         [(dict(labels, outcome=outcome), value)
+          for labels, metrics in samples
+          for outcome, value in sorted(metrics['frames'].items())]),
+        ('seeks_total', 'counter', 'Seeks performed on the stream.',
+         [(labels, metrics['seeks']) for labels, metrics in samples]),
+        ('written_bytes_total', 'counter', 'Size of the images written.',
+         [(labels, metrics['bytes']) for labels, metrics in samples]),
+        ('queue_depth_mean', 'gauge',
+         'Mean number of frames waiting to be written.',
+         [(labels, metrics['queue']['mean']) for labels, metrics in samples]),
+        ('queue_depth_max', 'gauge',
+         'Maximum number of frames waiting to be written.',
+         [(labels, metrics['queue']['max']) for labels, metrics in samples]),
+        ('elapsed_seconds', 'gauge', 'Elapsed time of the extraction.',
+         [(labels, metrics['seconds']) for labels, metrics in samples])
+    ]
+
+    lines = []
+
+    for name, metric_type, help_text, values in families:
+        lines.append('# HELP {}_{} {}'.format(prefix, name, help_text))
+        lines.append('# TYPE {}_{} {}'.format(prefix, name, metric_type))
+
+        for labels, value in values:
+            lines.append('{}_{}{} {}'.format(
+                prefix, name, label_text(labels),
+                value if isinstance(value, int) else repr(float(value))))
+
+    # So a stale file can be told apart.
+    lines.append('# HELP {}_last_update_seconds Time of the last update.'.
+                 format(prefix))
+    lines.append('# TYPE {}_last_update_seconds gauge'.format(prefix))
+    lines.append('{}_last_update_seconds {}'.format(prefix, repr(time())))
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(file: str, text: str) -> None:
+    """
+    Replace a text file at once, so a scraper never reads it partially.
+
+    ---
+    Arguments
+    ---
+
+        file (str)
+    The path of the file.
+
+        text (str)
+    The new contents.
+    """
+
+    temp_file = '{}.{}.tmp'.format(file, getpid())
+
+    with open(temp_file, 'w') as stream:
+        stream.write(text)
+
+    replace(temp_file, file)
+
+
+class MetricsExporter:
+    """
+    Thread that rewrites a Prometheus textfile with the metrics of a running
+    extraction, e.g., for the textfile collector of the node exporter.
+
+    Like the progress line, it polls the counters updated by the extraction
+    anyway, so its cost doesn't depend on the number of frames.
+    """
+
+    def __init__(self,
+                 poll: Callable[[], dict],
+                 file: str,
+                 labels: Optional[Dict[str, str]] = None,
+                 interval: float = METRICS_INTERVAL) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            poll (Callable[[], dict])
+        Return the current metrics. See `extraction_metrics()`.
+
+            file (str)
+        The path of the textfile. It should end with `.prom`.
+
+            labels (Optional[Dict[str, str]], None)
+        The labels of all the samples, e.g., the video name.
+
+            interval (float, METRICS_INTERVAL)
+        Period, in seconds, between two rewrites.
+        """
+
+        self.poll = poll
+        self.file = path.abspath(file)
+        self.labels = labels or {}
+        self.interval = interval
+
+        self._stop = Event()
+        self._thread = None
+
+    def __enter__(self) -> 'MetricsExporter':
+        self.start()
+
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """
+        Start rewriting the textfile.
+        """
+
+        self._stop.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop rewriting the textfile, after a last rewrite.
+        """
+
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+        self.export()
+
+    def export(self) -> None:
+        """
+        Rewrite the textfile with the current metrics.
+        """
+
+        write_textfile(self.file,
+                       prometheus_text([(self.labels, self.poll())]))
+
+    def _run(self) -> None:
+        """
+        Rewrite the textfile until stopped.
+        """
+
+        while not self._stop.wait(self.interval):
+            self.export()
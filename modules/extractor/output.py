@@ -0,0 +1,198 @@
+"""
+Settings of how the extracted frames are encoded and stored.
+"""
+
+from typing import Any, Callable, Optional, Tuple
+
+from modules.extractor.codecs import ImageCodec
+
+from modules.extractor.constants import (DEFAULT_QUEUE_SIZE,
+                                         DEFAULT_SHARD_SIZE, DEFAULT_WRITERS)
+
+from modules.extractor.dataset import FrameDataset
+
+from modules.extractor.sinks import OUTPUT_MODES as SINK_MODES, open_sink
+
+from modules.extractor.writer import FrameWriter
+
+# Ways of storing the frames: encoded by a sink, or all in an array file.
+OUTPUT_MODES = SINK_MODES + ('dataset', )
+
+
+class OutputOptions:
+    """
+    Settings of how the extracted frames are encoded and stored.
+
+    It holds only plain values, so it can be sent to other processes.
+
+    ---
+    Attributes
+    ---
+
+        writers (int)
+    Number of threads encoding and writing the images.
+
+        queue_size (int)
+    Maximum number of frames waiting to be written.
+
+        mode (str)
+    How to store the images: `'files'`, `'tar'`, `'stream'` for a stream of
+    images in the order of the frames, or `'dataset'` for a single array file
+    of the raw frames, ignoring the image format.
+
+        shard_size (int)
+    The maximum size, in bytes, of each tar shard.
+
+        image_format (str)
+    The format of the images. See `modules.extractor.codecs.IMAGE_FORMATS`.
+
+        quality (Optional[int])
+    The JPEG or WebP quality, from 0 to 100, or None for the OpenCV one.
+
+        png_compression (Optional[int])
+    The PNG compression level, from 0 to 9, or None for the OpenCV one.
+
+        jpeg_optimize (bool)
+    Set whether to optimize the JPEG Huffman tables.
+
+        jpeg_progressive (bool)
+    Set whether to encode progressive JPEG images.
+    """
+
+    def __init__(self,
+                 writers: int = DEFAULT_WRITERS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 mode: str = 'files',
+                 shard_size: int = DEFAULT_SHARD_SIZE,
+                 image_format: str = 'jpg',
+                 quality: Optional[int] = None,
+                 png_compression: Optional[int] = None,
+                 jpeg_optimize: bool = False,
+                 jpeg_progressive: bool = False) -> None:
+        self.writers = writers
+        self.queue_size = queue_size
+        self.mode = mode
+        self.shard_size = shard_size
+        self.image_format = image_format
+        self.quality = quality
+        self.png_compression = png_compression
+        self.jpeg_optimize = jpeg_optimize
+        self.jpeg_progressive = jpeg_progressive
+
+    def codec(self) -> ImageCodec:
+        """
+        Return the encoder of the images.
+
+        ---
+        Returns
+        ---
+
+            ImageCodec
+        The encoder.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If some encoder setting is invalid.
+        """
+
+        return ImageCodec(self.image_format, self.quality,
+                          self.png_compression, self.jpeg_optimize,
+                          self.jpeg_progressive)
+
+    def validate(self) -> None:
+        """
+        Check whether the settings are valid.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If some setting is invalid.
+        """
+
+        if self.mode not in OUTPUT_MODES:
+            raise ValueError('The output mode must be one of {}'.format(
+                ', '.join(OUTPUT_MODES)))
+
+        if self.shard_size < 1:
+            raise ValueError('The shard size must be greater than zero')
+
+        self.codec()
+
+    def open_writer(self,
+                    output_dir: str,
+                    prefix: str,
+                    on_written: Callable[[Any, str, int], None] = None
+                    ) -> FrameWriter:
+        """
+        Start the threads that encode and store the images in a folder.
+
+        ---
+        Arguments
+        ---
+
+            output_dir (str)
+        The path of an existing output folder or, in the stream mode, of the
+        file or named pipe to write, or `modules.extractor.sinks.STDOUT`.
+
+            prefix (str)
+        The prefix of the shard filenames, in the tar mode.
+
+            on_written (Callable[[Any, str, int], None], None)
+        Called with the tag, the filename and the size of each image stored.
+
+        ---
+        Returns
+        ---
+
+            FrameWriter
+        The writer, which must be closed after the last image is submitted.
+        """
+
+        return FrameWriter(
+            open_sink(output_dir, self.mode, prefix, self.shard_size),
+            self.writers, self.queue_size, self.codec(), on_written)
+
+    def open_dataset(self,
+                     output_dir: str,
+                     prefix: str,
+                     frames: int,
+                     frame_shape: Tuple[int, ...],
+                     on_written: Callable[[Any, str, int], None] = None
+                     ) -> FrameDataset:
+        """
+        Create the array file storing the frames in the dataset mode.
+
+        ---
+        Arguments
+        ---
+
+            output_dir (str)
+        The path of an existing output folder.
+
+            prefix (str)
+        The filename prefix, e.g., the video name.
+
+            frames (int)
+        The maximum number of frames.
+
+            frame_shape (Tuple[int, ...])
+        The shape of each frame.
+
+            on_written (Callable[[Any, str, int], None], None)
+        Called with the tag, the filename and the size of each frame stored.
+
+        ---
+        Returns
+        ---
+
+            FrameDataset
+        The dataset, which must be closed after the last frame is added.
+        """
+
+        return FrameDataset(output_dir, prefix, frames, frame_shape,
+                            on_written=on_written)
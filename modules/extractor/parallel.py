@@ -0,0 +1,362 @@
+"""
+Extraction of a video split into segments processed in parallel.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from typing import AbstractSet, List, Optional, Sequence, Tuple
+
+import cv2
+
+import numpy as np
+
+from modules.extractor.constants import SEEK_MIN_STRIDE
+
+from modules.extractor.index import FrameIndex
+
+from modules.extractor.manifest import ExtractionManifest, part_file
+
+from modules.extractor.output import OutputOptions
+
+from modules.extractor.reader import (ReadCounters, read_seeking, read_targets,
+                                      selected_indices)
+
+from modules.extractor.schedule import FrameSchedule
+
+from modules.extractor.transform import (BufferPool, BufferRing,
+                                         FrameTransform)
+
+from modules.extractor.writer import WriteCounters, frame_name
+
+
+def split_segments(offset: int, frames: int,
+                   segments: int) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split the frame range `[offset, frames)` into contiguous segments.
+
+    The last segment has no end, so the frames beyond an inaccurate total of
+    frames are still read.
+
+    ---
+    Arguments
+    ---
+
+        offset (int)
+    The index of the first frame to be extracted.
+
+        frames (int)
+    The total of frames.
+
+        segments (int)
+    The number of segments.
+
+    ---
+    Returns
+    ---
+
+        List[Tuple[int, Optional[int]]]
+    The start and the end, exclusive, of each segment.
+    """
+
+    # Don't make empty segments.
+    segments = max(1, min(int(segments), frames - offset))
+
+    size = (frames - offset) / segments
+
+    bounds = [offset + round(size * i) for i in range(segments)] + [None]
+
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def extract_segment(video_file: str,
+                    output_dir: str,
+                    video_name: str,
+                    fps: float,
+                    offset: int,
+                    extraction_rate: int,
+                    start: int,
+                    end: Optional[int],
+                    options: OutputOptions,
+                    prefix: str,
+                    transform: Optional[FrameTransform] = None,
+                    targets: Optional[Sequence[int]] = None,
+                    first_extracted: int = 0,
+                    manifest_file: Optional[str] = None,
+                    done: AbstractSet[int] = frozenset(),
+                    index: Optional[FrameIndex] = None
+                    ) -> Tuple[ReadCounters, WriteCounters]:
+    """
+    Extract the selected frames of a segment with its own video stream.
+
+    The global selection is kept, that is, only the offset and every
+    `extraction_rate`-th frame after it, or the scheduled frames, are
+    extracted, and they are numbered as in a sequential extraction of the
+    whole video.
+
+    ---
+    Arguments
+    ---
+
+        video_file (str)
+    The path of the input video file.
+
+        output_dir (str)
+    The path of the output folder.
+
+        video_name (str)
+    The input video filename, without its extension.
+
+        fps (float)
+    The frame rate of the video.
+
+        offset (int)
+    The index of the first frame to be extracted.
+
+        extraction_rate (int)
+    The frame interval between one extracted frame and another.
+
+        start (int)
+    The index of the first frame of the segment.
+
+        end (Optional[int])
+    The index after the last frame of the segment, or None to read until the
+    end of the stream.
+
+        options (OutputOptions)
+    How to encode and store the images.
+
+        prefix (str)
+    The prefix of the shard filenames of the segment, in the tar mode.
+
+        transform (Optional[FrameTransform], None)
+    The crop, resize and color conversion of the frames, if any.
+
+        targets (Optional[Sequence[int]], None)
+    The sorted indices of the scheduled frames in the segment. If defined, the
+    offset, the extraction rate, the start and the end are ignored.
+
+        first_extracted (int, 0)
+    The position of the first target among all the scheduled frames.
+
+        manifest_file (Optional[str], None)
+    The path of the part of the manifest where the images written are
+    recorded, if any.
+
+        done (AbstractSet[int], frozenset())
+    The indices among the extracted frames of the images written by a previous
+    run, which are skipped.
+
+        index (Optional[FrameIndex], None)
+    The time and the keyframe flag of every frame, if the video is indexed.
+
+    ---
+    Returns
+    ---
+
+        Tuple[ReadCounters, WriteCounters]
+    The counters of the frames read and of the images written.
+    """
+
+    video_stream = cv2.VideoCapture(video_file)
+
+    counters = ReadCounters()
+
+    # Seek only where it saves decoding, if the keyframes are known.
+    keyframes = index.keyframes if index is not None else None
+
+    manifest = None
+
+    # Record the images written in a part of the manifest.
+    if manifest_file is not None:
+        manifest = ExtractionManifest(manifest_file)
+        manifest.open()
+
+    try:
+        with options.open_writer(
+                output_dir, prefix,
+                manifest.add if manifest is not None else None
+        ) as frame_writer:
+
+            # A frame is reused only after the writer is done with it.
+            pool = BufferPool(frame_writer.capacity + 1)
+
+            # A decoded frame is needed only until transformed into another
+            # array.
+            decoded_ring = pool
+
+            if transform is not None and not transform.is_identity:
+                decoded_ring = BufferRing(1)
+
+            if targets is None:
+
+                # The first selected frame in the segment.
+                first = offset + -(-(max(start, offset) - offset) //
+                                   extraction_rate) * extraction_rate
+
+                # Skip the frames extracted by a previous run.
+                if done:
+                    reader = read_targets(
+                        video_stream,
+                        (frame_index for frame_index in selected_indices(
+                            first, extraction_rate, end or 0)
+                         if (frame_index - offset) //
+                         extraction_rate not in done), counters,
+                        SEEK_MIN_STRIDE, keyframes, decoded_ring)
+
+                else:
+                    reader = read_seeking(video_stream, first,
+                                          extraction_rate, end or 0, counters,
+                                          SEEK_MIN_STRIDE, keyframes,
+                                          decoded_ring)
+
+            else:
+                reader = read_targets(
+                    video_stream,
+                    (frame_index for i, frame_index in enumerate(targets)
+                     if first_extracted + i not in done), counters,
+                    SEEK_MIN_STRIDE, keyframes, decoded_ring)
+
+            for frame_index, frame in reader:
+
+                if transform is not None:
+                    frame = transform.apply_into(frame, pool)
+
+                # Number the frame as in a sequential extraction.
+                if targets is None:
+                    extracted_index = (frame_index - offset) // extraction_rate
+
+                else:
+                    extracted_index = first_extracted + int(
+                        np.searchsorted(targets, frame_index))
+
+                # The exact time, if the video is indexed.
+                if index is not None and frame_index < index.frames:
+                    timestamp = index.timestamp(frame_index)
+
+                else:
+                    timestamp = (1 / fps) * frame_index
+
+                frame_writer.submit(
+                    frame_name(video_name, extracted_index, frame_index,
+                               timestamp), frame,
+                    (extracted_index, frame_index), pool.release)
+
+    finally:
+        video_stream.release()
+
+        if manifest is not None:
+            manifest.close()
+
+    return counters, frame_writer.counters
+
+
+def extract_parallel(video_file: str,
+                     output_dir: str,
+                     video_name: str,
+                     fps: float,
+                     frames: int,
+                     offset: int,
+                     extraction_rate: int,
+                     jobs: int,
+                     options: OutputOptions,
+                     transform: Optional[FrameTransform] = None,
+                     schedule: Optional[FrameSchedule] = None,
+                     manifest_file: Optional[str] = None,
+                     done: AbstractSet[int] = frozenset(),
+                     index: Optional[FrameIndex] = None
+                     ) -> Tuple[ReadCounters, WriteCounters]:
+    """
+    Extract the selected frames of a video with a pool of processes, each one
+    handling a segment of it.
+
+    ---
+    Arguments
+    ---
+
+        video_file (str)
+    The path of the input video file.
+
+        output_dir (str)
+    The path of the output folder.
+
+        video_name (str)
+    The input video filename, without its extension.
+
+        fps (float)
+    The frame rate of the video.
+
+        frames (int)
+    The total of frames.
+
+        offset (int)
+    The index of the first frame to be extracted.
+
+        extraction_rate (int)
+    The frame interval between one extracted frame and another.
+
+        jobs (int)
+    The number of processes and segments.
+
+        options (OutputOptions)
+    How to encode and store the images. Each process has its own writer and,
+    in the tar mode, its own shards.
+
+        transform (Optional[FrameTransform], None)
+    The crop, resize and color conversion of the frames, if any.
+
+        schedule (Optional[FrameSchedule], None)
+    The frame indices to extract, instead of the ones selected by the
+    extraction rate and the offset. It is split by number of targets.
+
+        manifest_file (Optional[str], None)
+    The path of the manifest where the images written are recorded, if any.
+    Each process records them in its own part.
+
+        done (AbstractSet[int], frozenset())
+    The indices among the extracted frames of the images written by a previous
+    run, which are skipped.
+
+        index (Optional[FrameIndex], None)
+    The time and the keyframe flag of every frame, if the video is indexed.
+
+    ---
+    Returns
+    ---
+
+        Tuple[ReadCounters, WriteCounters]
+    The counters of the frames read and of the images written, summed over all
+    segments.
+    """
+
+    # Each segment gets a slice of the schedule, or a range of frames.
+    if schedule is not None:
+        segments = [(None, None, first, targets)
+                    for first, targets in schedule.split(jobs)]
+
+    else:
+        segments = [(start, end, 0, None)
+                    for start, end in split_segments(offset, frames, jobs)]
+
+    counters = ReadCounters()
+    write_counters = WriteCounters()
+
+    with ProcessPoolExecutor(len(segments)) as executor:
+        futures = [
+            executor.submit(extract_segment, video_file, output_dir,
+                            video_name, fps, offset, extraction_rate, start,
+                            end, options, '{}-{:03d}'.format(video_name, i),
+                            transform, targets, first,
+                            part_file(manifest_file, i)
+                            if manifest_file is not None else None, done,
+                            index)
+            for i, (start, end, first, targets) in enumerate(segments)
+        ]
+
+        # Sum the results, raising the first error.
+        for future in futures:
+            segment_counters, segment_write_counters = future.result()
+
+            counters.merge(segment_counters)
+            write_counters.merge(segment_write_counters)
+
+    return counters, write_counters
@@ -0,0 +1,263 @@
+"""
+Metadata of video files, cached next to them and read without importing any
+video library when cached.
+"""
+
+from json import dumps, loads
+
+from os import getpid, path, replace, stat
+
+from typing import Dict, Iterable, Iterator, Optional
+
+from modules.extractor.constants import (PROBE_CACHE_FILENAME,
+                                         PROBE_CACHE_VERSION)
+
+
+def probe_video(video_file: str) -> dict:
+    """
+    Read the metadata of a video file, as reported by its container.
+
+    ---
+    Arguments
+    ---
+
+        video_file (str)
+    The path of the video file.
+
+    ---
+    Returns
+    ---
+
+        dict
+    The `frames`, the `fps`, the `width`, the `height`, the `duration`, in
+    seconds, and the `codec` FOURCC.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If the file is not a valid video file.
+    """
+
+    # Imported only when some video is not cached.
+    import cv2
+
+    from modules.extractor.reader import capture_property
+
+    video_stream = cv2.VideoCapture(video_file)
+
+    try:
+        if not video_stream.isOpened():
+            raise ValueError('Not a valid video file: {}'.format(video_file))
+
+        frames = int(video_stream.get(capture_property('FRAME_COUNT')))
+        fps = float(video_stream.get(capture_property('FPS')))
+        fourcc = int(video_stream.get(capture_property('FOURCC')))
+
+        return {
+            'frames': frames,
+            'fps': fps,
+            'width': int(video_stream.get(capture_property('FRAME_WIDTH'))),
+            'height': int(video_stream.get(capture_property('FRAME_HEIGHT'))),
+            'duration': frames / fps if fps > 0 else 0.0,
+            'codec': ''.join(
+                chr((fourcc >> shift) & 0xFF)
+                for shift in (0, 8, 16, 24)).strip('\0 ') or None
+        }
+
+    finally:
+        video_stream.release()
+
+
+class ProbeCache:
+    """
+    Metadata of the videos of a folder, stored in a sidecar file in it.
+
+    Each entry is keyed by the filename, and is valid while the size and the
+    modification time of the file are the same, so a cached video costs a
+    `stat()`.
+    """
+
+    def __init__(self, folder: str) -> None:
+        """
+        Read the sidecar file of a folder, if any.
+
+        ---
+        Arguments
+        ---
+
+            folder (str)
+        The path of the folder of the videos.
+        """
+
+        self.file = path.join(path.abspath(folder), PROBE_CACHE_FILENAME)
+
+        self._entries = {}  # type: Dict[str, dict]
+        self._changed = False
+
+        try:
+            with open(self.file) as stream:
+                data = loads(stream.read())
+
+            if data.get('version') == PROBE_CACHE_VERSION:
+                self._entries = data['videos']
+
+        # No sidecar yet, or it is broken.
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    def get(self, video_file: str) -> dict:
+        """
+        Return the metadata of a video of the folder, probing it only if not
+        cached or changed.
+
+        ---
+        Arguments
+        ---
+
+            video_file (str)
+        The path of the video file.
+
+        ---
+        Returns
+        ---
+
+            dict
+        The metadata. See `probe_video()`.
+
+        ---
+        Raises
+        ---
+
+            OSError
+        If the file doesn't exist.
+
+            ValueError
+        If the file is not a valid video file.
+        """
+
+        info = stat(video_file)
+        name = path.basename(video_file)
+
+        entry = self._entries.get(name)
+
+        if entry is not None and entry['size'] == info.st_size and entry[
+                'mtime_ns'] == info.st_mtime_ns:
+
+            # The invalid files are cached too.
+            if entry.get('error') is not None:
+                raise ValueError(entry['error'])
+
+            return entry['metadata']
+
+        entry = {'size': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+        try:
+            entry['metadata'] = probe_video(video_file)
+
+        except ValueError as e:
+            entry['error'] = str(e)
+
+        self._entries[name] = entry
+        self._changed = True
+
+        if 'error' in entry:
+            raise ValueError(entry['error'])
+
+        return entry['metadata']
+
+    def save(self) -> bool:
+        """
+        Replace the sidecar file at once, if some entry changed.
+
+        ---
+        Returns
+        ---
+
+            bool
+        False if the folder is not writable, so nothing could be cached.
+        """
+
+        if not self._changed:
+            return True
+
+        temp_file = '{}.{}.tmp'.format(self.file, getpid())
+
+        try:
+            with open(temp_file, 'w') as stream:
+                stream.write(
+                    dumps({
+                        'version': PROBE_CACHE_VERSION,
+                        'videos': self._entries
+                    }))
+
+            replace(temp_file, self.file)
+
+        # E.g., a read-only folder.
+        except OSError:
+            return False
+
+        self._changed = False
+
+        return True
+
+
+def probe_videos(video_files: Iterable[str],
+                 use_cache: bool = True) -> Iterator[dict]:
+    """
+    Read the metadata of many video files, using the cache of their folders.
+
+    The sidecar files are saved when the folder of the next video differs and
+    at the end, so the files should be sorted by folder.
+
+    ---
+    Arguments
+    ---
+
+        video_files (Iterable[str])
+    The paths of the video files.
+
+        use_cache (bool, True)
+    Set whether to read and update the sidecar files.
+
+    ---
+    Yields
+    ---
+
+        dict
+    The absolute `path` of each video and its metadata, or the `error`
+    message. See `probe_video()`.
+    """
+
+    cache = None  # type: Optional[ProbeCache]
+
+    try:
+        for video_file in map(path.abspath, video_files):
+            folder = path.dirname(video_file)
+
+            # Switch to the sidecar of the folder.
+            if use_cache and (cache is None
+                              or path.dirname(cache.file) != folder):
+                if cache is not None:
+                    cache.save()
+
+                cache = ProbeCache(folder)
+
+            try:
+                metadata = cache.get(video_file) if use_cache else probe_video(
+                    video_file)
+
+            except (OSError, ValueError) as e:
+                yield {
+                    'path': video_file,
+                    'error': getattr(e, 'strerror', None) or str(e)
+                }
+
+                continue
+
+            yield dict(path=video_file, **metadata)
+
+    finally:
+        if cache is not None:
+            cache.save()
@@ -0,0 +1,625 @@
+"""
+Frame reading strategies for the video stream.
+"""
+
+from bisect import bisect_right
+
+from itertools import count
+
+from time import perf_counter
+
+from typing import (Any, Callable, Iterable, Iterator, Optional, Sequence,
+                    Tuple)
+
+import cv2
+
+from modules.extractor.constants import SEEK_MIN_STRIDE, TIME_TOLERANCE
+
+from modules.extractor.transform import BufferRing
+
+
+class ReadCounters:
+    """
+    Counters of the frames read from a video stream.
+
+    ---
+    Attributes
+    ---
+
+        skipped (int)
+    Number of frames that were only grabbed, without being decoded.
+
+        decoded (int)
+    Number of frames that were grabbed and decoded.
+
+        seeks (int)
+    Number of seeks performed on the stream.
+
+        rejected (int)
+    Number of decoded frames rejected for being in the same scene.
+
+        duplicates (int)
+    Number of decoded frames rejected for looking like an extracted one.
+
+        resumed (int)
+    Number of frames not read, since extracted by a previous run.
+
+        grab_time (float)
+    Time spent grabbing frames, in seconds.
+
+        retrieve_time (float)
+    Time spent decoding the grabbed frames, in seconds.
+
+        selection_time (float)
+    Time spent testing the decoded frames for scene changes and duplicates,
+    in seconds.
+    """
+
+    def __init__(self) -> None:
+        self.skipped = 0
+        self.decoded = 0
+        self.seeks = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.resumed = 0
+
+        self.grab_time = 0.0
+        self.retrieve_time = 0.0
+        self.selection_time = 0.0
+
+    @property
+    def total(self) -> int:
+        """
+        Total of frames read from the stream.
+        """
+
+        return self.skipped + self.decoded
+
+    def merge(self, other: 'ReadCounters') -> None:
+        """
+        Add the counters of another read, e.g., of a segment of the video.
+
+        ---
+        Arguments
+        ---
+
+            other (ReadCounters)
+        The counters to add.
+        """
+
+        for name, value in vars(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+
+def grab(video_stream: Any, counters: ReadCounters) -> bool:
+    """
+    Advance a video stream to its next frame, without decoding it.
+
+    ---
+    Arguments
+    ---
+
+        video_stream (cv2.VideoCapture)
+    An opened video stream.
+
+        counters (ReadCounters)
+    Counters to update with the time spent.
+
+    ---
+    Returns
+    ---
+
+        bool
+    False if there are no more frames.
+    """
+
+    start_time = perf_counter()
+
+    grabbed = video_stream.grab()
+
+    counters.grab_time += perf_counter() - start_time
+
+    return grabbed
+
+
+def retrieve(video_stream: Any,
+             counters: ReadCounters,
+             ring: Optional[BufferRing] = None) -> Optional[Any]:
+    """
+    Decode the last grabbed frame of a video stream.
+
+    ---
+    Arguments
+    ---
+
+        video_stream (cv2.VideoCapture)
+    An opened video stream.
+
+        counters (ReadCounters)
+    Counters to update with the number of decoded frames and the time spent.
+
+        ring (Optional[BufferRing], None)
+    The ring of arrays where to decode the frame, reused when they have the
+    frame shape. If None, a new array is allocated.
+
+    ---
+    Returns
+    ---
+
+        Optional[numpy.ndarray]
+    The BGR image, or None if the stream is broken.
+    """
+
+    start_time = perf_counter()
+
+    retrieved, frame = video_stream.retrieve(
+        ring.reuse() if ring is not None else None)
+
+    counters.retrieve_time += perf_counter() - start_time
+
+    if not retrieved:
+        return None
+
+    if ring is not None:
+        ring.keep(frame)
+
+    counters.decoded += 1
+
+    return frame
+
+
+def keyframe_before(keyframes: Sequence[int], frame_index: int) -> int:
+    """
+    Return the last keyframe at or before a frame, where the decoding of the
+    frame starts after a seek.
+
+    ---
+    Arguments
+    ---
+
+        keyframes (Sequence[int])
+    The sorted indices of the keyframes.
+
+        frame_index (int)
+    The frame index.
+
+    ---
+    Returns
+    ---
+
+        int
+    The keyframe index, or 0 if there is none before the frame.
+    """
+
+    position = bisect_right(keyframes, frame_index)
+
+    return int(keyframes[position - 1]) if position > 0 else 0
+
+
+def read_selected(video_stream: Any,
+                  can_extract: Callable[[int], bool],
+                  counters: ReadCounters = None,
+                  start_index: int = 0,
+                  ring: Optional[BufferRing] = None
+                  ) -> Iterator[Tuple[int, Any]]:
+    """
+    Read the frames from a video stream, decoding only the selected ones.
+
+    Each frame is first advanced with `grab()`, which only demuxes it, and
+    `retrieve()` is called only for the frames accepted by `can_extract`, so
+    the skipped ones never pay for the decoding and the color conversion.
+
+    ---
+    Arguments
+    ---
+
+        video_stream (cv2.VideoCapture)
+    An opened video stream.
+
+        can_extract (Callable[[int], bool])
+    Check whether to extract the image from a frame at some index.
+
+        counters (ReadCounters, None)
+    Counters to update with the number of skipped and decoded frames.
+
+        start_index (int, 0)
+    The index of the next frame in the stream.
+
+        ring (Optional[BufferRing], None)
+    The ring of arrays where to decode the frames, if any. Each frame is
+    overwritten once the ring wraps around.
+
+    ---
+    Yields
+    ---
+
+        Tuple[int, numpy.ndarray]
+    The index and the image of each selected frame.
+    """
+
+    # If no counters were provided,...
+    if counters is None:
+
+        # ... use some that will be discarded.
+        counters = ReadCounters()
+
+    # Start a counter for all frames read.
+    frame_index = start_index - 1
+
+    while True:
+
+        # Advance to the next frame, without decoding it.
+        if not grab(video_stream, counters):
+            break
+
+        frame_index += 1
+
+        # Check whether to extract the image from the frame.
+        if not can_extract(frame_index):
+            counters.skipped += 1
+
+            continue
+
+        # Decode the grabbed frame.
+        frame = retrieve(video_stream, counters, ring)
+
+        # If it isn't successful, the stream is broken.
+        if frame is None:
+            break
+
+        yield frame_index, frame
+
+
+def can_extract_at(index: int, extraction_rate: int, offset: int) -> bool:
+    """
+    Check whether to extract the image from a frame at `index`.
+
+    ---
+    Arguments
+    ---
+
+        index (int)
+    The current frame index.
+
+        extraction_rate (int)
+    The frame interval between one extracted frame and another.
+
+        offset (int)
+    The index of the first frame to be extracted.
+
+    ---
+    Returns
+    ---
+
+        bool
+    True if the image from the frame can be extracted.
+    """
+
+    return index >= offset and (index % extraction_rate) + offset == (
+        offset % extraction_rate) + offset
+
+
+def capture_property(name: str) -> int:
+    """
+    Return the identifier of a video stream property, for any `cv2` version.
+
+    ---
+    Arguments
+    ---
+
+        name (str)
+    The property name, without the `CAP_PROP_` prefix. E.g.: `'FPS'`.
+
+    ---
+    Returns
+    ---
+
+        int
+    The `cv2` property identifier.
+    """
+
+    # Only needed here, so it isn't imported by the modules that never read.
+    from imutils import is_cv2
+
+    return getattr(cv2.cv, 'CV_CAP_PROP_' + name) if is_cv2() else getattr(
+        cv2, 'CAP_PROP_' + name)
+
+
+def selected_indices(offset: int,
+                     extraction_rate: int,
+                     frames: int = 0) -> Iterable[int]:
+    """
+    Return the indices of the frames accepted by the extraction parameters.
+
+    These are the same indices accepted by `can_extract_at()`, that is, the
+    offset and every `extraction_rate`-th frame after it.
+
+    ---
+    Arguments
+    ---
+
+        offset (int)
+    The index of the first frame to be extracted.
+
+        extraction_rate (int)
+    The frame interval between one extracted frame and another.
+
+        frames (int, 0)
+    The total of frames. If not positive, the indices never end.
+
+    ---
+    Returns
+    ---
+
+        Iterable[int]
+    The selected frame indices, in ascending order.
+    """
+
+    # The total of frames is unknown.
+    if frames <= 0:
+        return count(offset, extraction_rate)
+
+    return range(offset, frames, extraction_rate)
+
+
+def read_seeking(video_stream: Any,
+                 offset: int,
+                 extraction_rate: int,
+                 frames: int = 0,
+                 counters: ReadCounters = None,
+                 min_stride: int = SEEK_MIN_STRIDE,
+                 keyframes: Optional[Sequence[int]] = None,
+                 ring: Optional[BufferRing] = None
+                 ) -> Iterator[Tuple[int, Any]]:
+    """
+    Read the selected frames from a video stream, jumping straight to them.
+
+    See `read_targets()`.
+
+    ---
+    Arguments
+    ---
+
+        video_stream (cv2.VideoCapture)
+    An opened video stream, positioned at its first frame.
+
+        offset (int)
+    The index of the first frame to be extracted.
+
+        extraction_rate (int)
+    The frame interval between one extracted frame and another.
+
+        frames (int, 0)
+    The total of frames. If not positive, it reads until the end of the stream.
+
+        counters (ReadCounters, None)
+    Counters to update with the number of skipped and decoded frames and seeks.
+
+        min_stride (int, SEEK_MIN_STRIDE)
+    Minimum distance, in frames, for seeking to be used.
+
+        keyframes (Optional[Sequence[int]], None)
+    The sorted indices of the keyframes of the video, if known.
+
+        ring (Optional[BufferRing], None)
+    The ring of arrays where to decode the frames, if any. Each frame is
+    overwritten once the ring wraps around.
+
+    ---
+    Yields
+    ---
+
+        Tuple[int, numpy.ndarray]
+    The index and the image of each selected frame.
+    """
+
+    return read_targets(video_stream,
+                        selected_indices(offset, extraction_rate, frames),
+                        counters, min_stride, keyframes, ring)
+
+
+def read_targets(video_stream: Any,
+                 targets: Iterable[int],
+                 counters: ReadCounters = None,
+                 min_stride: Optional[int] = SEEK_MIN_STRIDE,
+                 keyframes: Optional[Sequence[int]] = None,
+                 ring: Optional[BufferRing] = None
+                 ) -> Iterator[Tuple[int, Any]]:
+    """
+    Read some frames from a video stream, jumping straight to them.
+
+    The stream is seeked to each target index whose distance from the current
+    position is at least `min_stride` frames, and the closer ones are reached
+    by grabbing. After each seek, the position reported by the stream is
+    checked against the requested index, so the yielded indices are always
+    correct. If the container seeks inaccurately, the stream is rewound and it
+    falls back to sequential reading.
+
+    When the keyframes are known, a seek is also skipped if the last keyframe
+    before the target is not after the current position, since the decoder
+    would restart from it anyway.
+
+    ---
+    Arguments
+    ---
+
+        video_stream (cv2.VideoCapture)
+    An opened video stream, positioned at its first frame.
+
+        targets (Iterable[int])
+    The indices of the frames to read, in ascending order, without repetition.
+
+        counters (ReadCounters, None)
+    Counters to update with the number of skipped and decoded frames and seeks.
+
+        min_stride (Optional[int], SEEK_MIN_STRIDE)
+    Minimum distance, in frames, for seeking to be used. If None, the targets
+    are reached only by grabbing.
+
+        keyframes (Optional[Sequence[int]], None)
+    The sorted indices of the keyframes of the video, if known.
+
+        ring (Optional[BufferRing], None)
+    The ring of arrays where to decode the frames, if any. Each frame is
+    overwritten once the ring wraps around.
+
+    ---
+    Yields
+    ---
+
+        Tuple[int, numpy.ndarray]
+    The index and the image of each target frame.
+    """
+
+    # If no counters were provided,...
+    if counters is None:
+
+        # ... use some that will be discarded.
+        counters = ReadCounters()
+
+    prop = capture_property('POS_FRAMES')
+
+    # Index of the next frame to be grabbed.
+    position = 0
+
+    # Seeking is disabled as soon as it proves to be inaccurate.
+    seeking = min_stride is not None
+
+    for target in map(int, targets):
+        seeked = False
+
+        # Jump to the target when it is far enough.
+        if seeking and target - position >= max(min_stride, 1) and (
+                keyframes is None
+                or keyframe_before(keyframes, target) > position):
+            video_stream.set(prop, target)
+            counters.seeks += 1
+
+            position = int(video_stream.get(prop))
+            seeked = True
+
+        # Reach the target by grabbing the frames in between.
+        while position < target:
+            if not grab(video_stream, counters):
+                return
+
+            counters.skipped += 1
+            position += 1
+
+        if not grab(video_stream, counters):
+            return
+
+        position += 1
+
+        # Check whether the grabbed frame is really the requested one.
+        if seeked and (position != target + 1
+                       or int(video_stream.get(prop)) != position):
+
+            # The container seeks inaccurately, so rewind the stream...
+            video_stream.set(prop, 0)
+            seeking = False
+
+            # ... and grab every frame up to the target.
+            position = 0
+
+            while position <= target:
+                if not grab(video_stream, counters):
+                    return
+
+                counters.skipped += 1
+                position += 1
+
+            # The target itself is decoded, not skipped.
+            counters.skipped -= 1
+
+        # Decode the grabbed frame.
+        frame = retrieve(video_stream, counters, ring)
+
+        # If it isn't successful, the stream is broken.
+        if frame is None:
+            return
+
+        yield target, frame
+
+
+def read_times(video_stream: Any,
+               times: Iterable[float],
+               counters: ReadCounters = None,
+               ring: Optional[BufferRing] = None
+               ) -> Iterator[Tuple[int, Any, float]]:
+    """
+    Read the first frame at or after each time from a video stream.
+
+    The frames are grabbed one by one and their presentation time is read from
+    the container, instead of being computed from the frame rate, so the
+    variable frame rate videos are handled correctly. A frame matching many
+    times is read only once.
+
+    ---
+    Arguments
+    ---
+
+        video_stream (cv2.VideoCapture)
+    An opened video stream, positioned at its first frame.
+
+        times (Iterable[float])
+    The times, in seconds, in ascending order.
+
+        counters (ReadCounters, None)
+    Counters to update with the number of skipped and decoded frames.
+
+        ring (Optional[BufferRing], None)
+    The ring of arrays where to decode the frames, if any. Each frame is
+    overwritten once the ring wraps around.
+
+    ---
+    Yields
+    ---
+
+        Tuple[int, numpy.ndarray, float]
+    The index, the image and the time, in seconds, of each frame read.
+    """
+
+    # If no counters were provided,...
+    if counters is None:
+
+        # ... use some that will be discarded.
+        counters = ReadCounters()
+
+    prop = capture_property('POS_MSEC')
+
+    times = iter(times)
+    target = next(times, None)
+
+    # Start a counter for all frames read.
+    frame_index = -1
+
+    while target is not None:
+
+        # Advance to the next frame, without decoding it.
+        if not grab(video_stream, counters):
+            return
+
+        frame_index += 1
+
+        # The time of the grabbed frame.
+        timestamp = video_stream.get(prop) / 1000
+
+        # Tolerate the rounding of the container time base.
+        if timestamp < target - TIME_TOLERANCE:
+            counters.skipped += 1
+
+            continue
+
+        # Skip all the times this frame matches.
+        while target is not None and target - TIME_TOLERANCE <= timestamp:
+            target = next(times, None)
+
+        # Decode the grabbed frame.
+        frame = retrieve(video_stream, counters, ring)
+
+        # If it isn't successful, the stream is broken.
+        if frame is None:
+            return
+
+        yield frame_index, frame, timestamp
@@ -0,0 +1,401 @@
+"""
+Frame selection by time or by explicit indices, compiled to a schedule.
+"""
+
+from itertools import count
+
+from re import fullmatch
+
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+def parse_time(text: str) -> float:
+    """
+    Parse a time in the forms `S`, `M:S` or `H:M:S`, with decimal seconds.
+
+    ---
+    Arguments
+    ---
+
+        text (str)
+    Some time. E.g.: `'90'`, `'1:30.5'` or `'00:01:30.500'`.
+
+    ---
+    Returns
+    ---
+
+        float
+    The time, in seconds.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If the string is not a valid time.
+    """
+
+    match = fullmatch(r'(?:(?:(\d+):)?(\d+):)?(\d+(?:\.\d*)?|\.\d+)',
+                      str(text).strip())
+
+    if match is None:
+        raise ValueError('Invalid time: {}'.format(text))
+
+    hours, minutes, seconds = match.groups()
+
+    return int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds)
+
+
+def parse_ranges(text: str) -> List[Tuple[int, int, int]]:
+    """
+    Parse a comma separated list of frame indices and ranges.
+
+    Each item is an index `N`, or an inclusive range `A-B`, optionally with a
+    step, `A-B:S`.
+
+    ---
+    Arguments
+    ---
+
+        text (str)
+    Some list of ranges. E.g.: `'0,10-20,100-200:5'`.
+
+    ---
+    Returns
+    ---
+
+        List[Tuple[int, int, int]]
+    The first index, the last index and the step of each range.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If some item is not a valid index or range.
+    """
+
+    ranges = []
+
+    for item in str(text).split(','):
+        item = item.strip()
+
+        # Ignore the empty items, e.g., of a trailing comma.
+        if not item:
+            continue
+
+        match = fullmatch(r'(\d+)(?:\s*-\s*(\d+)(?:\s*:\s*(\d+))?)?', item)
+
+        if match is None:
+            raise ValueError('Invalid frame range: {}'.format(item))
+
+        first = int(match.group(1))
+        last = first if match.group(2) is None else int(match.group(2))
+        step = 1 if match.group(3) is None else int(match.group(3))
+
+        if last < first or step < 1:
+            raise ValueError('Invalid frame range: {}'.format(item))
+
+        ranges.append((first, last, step))
+
+    return ranges
+
+
+def read_ranges_file(file: str) -> List[Tuple[int, int, int]]:
+    """
+    Read the frame indices and ranges listed in a text file.
+
+    Each line has an index or a range, as in `parse_ranges()`, or many of them
+    separated by commas. The empty lines and the ones starting with `#` are
+    ignored.
+
+    ---
+    Arguments
+    ---
+
+        file (str)
+    The path of the text file.
+
+    ---
+    Returns
+    ---
+
+        List[Tuple[int, int, int]]
+    The first index, the last index and the step of each range.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If some line is not valid.
+    """
+
+    ranges = []
+
+    with open(file) as lines:
+        for line in lines:
+            line = line.strip()
+
+            if line and not line.startswith('#'):
+                ranges.extend(parse_ranges(line))
+
+    return ranges
+
+
+class FrameSchedule:
+    """
+    Sorted targets of an extraction, computed before reading the video.
+
+    The targets are either frame indices, reached by seeking or grabbing
+    without testing every frame, or times, matched against the presentation
+    time of each frame, so the variable frame rate videos are handled
+    correctly.
+
+    ---
+    Attributes
+    ---
+
+        indices (Optional[numpy.ndarray])
+    The sorted and unique frame indices, for a schedule by index.
+
+        times (Optional[numpy.ndarray])
+    The sorted and unique times, in seconds, for a schedule by explicit times.
+
+        interval (Optional[float])
+    The time, in seconds, between two targets, for a periodic schedule.
+    """
+
+    def __init__(self,
+                 indices: Optional[Iterable[int]] = None,
+                 times: Optional[Iterable[float]] = None,
+                 interval: Optional[float] = None) -> None:
+        """
+        Exactly one of the arguments must be defined. See also the
+        `from_ranges()`, `at()` and `every()` constructors.
+
+        ---
+        Arguments
+        ---
+
+            indices (Optional[Iterable[int]], None)
+        The frame indices.
+
+            times (Optional[Iterable[float]], None)
+        The times, in seconds.
+
+            interval (Optional[float], None)
+        The time, in seconds, between two targets, starting at zero.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If not exactly one of the arguments is defined, or it is invalid.
+        """
+
+        if sum(arg is not None for arg in (indices, times, interval)) != 1:
+            raise ValueError(
+                'A schedule needs either frame indices, times or an interval')
+
+        self.indices = None
+        self.times = None
+        self.interval = None
+
+        if indices is not None:
+            self.indices = np.unique(np.asarray(list(indices), np.int64))
+
+            if self.indices.size and self.indices[0] < 0:
+                raise ValueError('The frame indices must be positive')
+
+        elif times is not None:
+            self.times = np.unique(np.asarray(list(times), np.float64))
+
+            if self.times.size and self.times[0] < 0:
+                raise ValueError('The times must be positive')
+
+        else:
+            self.interval = float(interval)
+
+            if self.interval <= 0:
+                raise ValueError('The interval must be greater than zero')
+
+    @classmethod
+    def from_ranges(cls, ranges: Iterable[Tuple[int, int, int]]
+                    ) -> 'FrameSchedule':
+        """
+        Create a schedule of the frames in some inclusive ranges.
+
+        ---
+        Arguments
+        ---
+
+            ranges (Iterable[Tuple[int, int, int]])
+        The first index, the last index and the step of each range.
+
+        ---
+        Returns
+        ---
+
+            FrameSchedule
+        The schedule.
+        """
+
+        chunks = [
+            np.arange(first, last + 1, step, dtype=np.int64)
+            for first, last, step in ranges
+        ]
+
+        return cls(indices=np.concatenate(chunks) if chunks else [])
+
+    @classmethod
+    def at(cls, times: Iterable[Union[str, float]]) -> 'FrameSchedule':
+        """
+        Create a schedule of the frames at some times.
+
+        ---
+        Arguments
+        ---
+
+            times (Iterable[Union[str, float]])
+        The times, in seconds or as strings accepted by `parse_time()`.
+
+        ---
+        Returns
+        ---
+
+            FrameSchedule
+        The schedule.
+        """
+
+        return cls(times=[
+            parse_time(time) if isinstance(time, str) else float(time)
+            for time in times
+        ])
+
+    @classmethod
+    def every(cls, interval: float) -> 'FrameSchedule':
+        """
+        Create a schedule of a frame every `interval` seconds.
+
+        ---
+        Arguments
+        ---
+
+            interval (float)
+        The time, in seconds, between two targets.
+
+        ---
+        Returns
+        ---
+
+            FrameSchedule
+        The schedule.
+        """
+
+        return cls(interval=interval)
+
+    @property
+    def is_timed(self) -> bool:
+        """
+        Whether the targets are times, instead of frame indices.
+        """
+
+        return self.indices is None
+
+    def describe(self) -> str:
+        """
+        Return a short description of the schedule.
+        """
+
+        if self.interval is not None:
+            return 'every {:g} seconds'.format(self.interval)
+
+        if self.times is not None:
+            return '{} times'.format(self.times.size)
+
+        return '{} frames'.format(self.indices.size)
+
+    def targets(self) -> Iterator[Union[int, float]]:
+        """
+        Return the targets, in ascending order.
+
+        ---
+        Returns
+        ---
+
+            Iterator[Union[int, float]]
+        The frame indices or the times, in seconds. A periodic schedule has no
+        end, so it is read until the end of the stream.
+        """
+
+        if self.interval is not None:
+            return (self.interval * i for i in count())
+
+        if self.times is not None:
+            return iter(self.times.tolist())
+
+        return iter(self.indices.tolist())
+
+    def position(self, frame_index: int) -> int:
+        """
+        Return the position of a scheduled frame among all the targets.
+
+        ---
+        Arguments
+        ---
+
+            frame_index (int)
+        The index of a scheduled frame.
+
+        ---
+        Returns
+        ---
+
+            int
+        The position, that is, the index among the extracted frames.
+        """
+
+        return int(np.searchsorted(self.indices, frame_index))
+
+    def split(self, segments: int) -> List[Tuple[int, np.ndarray]]:
+        """
+        Split the frame indices into contiguous segments of similar size.
+
+        ---
+        Arguments
+        ---
+
+            segments (int)
+        The number of segments.
+
+        ---
+        Returns
+        ---
+
+            List[Tuple[int, numpy.ndarray]]
+        The position of the first index among all the targets and the indices
+        of each segment.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If the targets are times.
+        """
+
+        if self.is_timed:
+            raise ValueError(
+                'A schedule by time can\'t be split into segments')
+
+        # Don't make empty segments.
+        segments = max(1, min(int(segments), self.indices.size))
+
+        bounds = np.linspace(0, self.indices.size, segments + 1).astype(int)
+
+        return [(int(start), self.indices[start:end])
+                for start, end in zip(bounds[:-1], bounds[1:])]
@@ -0,0 +1,511 @@
+"""
+Selection of the frames by their content.
+"""
+
+from collections import deque
+
+from itertools import combinations
+
+from math import factorial
+
+from typing import Any, Dict, List, Optional
+
+import cv2
+
+import numpy as np
+
+from modules.extractor.constants import (DEFAULT_DEDUP_CAPACITY, HASH_BITS,
+                                         HASH_MIN_CHUNK_BITS,
+                                         SCENE_HISTOGRAM_BINS,
+                                         SCENE_PROXY_WIDTH)
+
+# Ways of scoring the difference between two frames.
+SCENE_METHODS = ('mad', 'hist')
+
+
+class SceneDetector:
+    """
+    Accept only the frames that differ enough from the previous one.
+
+    Each frame is reduced to a small grayscale copy, `SCENE_PROXY_WIDTH` pixels
+    wide, which is compared to the copy of the previous frame. The score, from
+    0 to 1, is either the mean absolute difference of the pixels (`'mad'`) or
+    the total variation distance of their histograms (`'hist'`), which ignores
+    motion. Both are computed in reused arrays, so the cost per frame is far
+    below the cost of decoding it.
+
+    ---
+    Attributes
+    ---
+
+        threshold (float)
+    The minimum score for a frame to be accepted.
+
+        method (str)
+    One of `SCENE_METHODS`.
+
+        last_score (float)
+    The score of the last frame checked.
+    """
+
+    def __init__(self, threshold: float, method: str = 'mad') -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            threshold (float)
+        The minimum score, from 0 to 1, for a frame to be accepted.
+
+            method (str, 'mad')
+        One of `SCENE_METHODS`.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If some setting is invalid.
+        """
+
+        if not 0 <= threshold <= 1:
+            raise ValueError('The scene threshold must be between 0 and 1')
+
+        if method not in SCENE_METHODS:
+            raise ValueError('The scene method must be one of {}'.format(
+                ', '.join(SCENE_METHODS)))
+
+        self.threshold = threshold
+        self.method = method
+
+        self.last_score = 0.0
+
+        self._resized = None
+        self._current = None
+        self._previous = None
+        self._difference = None
+        self._has_previous = False
+
+    def reset(self) -> None:
+        """
+        Forget the previous frame, so the next one is always accepted.
+        """
+
+        self._has_previous = False
+
+    def accept(self, image: Any) -> bool:
+        """
+        Check whether a frame differs enough from the previous one checked.
+
+        The first frame after a reset is always accepted.
+
+        ---
+        Arguments
+        ---
+
+            image (numpy.ndarray)
+        The BGR or grayscale frame.
+
+        ---
+        Returns
+        ---
+
+            bool
+        True if the frame starts a new scene.
+        """
+
+        self._reduce(image)
+
+        if not self._has_previous:
+            self.last_score = 1.0
+
+        elif self.method == 'hist':
+            self.last_score = self._histogram_distance()
+
+        else:
+            cv2.absdiff(self._current, self._previous, self._difference)
+
+            self.last_score = float(self._difference.mean()) / 255
+
+        # The current copy becomes the previous one.
+        self._current, self._previous = self._previous, self._current
+        self._has_previous = True
+
+        return self.last_score >= self.threshold
+
+    def _reduce(self, image: Any) -> None:
+        """
+        Store a small grayscale copy of the frame in the current array.
+        """
+
+        height, width = image.shape[:2]
+
+        proxy_width = min(SCENE_PROXY_WIDTH, width)
+        proxy_height = max(1, round(height * proxy_width / width))
+
+        shape = (proxy_height, proxy_width)
+
+        # Allocate the arrays only once, or if the frame size changes.
+        if self._current is None or self._current.shape != shape:
+            self._resized = np.empty(shape + image.shape[2:], image.dtype)
+            self._current = np.empty(shape, image.dtype)
+            self._previous = np.empty(shape, image.dtype)
+            self._difference = np.empty(shape, image.dtype)
+            self._has_previous = False
+
+        if image.ndim == 2:
+            cv2.resize(image, (proxy_width, proxy_height),
+                       self._current,
+                       interpolation=cv2.INTER_AREA)
+
+        else:
+            cv2.resize(image, (proxy_width, proxy_height),
+                       self._resized,
+                       interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2GRAY, self._current)
+
+    def _histogram_distance(self) -> float:
+        """
+        Return the total variation distance between the histograms of the
+        current and the previous copies.
+        """
+
+        # Width of the bins, in gray levels.
+        bin_width = 256 // SCENE_HISTOGRAM_BINS
+
+        current, previous = [
+            np.bincount(copy.ravel() // bin_width,
+                        minlength=SCENE_HISTOGRAM_BINS)
+            for copy in (self._current, self._previous)
+        ]
+
+        return float(np.abs(current - previous).sum()) / (
+            2 * self._current.size)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """
+    Return the number of different bits between two hashes.
+
+    ---
+    Arguments
+    ---
+
+        a (int)
+    Some hash.
+
+        b (int)
+    Another hash.
+
+    ---
+    Returns
+    ---
+
+        int
+    The Hamming distance.
+    """
+
+    return bin(a ^ b).count('1')
+
+
+def chunk_count(max_distance: int, capacity: int) -> int:
+    """
+    Return the number of chunks of a hash that makes the searches of an index
+    cheapest, with chunks of at least `HASH_MIN_CHUNK_BITS` bits.
+
+    The cost of a search is estimated as the number of buckets looked up, for
+    all the chunk values within the distance searched in each chunk, plus the
+    number of hashes in them, if the index is full and the hashes are random.
+
+    ---
+    Arguments
+    ---
+
+        max_distance (int)
+    The maximum Hamming distance searched.
+
+        capacity (int)
+    The maximum number of hashes indexed.
+
+    ---
+    Returns
+    ---
+
+        int
+    The number of chunks.
+    """
+
+    def cost(chunks: int) -> float:
+        bits = HASH_BITS // chunks
+
+        # Chunk values within the distance of each chunk.
+        values = sum(
+            factorial(bits) // (factorial(distance) *
+                                factorial(bits - distance))
+            for distance in range(min(max_distance // chunks, bits) + 1))
+
+        return chunks * values * (1 + capacity / 2**bits)
+
+    return min(range(1, HASH_BITS // HASH_MIN_CHUNK_BITS + 1), key=cost)
+
+
+class HashIndex:
+    """
+    Index of hashes searched by Hamming distance, with a bounded capacity.
+
+    It uses multi-index hashing: each hash is split into the chunks given by
+    `chunk_count()`, and each chunk indexes the hash in its own bucket table.
+    By the pigeonhole principle, two hashes within `max_distance` bits differ
+    by at most `max_distance // chunks` bits in some chunk, so a search only
+    checks the hashes in the buckets of the chunk values within that
+    distance, instead of all of them, and then compares the whole hashes.
+    When the capacity is reached, the oldest hashes are removed.
+    """
+
+    def __init__(self,
+                 max_distance: int,
+                 capacity: int = DEFAULT_DEDUP_CAPACITY) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            max_distance (int)
+        The maximum Hamming distance searched, from 0 to 15.
+
+            capacity (int, DEFAULT_DEDUP_CAPACITY)
+        The maximum number of hashes kept.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If some setting is invalid.
+        """
+
+        if not 0 <= max_distance < 16:
+            raise ValueError('The duplicate distance must be between 0 and 15')
+
+        if capacity < 1:
+            raise ValueError(
+                'The duplicate filter capacity must be greater than zero')
+
+        self.max_distance = max_distance
+        self.capacity = capacity
+
+        # Bit offset and mask of each chunk.
+        chunks = chunk_count(max_distance, capacity)
+        bounds = [HASH_BITS * i // chunks for i in range(chunks + 1)]
+
+        self._chunks = [(start, (1 << end - start) - 1)
+                        for start, end in zip(bounds[:-1], bounds[1:])]
+
+        # The bits to flip in a chunk value to get the values of the buckets
+        # searched, for each chunk, starting with the value itself.
+        radius = max_distance // chunks
+
+        self._flips = [[
+            sum(1 << bit for bit in bits) for distance in range(radius + 1)
+            for bits in combinations(range(end - start), distance)
+        ] for start, end in zip(bounds[:-1], bounds[1:])]
+
+        # Hashes by chunk value, for each chunk, and hashes by insertion order.
+        self._tables = [{} for _ in self._chunks]  # type: List[Dict]
+        self._order = deque()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def find(self, value: int) -> Optional[int]:
+        """
+        Find an indexed hash within the maximum distance of a hash.
+
+        ---
+        Arguments
+        ---
+
+            value (int)
+        The hash to search for.
+
+        ---
+        Returns
+        ---
+
+            Optional[int]
+        Some indexed hash close enough, or None.
+        """
+
+        for table, (start, mask), flips in zip(self._tables, self._chunks,
+                                               self._flips):
+            key = value >> start & mask
+
+            for flip in flips:
+                for candidate in table.get(key ^ flip, ()):
+                    if hamming_distance(value,
+                                        candidate) <= self.max_distance:
+                        return candidate
+
+        return None
+
+    def add(self, value: int) -> None:
+        """
+        Index a hash, removing the oldest one if the capacity is reached.
+
+        ---
+        Arguments
+        ---
+
+            value (int)
+        The hash to index.
+        """
+
+        if len(self._order) >= self.capacity:
+            self._remove(self._order.popleft())
+
+        for table, (start, mask) in zip(self._tables, self._chunks):
+            table.setdefault(value >> start & mask, []).append(value)
+
+        self._order.append(value)
+
+    def clear(self) -> None:
+        """
+        Remove all the hashes.
+        """
+
+        for table in self._tables:
+            table.clear()
+
+        self._order.clear()
+
+    def _remove(self, value: int) -> None:
+        """
+        Remove one occurrence of a hash from the bucket tables.
+        """
+
+        for table, (start, mask) in zip(self._tables, self._chunks):
+            key = value >> start & mask
+            bucket = table[key]
+
+            bucket.remove(value)
+
+            if not bucket:
+                del table[key]
+
+
+class DuplicateFilter:
+    """
+    Reject the frames that look like some frame already accepted.
+
+    Each frame is reduced to a 64 bits difference hash (dHash), which encodes
+    whether each pixel of a 9x8 grayscale copy is brighter than its right
+    neighbor, so similar frames have hashes with few different bits. The hashes
+    of the accepted frames are kept in a `HashIndex`.
+
+    ---
+    Attributes
+    ---
+
+        index (HashIndex)
+    The hashes of the accepted frames.
+    """
+
+    def __init__(self,
+                 max_distance: int,
+                 capacity: int = DEFAULT_DEDUP_CAPACITY) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            max_distance (int)
+        The maximum Hamming distance, from 0 to 15, for a frame to be a
+        duplicate.
+
+            capacity (int, DEFAULT_DEDUP_CAPACITY)
+        The maximum number of hashes of the accepted frames kept.
+
+        ---
+        Raises
+        ---
+
+            ValueError
+        If some setting is invalid.
+        """
+
+        self.index = HashIndex(max_distance, capacity)
+
+        self._resized = None
+        self._gray = np.empty((8, 9), np.uint8)
+
+    def reset(self) -> None:
+        """
+        Forget all the accepted frames.
+        """
+
+        self.index.clear()
+
+    def hash(self, image: Any) -> int:
+        """
+        Return the difference hash of a frame.
+
+        ---
+        Arguments
+        ---
+
+            image (numpy.ndarray)
+        The BGR or grayscale frame.
+
+        ---
+        Returns
+        ---
+
+            int
+        The 64 bits hash.
+        """
+
+        if image.ndim == 2:
+            cv2.resize(image, (9, 8), self._gray, interpolation=cv2.INTER_AREA)
+
+        else:
+            shape = (8, 9) + image.shape[2:]
+
+            if self._resized is None or self._resized.shape != shape:
+                self._resized = np.empty(shape, image.dtype)
+
+            cv2.resize(image, (9, 8),
+                       self._resized,
+                       interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2GRAY, self._gray)
+
+        bits = np.packbits(self._gray[:, :-1] > self._gray[:, 1:])
+
+        return int.from_bytes(bits.tobytes(), 'big')
+
+    def accept(self, image: Any) -> bool:
+        """
+        Check whether a frame is not a duplicate, remembering it if so.
+
+        ---
+        Arguments
+        ---
+
+            image (numpy.ndarray)
+        The BGR or grayscale frame.
+
+        ---
+        Returns
+        ---
+
+            bool
+        True if no accepted frame is within the maximum distance.
+        """
+
+        value = self.hash(image)
+
+        if self.index.find(value) is not None:
+            return False
+
+        self.index.add(value)
+
+        return True
@@ -0,0 +1,535 @@
+"""
+Destinations of the encoded images: plain files in a folder, tar shards or a
+stream.
+"""
+
+from io import BytesIO
+
+from os import path, replace
+
+from struct import Struct
+
+from tarfile import RECORDSIZE, TarFile, TarInfo
+
+from threading import Lock
+
+from time import time
+
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from modules.extractor.constants import DEFAULT_SHARD_SIZE, TAR_BLOCK_SIZE
+
+from modules.extractor.writer import WriteError
+
+# Ways of storing the encoded images.
+OUTPUT_MODES = ('files', 'tar', 'stream')
+
+# Output path of the stream written to the standard output.
+STDOUT = '-'
+
+# Header of each image of a stream: size of the encoded image, index of the
+# frame in the video and time, in seconds.
+STREAM_HEADER = Struct('<Iqd')
+
+# Extension of the shard index files, appended to the shard filename.
+INDEX_EXTENSION = '.idx'
+
+# Extension of the image files being written, appended to the filename.
+TEMP_EXTENSION = '.part'
+
+
+class DirectorySink:
+    """
+    Store each encoded image as a file in a folder.
+    """
+
+    def __init__(self, output_dir: str) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            output_dir (str)
+        The path of an existing output folder.
+        """
+
+        self.output_dir = output_dir
+
+    def write(self, name: str, data: bytes, tag: Any = None) -> int:
+        """
+        Write an encoded image. It can be called from many threads.
+
+        ---
+        Arguments
+        ---
+
+            name (str)
+        The image filename.
+
+            data (bytes-like)
+        The encoded image.
+
+            tag (Any, None)
+        The tag of the image. Unused.
+
+        ---
+        Returns
+        ---
+
+            int
+        The number of bytes written.
+        """
+
+        file_path = path.join(self.output_dir, name)
+
+        # Replace the file at once, so it is never seen partially written and
+        # the files linked to the previous one are kept.
+        with open(file_path + TEMP_EXTENSION, 'wb') as file:
+            file.write(data)
+
+        replace(file_path + TEMP_EXTENSION, file_path)
+
+        return memoryview(data).nbytes
+
+    def close(self) -> None:
+        """
+        Nothing to close, since each file is closed right after written.
+        """
+
+
+class TarShardSink:
+    """
+    Store the encoded images as members of rolling tar shards.
+
+    A new shard is started whenever the current one would exceed the maximum
+    size, so each shard holds whole images. Next to each shard, named
+    `{prefix}-{number:06d}.tar`, an index file with the extension `.tar.idx`
+    lists the name, the data offset and the size of each member, one per line,
+    separated by tabs, so any image can be read without scanning the shard.
+    """
+
+    def __init__(self,
+                 output_dir: str,
+                 prefix: str,
+                 max_size: int = DEFAULT_SHARD_SIZE) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            output_dir (str)
+        The path of an existing output folder.
+
+            prefix (str)
+        The prefix of the shard filenames.
+
+            max_size (int, DEFAULT_SHARD_SIZE)
+        The maximum size, in bytes, of each shard, unless a single image is
+        larger.
+        """
+
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.max_size = max_size
+
+        # Filenames of the shards already started.
+        self.shards = []
+
+        self._lock = Lock()
+        self._tar = None
+        self._index = []
+
+    def write(self, name: str, data: bytes, tag: Any = None) -> int:
+        """
+        Append an encoded image to the current shard. It can be called from
+        many threads.
+
+        ---
+        Arguments
+        ---
+
+            name (str)
+        The member name.
+
+            data (bytes-like)
+        The encoded image.
+
+            tag (Any, None)
+        The tag of the image. Unused.
+
+        ---
+        Returns
+        ---
+
+            int
+        The number of bytes of the image.
+        """
+
+        data = bytes(data)
+
+        info = TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time())
+
+        # Size of the member data padded to whole blocks.
+        padded_size = -(-info.size // TAR_BLOCK_SIZE) * TAR_BLOCK_SIZE
+
+        with self._lock:
+
+            # Roll over to a new shard if this one would be too large.
+            if self._tar is None or (self._index and self._projected_size(
+                    padded_size) > self.max_size):
+                self._next_shard()
+
+            start = self._tar.offset
+
+            self._tar.addfile(info, BytesIO(data))
+
+            # The data comes right after the member header.
+            data_offset = self._tar.offset - padded_size
+
+            if data_offset < start:
+                raise WriteError('Could not index the member {}'.format(name))
+
+            self._index.append((name, data_offset, info.size))
+
+        return info.size
+
+    def close(self) -> None:
+        """
+        Close the current shard and write its index.
+        """
+
+        with self._lock:
+            self._close_shard()
+
+    def _projected_size(self, padded_size: int) -> int:
+        """
+        Return the size the current shard would have with one more member,
+        counting its header, the two end blocks and the padding of the whole
+        archive to full records.
+        """
+
+        size = self._tar.offset + padded_size + 3 * TAR_BLOCK_SIZE
+
+        return -(-size // RECORDSIZE) * RECORDSIZE
+
+    def _next_shard(self) -> None:
+        """
+        Close the current shard and start a new one.
+        """
+
+        self._close_shard()
+
+        shard = path.join(
+            self.output_dir, '{}-{:06d}.tar'.format(self.prefix,
+                                                    len(self.shards)))
+
+        self._tar = TarFile(shard, 'w')
+        self.shards.append(shard)
+
+    def _close_shard(self) -> None:
+        """
+        Close the current shard, if any, and write its index.
+        """
+
+        if self._tar is None:
+            return
+
+        self._tar.close()
+        self._tar = None
+
+        with open(self.shards[-1] + INDEX_EXTENSION, 'w') as index:
+            for name, offset, size in self._index:
+                index.write('{}\t{}\t{}\n'.format(name, offset, size))
+
+        self._index = []
+
+
+class StreamSink:
+    """
+    Write the encoded images one after another to a stream, such as the
+    standard output or a named pipe, each one after a `STREAM_HEADER`.
+
+    The images are written in the order they were extracted, even if encoded
+    out of order by many threads, so a consumer can process them as they are
+    produced. See `read_stream()`.
+    """
+
+    def __init__(self, target: str = STDOUT) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            target (str, STDOUT)
+        The path of the file or named pipe to write, or `STDOUT`.
+        """
+
+        self.target = target
+
+        # The standard output is written directly, so nothing printed to
+        # `sys.stdout` gets mixed with the images.
+        self._file = open(1 if target == STDOUT else target,
+                          'wb',
+                          closefd=target != STDOUT)
+        self._lock = Lock()
+
+        # The images encoded before some previous one, by extracted index.
+        self._pending = {}  # type: Dict[int, Tuple[bytes, Any]]
+        self._next = 0
+
+    def write(self, name: str, data: bytes, tag: Any = None) -> int:
+        """
+        Write an encoded image, once all the previous ones are written. It can
+        be called from many threads.
+
+        ---
+        Arguments
+        ---
+
+            name (str)
+        The image filename. Unused.
+
+            data (bytes-like)
+        The encoded image.
+
+            tag (Any, None)
+        The index among the extracted frames, the index in the video and the
+        time of the frame.
+
+        ---
+        Returns
+        ---
+
+            int
+        The number of bytes written, including the header.
+        """
+
+        extracted_index, frame_index, timestamp = tag
+
+        header = STREAM_HEADER.pack(
+            memoryview(data).nbytes, frame_index, timestamp)
+
+        with self._lock:
+            self._pending[extracted_index] = header, data
+
+            # Write every image whose previous ones are all written.
+            if self._next in self._pending:
+                while self._next in self._pending:
+                    self._write(*self._pending.pop(self._next))
+
+                    self._next += 1
+
+                self._file.flush()
+
+        return len(header) + memoryview(data).nbytes
+
+    def close(self) -> None:
+        """
+        Write the images still waiting for some previous one that failed, and
+        close the stream.
+        """
+
+        with self._lock:
+            for extracted_index in sorted(self._pending):
+                self._write(*self._pending.pop(extracted_index))
+
+            self._file.close()
+
+    def _write(self, header: bytes, data: Any) -> None:
+        """
+        Write an image after its header.
+        """
+
+        self._file.write(header)
+        self._file.write(data)
+
+
+def read_stream(file: BinaryIO) -> Iterator[Tuple[int, float, bytes]]:
+    """
+    Read the images of a stream written by `StreamSink`.
+
+    ---
+    Arguments
+    ---
+
+        file (BinaryIO)
+    The stream, e.g., `sys.stdin.buffer`.
+
+    ---
+    Yields
+    ---
+
+        Tuple[int, float, bytes]
+    The index in the video, the time, in seconds, and the encoded image of
+    each frame.
+
+    ---
+    Raises
+    ---
+
+        EOFError
+    If the stream ends in the middle of an image.
+    """
+
+    while True:
+        header = file.read(STREAM_HEADER.size)
+
+        if not header:
+            return
+
+        if len(header) < STREAM_HEADER.size:
+            raise EOFError('Truncated image header')
+
+        size, frame_index, timestamp = STREAM_HEADER.unpack(header)
+
+        data = file.read(size)
+
+        if len(data) < size:
+            raise EOFError('Truncated image data')
+
+        yield frame_index, timestamp, data
+
+
+def open_sink(output_dir: str,
+              output_mode: str = 'files',
+              prefix: str = 'frames',
+              shard_size: int = DEFAULT_SHARD_SIZE):
+    """
+    Return the sink for an output mode.
+
+    ---
+    Arguments
+    ---
+
+        output_dir (str)
+    The path of an existing output folder or, in the stream mode, of the file
+    or named pipe to write, or `STDOUT`.
+
+        output_mode (str, 'files')
+    One of `OUTPUT_MODES`.
+
+        prefix (str, 'frames')
+    The prefix of the shard filenames, in the tar mode.
+
+        shard_size (int, DEFAULT_SHARD_SIZE)
+    The maximum size, in bytes, of each shard, in the tar mode.
+
+    ---
+    Returns
+    ---
+
+        DirectorySink, TarShardSink or StreamSink
+    The sink.
+    """
+
+    if output_mode == 'stream':
+        return StreamSink(output_dir)
+
+    if output_mode == 'tar':
+        return TarShardSink(output_dir, prefix, shard_size)
+
+    if output_mode == 'files':
+        return DirectorySink(output_dir)
+
+    raise ValueError('The output mode must be one of {}'.format(
+        ', '.join(OUTPUT_MODES)))
+
+
+class ShardReader:
+    """
+    Random access to the images of a tar shard, through its index file.
+    """
+
+    def __init__(self, shard: str) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            shard (str)
+        The path of the tar shard. Its index must be next to it.
+        """
+
+        self.shard = shard
+
+        # Offset and size of each member, by name, in the order of the shard.
+        self.members = {}  # type: Dict[str, Tuple[int, int]]
+
+        # Member names, by the index of the frame among the extracted ones.
+        self._names = {}  # type: Dict[int, str]
+
+        with open(shard + INDEX_EXTENSION) as index:
+            for line in index:
+                name, offset, size = line.rstrip('\n').split('\t')
+
+                self.members[name] = int(offset), int(size)
+
+                # The name ends with `_{extracted}_{index}_{time}`.
+                fields = path.splitext(name)[0].rsplit('_', 6)
+
+                if len(fields) == 7 and fields[1].isdigit():
+                    self._names[int(fields[1])] = name
+
+        self._file = open(shard, 'rb')
+
+    def __enter__(self) -> 'ShardReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.members
+
+    def __getitem__(self, name: str) -> bytes:
+        """
+        Read the encoded image of a member.
+        """
+
+        offset, size = self.members[name]
+
+        self._file.seek(offset)
+
+        return self._file.read(size)
+
+    def names(self) -> List[str]:
+        """
+        Return the member names, in the order of the shard.
+        """
+
+        return list(self.members)
+
+    def frame(self, extracted_index: int) -> Optional[bytes]:
+        """
+        Read the encoded image of an extracted frame, if it is in this shard.
+
+        ---
+        Arguments
+        ---
+
+            extracted_index (int)
+        The index of the frame among the extracted ones.
+
+        ---
+        Returns
+        ---
+
+            Optional[bytes]
+        The encoded image, or None if the frame is not in this shard.
+        """
+
+        name = self._names.get(extracted_index)
+
+        return None if name is None else self[name]
+
+    def close(self) -> None:
+        """
+        Close the shard file.
+        """
+
+        self._file.close()
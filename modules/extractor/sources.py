@@ -0,0 +1,112 @@
+"""
+Listing of the input video files, without importing any video library.
+"""
+
+from glob import glob
+
+from os import listdir, path, stat
+
+from stat import S_ISFIFO
+
+from typing import List
+
+from modules.extractor.constants import VIDEO_EXTENSIONS
+
+# Input path of the video read from the standard input.
+STDIN = '-'
+
+
+class StreamError(IOError):
+    """
+    Raised when a stream can't be read, e.g., a container that needs seeking.
+    """
+
+
+def is_stream(source: str) -> bool:
+    """
+    Check whether a video is read from the standard input or a named pipe, so
+    it can be read only once, sequentially.
+
+    ---
+    Arguments
+    ---
+
+        source (str)
+    The path of the video, or `STDIN`.
+
+    ---
+    Returns
+    ---
+
+        bool
+    True if it is a stream.
+    """
+
+    if source == STDIN:
+        return True
+
+    try:
+        return S_ISFIFO(stat(source).st_mode)
+
+    except OSError:
+        return False
+
+
+def find_videos(source: str) -> List[str]:
+    """
+    List the video files from a folder, a glob pattern or a manifest file.
+
+    A folder is searched, not recursively, for files with one of the
+    `VIDEO_EXTENSIONS`. A manifest is a text file with one video path per line,
+    relative to the manifest folder, where empty lines and lines starting with
+    `#` are ignored. Anything else is expanded as a glob pattern, in which `**`
+    matches any folders.
+
+    ---
+    Arguments
+    ---
+
+        source (str)
+    The folder, the glob pattern or the manifest file.
+
+    ---
+    Returns
+    ---
+
+        List[str]
+    The absolute paths of the video files, without duplicates.
+    """
+
+    if path.isdir(source):
+        files = [
+            path.join(source, name) for name in sorted(listdir(source))
+            if path.splitext(name)[1].lower() in VIDEO_EXTENSIONS
+        ]
+
+    elif path.isfile(source):
+        base_dir = path.dirname(path.abspath(source))
+
+        with open(source) as manifest:
+            lines = [line.strip() for line in manifest]
+
+        files = [
+            path.join(base_dir, line) for line in lines
+            if line and not line.startswith('#')
+        ]
+
+    else:
+        files = sorted(glob(source, recursive=True))
+
+        # Skip the folders matched by the pattern.
+        files = [file for file in files if path.isfile(file)]
+
+    # Keep the first occurrence of each file.
+    videos = []
+    seen = set()
+
+    for file in map(path.abspath, files):
+        if file not in seen:
+            seen.add(file)
+            videos.append(file)
+
+    return videos
@@ -0,0 +1,572 @@
+"""
+Resizing, cropping and color conversion of the frames before encoding.
+"""
+
+from re import fullmatch
+
+from threading import Lock
+
+from typing import Any, List, Optional, Tuple
+
+import cv2
+
+import numpy as np
+
+
+def parse_geometry(geometry: str) -> Tuple[int, Optional[int], Optional[int],
+                                           Optional[int]]:
+    """
+    Parse a geometry string in the forms `W`, `WxH` or `WxH+X+Y`.
+
+    ---
+    Arguments
+    ---
+
+        geometry (str)
+    Some geometry string. E.g.: `'640x360+100+50'`.
+
+    ---
+    Returns
+    ---
+
+        Tuple[int, Optional[int], Optional[int], Optional[int]]
+    The width, the height, the left and the top, if defined.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If the string is not a valid geometry.
+    """
+
+    match = fullmatch(r'(\d+)(?:x(\d+)(?:\+(\d+)\+(\d+))?)?',
+                      str(geometry).strip())
+
+    if match is None or int(match.group(1)) < 1 or (match.group(2) is not None
+                                                    and int(match.group(2)) <
+                                                    1):
+        raise ValueError('Invalid geometry: {}'.format(geometry))
+
+    return tuple(None if group is None else int(group)
+                 for group in match.groups())
+
+
+def parse_size(size: str) -> Tuple[int, Optional[int]]:
+    """
+    Parse a size string in the forms `W` or `WxH`, without the offset of a
+    geometry, which only a crop has.
+
+    ---
+    Arguments
+    ---
+
+        size (str)
+    Some size string. E.g.: `'640x360'`.
+
+    ---
+    Returns
+    ---
+
+        Tuple[int, Optional[int]]
+    The width and the height, if defined.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If the string is not a valid size.
+    """
+
+    width, height, left, top = parse_geometry(size)
+
+    if left is not None or top is not None:
+        raise ValueError('Invalid size: {}'.format(size))
+
+    return width, height
+
+
+class BufferRing:
+    """
+    Fixed number of preallocated arrays, reused cyclically.
+
+    An array is handed out again only after all the others were, so it must
+    not be used anymore by then. Its size must be greater than the number of
+    arrays in use at any time, e.g., waiting in the writer queue.
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            size (int)
+        The number of arrays.
+        """
+
+        self._buffers = [None] * max(int(size), 1)
+        self._next = 0
+
+    def next(self, shape: Tuple[int, ...], dtype: Any = np.uint8) -> Any:
+        """
+        Return the next array, allocating it only if it doesn't exist yet or
+        has another shape.
+
+        ---
+        Arguments
+        ---
+
+            shape (Tuple[int, ...])
+        The array shape.
+
+            dtype (numpy.dtype, numpy.uint8)
+        The array data type.
+
+        ---
+        Returns
+        ---
+
+            numpy.ndarray
+        The array, with undefined contents.
+        """
+
+        buffer = self._buffers[self._next]
+
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = self._buffers[self._next] = np.empty(shape, dtype)
+
+        self._next = (self._next + 1) % len(self._buffers)
+
+        return buffer
+
+    def reuse(self) -> Optional[Any]:
+        """
+        Return the next array as it is, to be filled by some function that
+        reuses it only if it has the right shape, e.g., `retrieve()` of a
+        video stream. The array filled must then be kept with `keep()`.
+
+        ---
+        Returns
+        ---
+
+            Optional[numpy.ndarray]
+        The array, or None if not allocated yet.
+        """
+
+        return self._buffers[self._next]
+
+    def keep(self, buffer: Any) -> None:
+        """
+        Replace the next array by the one filled, the same one if it was
+        reused, and move to the following array.
+
+        ---
+        Arguments
+        ---
+
+            buffer (numpy.ndarray)
+        The array filled.
+        """
+
+        self._buffers[self._next] = buffer
+        self._next = (self._next + 1) % len(self._buffers)
+
+    def release(self, buffer: Any) -> None:
+        """
+        Give back an array no longer used. The arrays of a ring are reused in
+        order anyway, so there is nothing to do.
+
+        ---
+        Arguments
+        ---
+
+            buffer (numpy.ndarray)
+        The array.
+        """
+
+
+class BufferPool(BufferRing):
+    """
+    Preallocated arrays reused only once given back, e.g., by the writer
+    threads after encoding them, in any order.
+
+    Only as many arrays as frames in use at once are ever allocated, e.g.,
+    just a few when the writer keeps up with the decoding, and at most `size`
+    are kept for reuse.
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            size (int)
+        The maximum number of arrays kept for reuse.
+        """
+
+        super().__init__(size)
+
+        self._free = []  # type: List[Any]
+        self._lock = Lock()
+
+    def next(self, shape: Tuple[int, ...], dtype: Any = np.uint8) -> Any:
+        """
+        Return an array given back, allocating one only if there is none or it
+        has another shape. It is in use until released.
+
+        ---
+        Arguments
+        ---
+
+            shape (Tuple[int, ...])
+        The array shape.
+
+            dtype (numpy.dtype, numpy.uint8)
+        The array data type.
+
+        ---
+        Returns
+        ---
+
+            numpy.ndarray
+        The array, with undefined contents.
+        """
+
+        buffer = self.reuse()
+
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype)
+
+        return buffer
+
+    def reuse(self) -> Optional[Any]:
+        """
+        Return an array given back as it is, to be filled by some function
+        that reuses it only if it has the right shape. It is in use until
+        released.
+
+        ---
+        Returns
+        ---
+
+            Optional[numpy.ndarray]
+        The array, or None if there is none.
+        """
+
+        with self._lock:
+            return self._free.pop() if self._free else None
+
+    def keep(self, buffer: Any) -> None:
+        """
+        Nothing to do, since the array filled is in use until released.
+
+        ---
+        Arguments
+        ---
+
+            buffer (numpy.ndarray)
+        The array filled.
+        """
+
+    def release(self, buffer: Any) -> None:
+        """
+        Give back an array no longer used, to be reused. It can be called from
+        any thread.
+
+        ---
+        Arguments
+        ---
+
+            buffer (numpy.ndarray)
+        The array.
+        """
+
+        with self._lock:
+            if len(self._free) < len(self._buffers):
+                self._free.append(buffer)
+
+
+class FrameTransform:
+    """
+    Crop, resize and convert the frames to grayscale, in this order.
+
+    ---
+    Attributes
+    ---
+
+        size (Optional[Tuple[int, Optional[int]]])
+    The target width and height. If the height is not defined, the width is
+    the length of the longest side, keeping the aspect ratio.
+
+        scale (Optional[float])
+    The scale factor, if no target size is defined.
+
+        fit (bool)
+    Set whether to fit the frames into the target size, keeping the aspect
+    ratio, instead of stretching them.
+
+        crop (Optional[Tuple[int, int, Optional[int], Optional[int]]])
+    The width, the height and the left and top of the region of interest. If
+    the position is not defined, the region is centered.
+
+        grayscale (bool)
+    Set whether to convert the frames to grayscale.
+    """
+
+    def __init__(self,
+                 size: Optional[Tuple[int, Optional[int]]] = None,
+                 scale: Optional[float] = None,
+                 fit: bool = False,
+                 crop: Optional[Tuple[int, int, Optional[int],
+                                      Optional[int]]] = None,
+                 grayscale: bool = False) -> None:
+        """
+        ---
+        Raises
+        ---
+
+            ValueError
+        If some setting is invalid.
+        """
+
+        if scale is not None and scale <= 0:
+            raise ValueError('The scale must be greater than zero')
+
+        if crop is not None and (crop[1] is None or crop[0] < 1
+                                 or crop[1] < 1):
+            raise ValueError('The crop must have a width and a height')
+
+        self.size = size
+        self.scale = scale
+        self.fit = fit
+        self.crop = crop
+        self.grayscale = grayscale
+
+        # Intermediate array between the resizing and the color conversion.
+        self._scratch = None
+
+    @property
+    def is_identity(self) -> bool:
+        """
+        Whether the frames are kept untouched.
+        """
+
+        return (self.size is None and self.scale in (None, 1)
+                and self.crop is None and not self.grayscale)
+
+    def crop_box(self, width: int, height: int) -> Tuple[int, int, int, int]:
+        """
+        Return the region of interest of a frame, limited to its bounds.
+
+        ---
+        Arguments
+        ---
+
+            width (int)
+        The frame width.
+
+            height (int)
+        The frame height.
+
+        ---
+        Returns
+        ---
+
+            Tuple[int, int, int, int]
+        The left, the top, the width and the height of the region.
+        """
+
+        if self.crop is None:
+            return 0, 0, width, height
+
+        crop_width, crop_height, left, top = self.crop
+
+        crop_width = min(crop_width, width)
+        crop_height = min(crop_height, height)
+
+        # Center the region, if its position is not defined.
+        if left is None:
+            left = (width - crop_width) // 2
+            top = (height - crop_height) // 2
+
+        left = min(left, width - crop_width)
+        top = min(top, height - crop_height)
+
+        return left, top, crop_width, crop_height
+
+    def output_size(self, width: int, height: int) -> Tuple[int, int]:
+        """
+        Return the size of a transformed frame.
+
+        ---
+        Arguments
+        ---
+
+            width (int)
+        The frame width.
+
+            height (int)
+        The frame height.
+
+        ---
+        Returns
+        ---
+
+            Tuple[int, int]
+        The width and the height of the transformed frame.
+        """
+
+        width, height = self.crop_box(width, height)[2:]
+
+        if self.size is not None:
+            target_width, target_height = self.size
+
+            # The width is the length of the longest side.
+            if target_height is None:
+                factor = target_width / max(width, height)
+
+            elif self.fit:
+                factor = min(target_width / width, target_height / height)
+
+            else:
+                return target_width, target_height
+
+        elif self.scale is not None:
+            factor = self.scale
+
+        else:
+            return width, height
+
+        return max(1, round(width * factor)), max(1, round(height * factor))
+
+    def output_shape(self, shape: Tuple[int, ...]) -> Tuple[int, ...]:
+        """
+        Return the array shape of a transformed frame.
+
+        ---
+        Arguments
+        ---
+
+            shape (Tuple[int, ...])
+        The frame array shape.
+
+        ---
+        Returns
+        ---
+
+            Tuple[int, ...]
+        The transformed frame array shape.
+        """
+
+        width, height = self.output_size(shape[1], shape[0])
+
+        if self.grayscale or len(shape) == 2:
+            return height, width
+
+        return (height, width) + tuple(shape[2:])
+
+    def apply(self, image: Any, out: Any = None) -> Any:
+        """
+        Transform a frame.
+
+        ---
+        Arguments
+        ---
+
+            image (numpy.ndarray)
+        The BGR frame.
+
+            out (numpy.ndarray, None)
+        An array with the `output_shape()` to store the result, instead of
+        allocating a new one.
+
+        ---
+        Returns
+        ---
+
+            numpy.ndarray
+        The transformed frame.
+        """
+
+        if self.is_identity:
+            return image
+
+        height, width = image.shape[:2]
+
+        # Cropping is just a view of the frame.
+        left, top, crop_width, crop_height = self.crop_box(width, height)
+        image = image[top:top + crop_height, left:left + crop_width]
+
+        output_width, output_height = self.output_size(width, height)
+
+        resize = (output_width, output_height) != (crop_width, crop_height)
+        convert = self.grayscale and image.ndim == 3
+
+        # Nothing else to do, but the result must be a new array.
+        if not resize and not convert:
+            if out is None:
+                return image.copy()
+
+            out[...] = image
+
+            return out
+
+        if resize:
+
+            # Shrink by averaging the pixels, enlarge by interpolating them.
+            interpolation = cv2.INTER_AREA if (
+                output_width < crop_width) else cv2.INTER_LINEAR
+
+            # The resized frame is only intermediate if it is converted next.
+            if convert:
+                shape = (output_height, output_width) + image.shape[2:]
+
+                if self._scratch is None or self._scratch.shape != shape:
+                    self._scratch = np.empty(shape, image.dtype)
+
+                destination = self._scratch
+            else:
+                destination = out
+
+            image = cv2.resize(image, (output_width, output_height),
+                               destination,
+                               interpolation=interpolation)
+
+        if convert:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, out)
+
+        return image
+
+    def apply_into(self, image: Any, ring: Optional[BufferRing]) -> Any:
+        """
+        Transform a frame, storing the result in the next array of a ring or
+        of a pool.
+
+        ---
+        Arguments
+        ---
+
+            image (numpy.ndarray)
+        The BGR frame.
+
+            ring (Optional[BufferRing])
+        The ring or the pool of arrays to store the results. If None, a new
+        array is allocated.
+
+        ---
+        Returns
+        ---
+
+            numpy.ndarray
+        The transformed frame.
+        """
+
+        out = None
+
+        if ring is not None and not self.is_identity:
+            out = ring.next(self.output_shape(image.shape), image.dtype)
+
+        return self.apply(image, out)
@@ -0,0 +1,411 @@
+"""
+Writing of the extracted frames as image files.
+"""
+
+from queue import Queue
+
+from threading import Lock, Thread
+
+from time import perf_counter
+
+from typing import Any, Callable, Optional
+
+from modules.extractor.codecs import ImageCodec
+
+from modules.extractor.constants import DEFAULT_QUEUE_SIZE, DEFAULT_WRITERS
+
+
+class WriteError(IOError):
+    """
+    Raised when an image file could not be written.
+    """
+
+
+class WriteCounters:
+    """
+    Counters of the images encoded and stored by a writer.
+
+    ---
+    Attributes
+    ---
+
+        written (int)
+    Number of images already stored.
+
+        bytes (int)
+    Total size, in bytes, of the images already stored.
+
+        encode_time (float)
+    Time spent encoding the images, in seconds, summed over all threads.
+
+        write_time (float)
+    Time spent storing the images, in seconds, summed over all threads.
+
+        wait_time (float)
+    Time spent blocked submitting frames to a full queue, in seconds.
+
+        submitted (int)
+    Number of frames submitted.
+
+        queue_total (int)
+    Sum of the queue depths seen when submitting, for the mean depth.
+
+        queue_max (int)
+    Maximum queue depth seen when submitting.
+    """
+
+    def __init__(self) -> None:
+        self.written = 0
+        self.bytes = 0
+
+        self.encode_time = 0.0
+        self.write_time = 0.0
+        self.wait_time = 0.0
+
+        self.submitted = 0
+        self.queue_total = 0
+        self.queue_max = 0
+
+    @property
+    def queue_mean(self) -> float:
+        """
+        Mean queue depth seen when submitting.
+        """
+
+        return self.queue_total / self.submitted if self.submitted else 0.0
+
+    def merge(self, other: 'WriteCounters') -> None:
+        """
+        Add the counters of another writer, e.g., of a segment of the video.
+
+        ---
+        Arguments
+        ---
+
+            other (WriteCounters)
+        The counters to add.
+        """
+
+        for name, value in vars(other).items():
+            setattr(
+                self, name,
+                max(self.queue_max, value) if name == 'queue_max' else
+                getattr(self, name) + value)
+
+
+def split_time(seconds: float) -> tuple:
+    """
+    Split a time, in seconds, into hours, minutes, seconds and milliseconds.
+
+    ---
+    Arguments
+    ---
+
+        seconds (float)
+    Some time, in seconds, to split.
+
+    ---
+    Returns
+    ---
+
+        tuple
+    The hours, minutes, seconds and milliseconds, as integers.
+    """
+
+    # Get hours.
+    hours = int(seconds // 3600)
+    seconds %= 3600
+
+    # Get minutes.
+    minutes = int(seconds // 60)
+    seconds %= 60
+
+    # Get milliseconds.
+    milliseconds = int((seconds - int(seconds)) * 1000)
+
+    return hours, minutes, int(seconds), milliseconds
+
+
+def frame_name(video_name: str, extracted_index: int, frame_index: int,
+               seconds: float) -> str:
+    """
+    Return the name, without extension, of the image of an extracted frame.
+
+    ---
+    Arguments
+    ---
+
+        video_name (str)
+    The input video filename, without its extension.
+
+        extracted_index (int)
+    The index of the frame among the extracted ones.
+
+        frame_index (int)
+    The index of the frame in the video.
+
+        seconds (float)
+    The time of the frame in the video, in seconds.
+
+    ---
+    Returns
+    ---
+
+        str
+    The name in the form `{name}_{extracted}_{index}_{hh}_{mm}_{ss}_{ms}`.
+    """
+
+    return '{}_{}_{}_{:02d}_{:02d}_{:02d}_{:03d}'.format(
+        video_name, extracted_index, frame_index, *split_time(seconds))
+
+
+class FrameWriter:
+    """
+    Pool of threads that encode and write the images, fed by a bounded queue.
+
+    Since OpenCV releases the GIL while encoding, the images are encoded in
+    parallel with the decoding of the next frames. When the queue is full,
+    `submit()` blocks, so the memory used by the waiting frames is bounded.
+    The encoded images are stored by a sink, such as a folder or tar shards.
+
+    ---
+    Attributes
+    ---
+
+        counters (WriteCounters)
+    Counters of the images submitted and stored, with the time spent in each
+    stage.
+    """
+
+    def __init__(self,
+                 sink: Any,
+                 workers: int = DEFAULT_WRITERS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 codec: ImageCodec = None,
+                 on_written: Callable[[Any, str, int], None] = None) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            sink (Any)
+        Where to store the encoded images. See `modules.extractor.sinks`.
+
+            workers (int, DEFAULT_WRITERS)
+        Number of threads encoding and writing the images.
+
+            queue_size (int, DEFAULT_QUEUE_SIZE)
+        Maximum number of frames waiting to be written.
+
+            codec (ImageCodec, None)
+        The encoder of the images. By default, JPEG with the OpenCV settings.
+
+            on_written (Callable[[Any, str, int], None], None)
+        Called from the threads with the tag, the filename and the size of each
+        image right after it is stored.
+        """
+
+        # If no codec was provided,...
+        if codec is None:
+
+            # ... use the default one.
+            codec = ImageCodec()
+
+        self.codec = codec
+        self.on_written = on_written
+
+        self.counters = WriteCounters()
+
+        self._sink = sink
+        self._queue = Queue(max(int(queue_size), 1))
+        self._lock = Lock()
+        self._error = None
+
+        # Start the threads.
+        self._threads = [
+            Thread(target=self._work, daemon=True)
+            for _ in range(max(int(workers), 1))
+        ]
+
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self) -> 'FrameWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close(raise_error=exc_info[0] is None)
+
+    @property
+    def written(self) -> int:
+        """
+        Number of images already stored.
+        """
+
+        return self.counters.written
+
+    @property
+    def bytes(self) -> int:
+        """
+        Total size, in bytes, of the images already stored.
+        """
+
+        return self.counters.bytes
+
+    @property
+    def capacity(self) -> int:
+        """
+        Maximum number of submitted frames not written yet, in the queue or
+        being encoded.
+        """
+
+        return self._queue.maxsize + len(self._threads)
+
+    @property
+    def pending(self) -> int:
+        """
+        Approximate number of frames waiting to be written.
+        """
+
+        return self._queue.qsize()
+
+    def check(self) -> None:
+        """
+        Raise the first error that occurred in some thread, if any.
+        """
+
+        if self._error is not None:
+            raise self._error
+
+    def submit(self,
+               name: str,
+               image: Any,
+               tag: Any = None,
+               release: Optional[Callable[[Any], None]] = None) -> None:
+        """
+        Queue an image to be written, blocking while the queue is full.
+
+        ---
+        Arguments
+        ---
+
+            name (str)
+        The name of the image, without extension.
+
+            image (numpy.ndarray)
+        The image to write. It must not be modified after being submitted.
+
+            tag (Any, None)
+        Some value passed to the sink and to `on_written` after the image is
+        stored.
+
+            release (Optional[Callable[[Any], None]], None)
+        Called from the writer thread with the image once encoded, or dropped
+        after an error, e.g., to give it back to a buffer pool.
+        """
+
+        self.check()
+
+        depth = self._queue.qsize()
+
+        self.counters.submitted += 1
+        self.counters.queue_total += depth
+        self.counters.queue_max = max(self.counters.queue_max, depth)
+
+        start_time = perf_counter()
+
+        self._queue.put((name, image, tag, release))
+
+        self.counters.wait_time += perf_counter() - start_time
+
+    def close(self, raise_error: bool = True) -> None:
+        """
+        Wait for all the queued images to be written, stop the threads and
+        close the sink.
+
+        ---
+        Arguments
+        ---
+
+            raise_error (bool, True)
+        Set whether to raise the first error that occurred in some thread.
+        """
+
+        # One stop signal for each thread.
+        for _ in self._threads:
+            self._queue.put(None)
+
+        for thread in self._threads:
+            thread.join()
+
+        try:
+            self._sink.close()
+
+        except Exception as e:
+            self._fail(e)
+
+        if raise_error:
+            self.check()
+
+    def _fail(self, error: Exception) -> None:
+        """
+        Keep the first error that occurred in some thread.
+        """
+
+        with self._lock:
+            if self._error is None:
+                self._error = error if isinstance(
+                    error, WriteError) else WriteError(str(error))
+
+    def _work(self) -> None:
+        """
+        Encode and write the queued images until a stop signal.
+        """
+
+        while True:
+            item = self._queue.get()
+
+            # Stop signal.
+            if item is None:
+                break
+
+            name, image, tag, release = item
+
+            # After an error, just drain the queue so `submit()` doesn't block.
+            if self._error is not None:
+                if release is not None:
+                    release(image)
+
+                continue
+
+            try:
+                start_time = perf_counter()
+
+                try:
+                    data = self.codec.encode(image)
+
+                # The image is not needed anymore, only its encoded bytes.
+                finally:
+                    if release is not None:
+                        release(image)
+
+                encoded_time = perf_counter()
+
+                size = self._sink.write(name + self.codec.extension, data,
+                                        tag)
+
+                written_time = perf_counter()
+
+                if self.on_written is not None:
+                    self.on_written(tag, name + self.codec.extension, size)
+
+            except Exception as e:
+                self._fail(e)
+
+                continue
+
+            with self._lock:
+                self.counters.written += 1
+                self.counters.bytes += size
+                self.counters.encode_time += encoded_time - start_time
+                self.counters.write_time += written_time - encoded_time
@@ -10,3 +10,39 @@ DEFAULT_MARGIN_V = 1
 
 # Erase the line the cursor is currently on.
 ERASE_LINE = '\033[K'
+
+# Period, in seconds, between two redraws of the progress line.
+PROGRESS_INTERVAL = 0.25
+
+# Period, in seconds, between two progress lines when not in a terminal.
+PROGRESS_LOG_INTERVAL = 5.0
+
+# Exit codes of the non-interactive modes.
+EXIT_SUCCESS = 0
+
+# Some video of a batch failed.
+EXIT_FAILURE = 1
+
+# Some argument is missing or invalid.
+EXIT_USAGE = 2
+
+# The input is missing or is not a valid video file.
+EXIT_INPUT = 3
+
+# The output folder can't be created or written.
+EXIT_OUTPUT = 4
+
+# Some image could not be written.
+EXIT_WRITE = 5
+
+# Interrupted by a signal, e.g., Ctrl+C.
+EXIT_INTERRUPTED = 130
+
+# Default address of the service: host:port, or the path of a Unix socket.
+DEFAULT_SERVICE_ADDRESS = '127.0.0.1:8765'
+
+# Default maximum number of jobs waiting in the service queue.
+DEFAULT_QUEUE_LIMIT = 100
+
+# Number of finished jobs remembered by the service.
+SERVICE_HISTORY = 1000
@@ -0,0 +1,137 @@
+"""
+Structured events of a non-interactive process, as JSON lines.
+"""
+
+from json import dumps
+
+from sys import stdout
+
+from threading import Event, Lock, Thread
+
+from time import perf_counter, time
+
+from typing import Any, Callable, Optional
+
+from modules.utils.constants import PROGRESS_LOG_INTERVAL
+
+
+class EventStream:
+    """
+    Writer of one JSON object per line, each one with its `event` name and
+    its `time`, as a UNIX timestamp.
+
+    The events can be emitted from any thread, and each line is flushed at
+    once, so a supervising process can read them as they come. A thread can
+    also emit an event periodically, with the values returned by some poll
+    function.
+    """
+
+    def __init__(self, stream: Any = stdout) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            stream (Any, stdout)
+        Where to write the events.
+        """
+
+        self.stream = stream
+
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """
+        Write an event.
+
+        ---
+        Arguments
+        ---
+
+            event (str)
+        The event name.
+
+            fields (Any)
+        The event values, serializable as JSON.
+        """
+
+        line = dumps(dict(event=event, time=time(), **fields))
+
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def start_polling(self,
+                      event: str,
+                      poll: Callable[[], dict],
+                      interval: float = PROGRESS_LOG_INTERVAL) -> None:
+        """
+        Start emitting an event periodically, with the elapsed seconds.
+
+        ---
+        Arguments
+        ---
+
+            event (str)
+        The event name.
+
+            poll (Callable[[], dict])
+        Return the event values.
+
+            interval (float, PROGRESS_LOG_INTERVAL)
+        Period, in seconds, between two events.
+        """
+
+        self.stop_polling()
+
+        start_time = perf_counter()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                self.emit(event,
+                          elapsed=perf_counter() - start_time,
+                          **poll())
+
+        self._stop.clear()
+        self._thread = Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop_polling(self) -> None:
+        """
+        Stop emitting the periodic event, if any.
+        """
+
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def error(self, code: int, message: Optional[str] = None) -> int:
+        """
+        Emit an error event.
+
+        ---
+        Arguments
+        ---
+
+            code (int)
+        The exit code.
+
+            message (Optional[str], None)
+        The error message.
+
+        ---
+        Returns
+        ---
+
+            int
+        The exit code, to be returned at once.
+        """
+
+        self.emit('error', code=code, message=message)
+
+        return code
@@ -0,0 +1,176 @@
+"""
+Progress feedback of a long running process, drawn by a single thread.
+"""
+
+from sys import stdout
+
+from threading import Event, Thread
+
+from time import perf_counter
+
+from typing import Any, Callable, Optional, Tuple
+
+from modules.formatter.formatter import Formatter as F
+
+from modules.utils.constants import (ERASE_LINE, PROGRESS_INTERVAL,
+                                     PROGRESS_LOG_INTERVAL)
+
+from modules.utils.utils import _l, humanize_duration
+
+
+class ProgressRenderer:
+    """
+    Thread that redraws the progress of an extraction at a fixed rate.
+
+    The extraction doesn't notify it of each frame. Instead, it polls some
+    counters updated by the extraction anyway, so its cost doesn't depend on
+    the number of frames. In a terminal, a single line is redrawn in place.
+    Otherwise, e.g., when the output is redirected to a log file, a plain line
+    is printed periodically.
+    """
+
+    def __init__(self,
+                 poll: Optional[Callable[[], Tuple[int, int, int, int]]],
+                 total: int = 0,
+                 label: str = 'Extracting',
+                 formatter: F = None,
+                 interval: float = PROGRESS_INTERVAL,
+                 log_interval: float = PROGRESS_LOG_INTERVAL,
+                 stream: Any = stdout) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            poll (Optional[Callable[[], Tuple[int, int, int, int]]])
+        Return the number of frames processed, the number of frames decoded,
+        and the number and the total size, in bytes, of the images stored. If
+        None, only the elapsed time is shown.
+
+            total (int, 0)
+        The total of frames, if known, to show the percent done and the ETA.
+
+            label (str, 'Extracting')
+        Some string to print before the progress.
+
+            formatter (Formatter, None)
+        A Formatter for the progress line in a terminal.
+
+            interval (float, PROGRESS_INTERVAL)
+        Period, in seconds, between two redraws in a terminal.
+
+            log_interval (float, PROGRESS_LOG_INTERVAL)
+        Period, in seconds, between two lines when not in a terminal.
+
+            stream (Any, stdout)
+        Where to write the progress.
+        """
+
+        self.poll = poll
+        self.total = total
+        self.label = label
+        self.formatter = formatter if formatter is not None else F()
+        self.stream = stream
+
+        # Redraw in place only in a terminal.
+        self.is_terminal = bool(getattr(stream, 'isatty', lambda: False)())
+        self.interval = interval if self.is_terminal else log_interval
+
+        self._stop = Event()
+        self._thread = None
+        self._start_time = None
+
+    def __enter__(self) -> 'ProgressRenderer':
+        self.start()
+
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """
+        Start drawing the progress.
+        """
+
+        self._start_time = perf_counter()
+
+        self._stop.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop drawing the progress and clear the line, if in a terminal.
+        """
+
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+        if self.is_terminal:
+            self.stream.write('\r{}'.format(ERASE_LINE))
+            self.stream.flush()
+
+    def line(self) -> str:
+        """
+        Return the current progress, in a single line.
+
+        ---
+        Returns
+        ---
+
+            str
+        The processed and the extracted frames, the decoding frame rate, the
+        writing speed, the percent done and the ETA, as far as known.
+        """
+
+        elapsed = perf_counter() - self._start_time
+
+        parts = [self.label]
+
+        if self.poll is None:
+            parts.append('elapsed {}'.format(humanize_duration(elapsed, 1)))
+
+            return ' | '.join(parts)
+
+        processed, decoded, stored, size = self.poll()
+
+        if self.total > 0:
+            parts.append('frame {}/{} ({:.1f}%)'.format(
+                processed, self.total,
+                min(processed / self.total, 1) * 100))
+        else:
+            parts.append('frame {}'.format(processed))
+
+        parts.append('{} extracted'.format(stored))
+
+        if elapsed > 0:
+            parts.append('{:.1f} decoded/s'.format(decoded / elapsed))
+            parts.append('{:.2f} MB/s'.format(size / (1024 * 1024) / elapsed))
+
+        # Estimate the remaining time from the average speed.
+        if self.total > 0 and 0 < processed < self.total:
+            parts.append('ETA {}'.format(
+                humanize_duration(
+                    (self.total - processed) * elapsed / processed, 1)))
+
+        return ' | '.join(parts)
+
+    def _run(self) -> None:
+        """
+        Draw the progress until stopped.
+        """
+
+        while not self._stop.wait(self.interval):
+            if self.is_terminal:
+                self.stream.write('\r{}{}'.format(
+                    self.formatter.erase(_l(self.line())), ERASE_LINE))
+
+            else:
+                self.stream.write(_l(self.line()) + '\n')
+
+            self.stream.flush()
@@ -0,0 +1,691 @@
+"""
+Local service running jobs on a pool of worker processes, started once, with
+a bounded priority queue and an HTTP interface.
+"""
+
+from errno import EADDRINUSE
+
+from heapq import heappop, heappush
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from itertools import count
+
+from json import dumps, loads
+
+from multiprocessing import Pool, RawArray
+
+from os import path, remove, stat, strerror
+
+from signal import SIG_IGN, SIGINT, signal
+
+from socket import AF_UNIX, SOCK_STREAM, socket
+
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from stat import S_ISSOCK
+
+from threading import Lock
+
+from time import time
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from uuid import uuid4
+
+from modules.utils.constants import (DEFAULT_QUEUE_LIMIT, EXIT_INTERRUPTED,
+                                     EXIT_SUCCESS, SERVICE_HISTORY)
+
+# Size, in bytes, of the end of an events file read for the last event.
+TAIL_SIZE = 64 * 1024
+
+# Cancellation flags of the worker slots, set up in each worker process.
+_flags = None
+
+# The function running the jobs, set up in each worker process.
+_run = None
+
+
+class QueueFull(Exception):
+    """
+    Raised when the queue already holds its maximum of waiting jobs.
+    """
+
+
+class Job:
+    """
+    A job submitted to the service.
+
+    ---
+    Attributes
+    ---
+
+        id (str)
+    The unique identifier.
+
+        params (dict)
+    The parameters of the job, as validated when submitted.
+
+        priority (int)
+    The jobs with a higher priority run first, and the ones with the same
+    priority in the order they were submitted.
+
+        state (str)
+    `'queued'`, `'running'`, `'done'`, `'failed'` or `'cancelled'`.
+
+        events_file (str)
+    The path of the JSON lines events reported by the job.
+
+        exit_code (Optional[int])
+    The exit code of the job, once finished.
+
+        error (Optional[str])
+    The error raised by the job, if it crashed.
+
+        submitted (float)
+    When the job was submitted, as a UNIX timestamp.
+
+        started (Optional[float])
+    When the job started running.
+
+        finished (Optional[float])
+    When the job finished.
+    """
+
+    def __init__(self, params: dict, priority: int, events_dir: str) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            params (dict)
+        The parameters of the job.
+
+            priority (int)
+        The priority of the job.
+
+            events_dir (str)
+        The path of the folder of the events files.
+        """
+
+        self.id = uuid4().hex
+        self.params = params
+        self.priority = priority
+        self.state = 'queued'
+        self.events_file = path.join(events_dir, '{}.jsonl'.format(self.id))
+
+        self.exit_code = None
+        self.error = None
+
+        self.submitted = time()
+        self.started = None
+        self.finished = None
+
+        # The worker slot of the job, while running.
+        self._slot = None
+
+    @property
+    def is_finished(self) -> bool:
+        """
+        Whether the job is done, failed or was cancelled.
+        """
+
+        return self.state in ('done', 'failed', 'cancelled')
+
+    def status(self) -> dict:
+        """
+        Return the state of the job and its last event.
+
+        ---
+        Returns
+        ---
+
+            dict
+        The job attributes, but the parameters, and the `last_event`, if any.
+        Ready to be sent as JSON.
+        """
+
+        return {
+            'id': self.id,
+            'priority': self.priority,
+            'state': self.state,
+            'exit_code': self.exit_code,
+            'error': self.error,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+            'last_event': last_event(self.events_file)
+        }
+
+
+def last_event(events_file: str) -> Optional[dict]:
+    """
+    Read the last event of an events file, without reading all of it.
+
+    ---
+    Arguments
+    ---
+
+        events_file (str)
+    The path of the JSON lines file.
+
+    ---
+    Returns
+    ---
+
+        Optional[dict]
+    The last event, or None if there is none yet.
+    """
+
+    try:
+        with open(events_file, 'rb') as file:
+            file.seek(max(path.getsize(events_file) - TAIL_SIZE, 0))
+
+            lines = file.read().splitlines()
+
+    except OSError:
+        return None
+
+    # The last complete line, skipping one being written.
+    for line in reversed(lines):
+        try:
+            return loads(line.decode())
+
+        except ValueError:
+            continue
+
+    return None
+
+
+def _init_worker(flags: Any, run: Callable[[dict, str, Callable[[], bool]],
+                                           int]) -> None:
+    """
+    Set up a worker process, once for all its jobs.
+    """
+
+    global _flags, _run
+
+    _flags = flags
+    _run = run
+
+    # Only the service handles Ctrl+C, and stops the jobs.
+    signal(SIGINT, SIG_IGN)
+
+
+def _run_job(slot: int, params: dict, events_file: str) -> int:
+    """
+    Run a job in a worker process, checking its cancellation flag.
+    """
+
+    return _run(params, events_file, lambda: _flags[slot] != 0)
+
+
+class JobQueue:
+    """
+    Bounded priority queue of jobs, run by a pool of worker processes started
+    at once, so no job pays for starting the interpreter and importing the
+    libraries.
+
+    Each worker has a slot with a cancellation flag in shared memory, which a
+    running job polls, so it can be cancelled without killing the worker.
+    """
+
+    def __init__(self,
+                 run: Callable[[dict, str, Callable[[], bool]], int],
+                 workers: int,
+                 events_dir: str,
+                 limit: int = DEFAULT_QUEUE_LIMIT,
+                 history: int = SERVICE_HISTORY) -> None:
+        """
+        ---
+        Arguments
+        ---
+
+            run (Callable[[dict, str, Callable[[], bool]], int])
+        Run a job in a worker, with its parameters, the path of the file
+        where to append its JSON lines events and a function returning
+        whether it was cancelled. Return the exit code. It must be a module
+        level function.
+
+            workers (int)
+        The number of worker processes, that is, of jobs running at once.
+
+            events_dir (str)
+        The path of an existing folder for the events files.
+
+            limit (int, DEFAULT_QUEUE_LIMIT)
+        The maximum number of jobs waiting to run.
+
+            history (int, SERVICE_HISTORY)
+        The number of finished jobs remembered, with their events files.
+        """
+
+        self.workers = max(int(workers), 1)
+        self.events_dir = events_dir
+        self.limit = limit
+        self.history = history
+
+        self._lock = Lock()
+        self._jobs = {}  # type: Dict[str, Job]
+        self._heap = []  # type: List[Tuple[int, int, Job]]
+        self._order = count()
+        self._queued = 0
+        self._finished = []  # type: List[Job]
+
+        self._flags = RawArray('b', self.workers)
+        self._free = list(range(self.workers))
+
+        self._pool = Pool(self.workers, _init_worker, (self._flags, run))
+
+    def submit(self, params: dict, priority: int = 0) -> Job:
+        """
+        Queue a job.
+
+        ---
+        Arguments
+        ---
+
+            params (dict)
+        The parameters of the job.
+
+            priority (int, 0)
+        The jobs with a higher priority run first.
+
+        ---
+        Returns
+        ---
+
+            Job
+        The job queued.
+
+        ---
+        Raises
+        ---
+
+            QueueFull
+        If the queue already holds its maximum of waiting jobs.
+        """
+
+        with self._lock:
+            if self._queued >= self.limit:
+                raise QueueFull(
+                    'The queue is full, {} jobs are waiting'.format(
+                        self._queued))
+
+            job = Job(params, int(priority), self.events_dir)
+
+            self._jobs[job.id] = job
+
+            heappush(self._heap, (-job.priority, next(self._order), job))
+            self._queued += 1
+
+            self._dispatch()
+
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Return a job, if known.
+        """
+
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        """
+        Return the jobs known, in the order they were submitted.
+        """
+
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job. A waiting job is dropped at once, and a running one stops
+        at its next check.
+
+        ---
+        Arguments
+        ---
+
+            job_id (str)
+        The job identifier.
+
+        ---
+        Returns
+        ---
+
+            Optional[Job]
+        The job, or None if not known.
+        """
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+
+            if job is None or job.is_finished:
+                return job
+
+            if job.state == 'queued':
+                self._queued -= 1
+                self._finish(job, 'cancelled', None)
+
+            else:
+                self._flags[job._slot] = 1
+
+            return job
+
+    def stats(self) -> dict:
+        """
+        Return the number of `workers`, and of `queued` and `running` jobs.
+        """
+
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queued': self._queued,
+                'running': self.workers - len(self._free),
+                'limit': self.limit
+            }
+
+    def stop(self) -> None:
+        """
+        Drop the waiting jobs, cancel the running ones and stop the workers
+        once they are done.
+        """
+
+        with self._lock:
+            for _, _, job in self._heap:
+                if job.state == 'queued':
+                    self._finish(job, 'cancelled', None)
+
+            self._heap = []
+            self._queued = 0
+
+            for slot in range(self.workers):
+                self._flags[slot] = 1
+
+        self._pool.close()
+        self._pool.join()
+
+    def _dispatch(self) -> None:
+        """
+        Start the waiting jobs with the highest priority on the free workers,
+        with the lock held.
+        """
+
+        while self._free and self._heap:
+            _, _, job = heappop(self._heap)
+
+            # Cancelled while waiting.
+            if job.state != 'queued':
+                continue
+
+            self._queued -= 1
+
+            job._slot = self._free.pop()
+            job.state = 'running'
+            job.started = time()
+
+            self._flags[job._slot] = 0
+
+            self._pool.apply_async(
+                _run_job, (job._slot, job.params, job.events_file),
+                callback=lambda code, job=job: self._done(job, code),
+                error_callback=lambda e, job=job: self._done(job, None, e))
+
+    def _done(self,
+              job: Job,
+              exit_code: Optional[int],
+              exception: Optional[BaseException] = None) -> None:
+        """
+        Record the end of a running job and start the next one.
+        """
+
+        with self._lock:
+            cancelled = self._flags[job._slot] != 0
+
+            self._free.append(job._slot)
+            job._slot = None
+
+            job.error = None if exception is None else (
+                str(exception) or type(exception).__name__)
+
+            if cancelled and exit_code in (EXIT_INTERRUPTED, None):
+                state = 'cancelled'
+
+            elif exit_code == EXIT_SUCCESS:
+                state = 'done'
+
+            else:
+                state = 'failed'
+
+            self._finish(job, state, exit_code)
+
+            self._dispatch()
+
+    def _finish(self, job: Job, state: str, exit_code: Optional[int]) -> None:
+        """
+        Mark a job as finished and forget the oldest finished ones, with the
+        lock held.
+        """
+
+        job.state = state
+        job.exit_code = exit_code
+        job.finished = time()
+
+        self._finished.append(job)
+
+        while len(self._finished) > self.history:
+            old = self._finished.pop(0)
+
+            self._jobs.pop(old.id, None)
+
+            if path.isfile(old.events_file):
+                remove(old.events_file)
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """
+    HTTP server listening on a Unix socket, a thread per request.
+    """
+
+    daemon_threads = True
+
+
+def request_handler(queue: JobQueue,
+                    validate: Callable[[dict], dict]) -> type:
+    """
+    Make the handler of the HTTP requests to a job queue.
+
+    The routes are:
+
+    - `POST /jobs`, with a JSON object of the job, queues it;
+    - `GET /jobs` lists the jobs;
+    - `GET /jobs/<id>` returns the state and the last event of a job;
+    - `GET /jobs/<id>/events` returns all the events of a job, as JSON lines;
+    - `DELETE /jobs/<id>` cancels a job;
+    - `GET /health` returns the workers and the numbers of jobs.
+
+    ---
+    Arguments
+    ---
+
+        queue (JobQueue)
+    The job queue.
+
+        validate (Callable[[dict], dict])
+    Return the parameters of a job from the object posted, or raise a
+    ValueError with the reason it is invalid.
+
+    ---
+    Returns
+    ---
+
+        type
+    The request handler class.
+    """
+
+    class RequestHandler(BaseHTTPRequestHandler):
+        """
+        Handler of the requests to the job queue.
+        """
+
+        def do_GET(self) -> None:
+            parts = self.path.strip('/').split('/')
+
+            if parts == ['health']:
+                return self._send(200, queue.stats())
+
+            if parts == ['jobs']:
+                return self._send(
+                    200, {'jobs': [job.status() for job in queue.jobs()]})
+
+            job = queue.get(parts[1]) if len(parts) in (
+                2, 3) and parts[0] == 'jobs' else None
+
+            if job is None or (len(parts) == 3 and parts[2] != 'events'):
+                return self._send(404, {'error': 'Not found'})
+
+            if len(parts) == 2:
+                return self._send(200, job.status())
+
+            try:
+                with open(job.events_file, 'rb') as file:
+                    body = file.read()
+
+            # No event yet.
+            except OSError:
+                body = b''
+
+            self._send_bytes(200, body, 'application/x-ndjson')
+
+        def do_POST(self) -> None:
+            if self.path.strip('/') != 'jobs':
+                return self._send(404, {'error': 'Not found'})
+
+            try:
+                body = loads(
+                    self.rfile.read(int(self.headers.get('Content-Length',
+                                                         0))).decode() or '{}')
+
+                if not isinstance(body, dict):
+                    raise ValueError('The job must be a JSON object')
+
+                params = validate(body)
+                priority = int(body.get('priority', 0))
+
+            except (ValueError, TypeError) as e:
+                return self._send(400, {'error': str(e)})
+
+            try:
+                job = queue.submit(params, priority)
+
+            except QueueFull as e:
+                return self._send(503, {'error': str(e)})
+
+            self._send(202, job.status())
+
+        def do_DELETE(self) -> None:
+            parts = self.path.strip('/').split('/')
+
+            job = queue.cancel(parts[1]) if len(parts) == 2 and parts[
+                0] == 'jobs' else None
+
+            if job is None:
+                return self._send(404, {'error': 'Not found'})
+
+            self._send(200, job.status())
+
+        def address_string(self) -> str:
+
+            # A Unix socket has no client address.
+            return self.client_address[0] if isinstance(
+                self.client_address, tuple) else 'local'
+
+        def log_message(self, *args: Any) -> None:
+
+            # The service reports only its own events.
+            pass
+
+        def _send(self, status: int, value: dict) -> None:
+            self._send_bytes(status, (dumps(value) + '\n').encode(),
+                             'application/json')
+
+        def _send_bytes(self, status: int, body: bytes,
+                        content_type: str) -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return RequestHandler
+
+
+def make_server(address: str, handler: type) -> Any:
+    """
+    Make an HTTP server listening on a local address.
+
+    ---
+    Arguments
+    ---
+
+        address (str)
+    `host:port`, or the path of a Unix socket, replaced if it exists but no
+    service listens on it, e.g., left by a previous service.
+
+        handler (type)
+    The request handler class.
+
+    ---
+    Returns
+    ---
+
+        socketserver.BaseServer
+    The server, not serving yet.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If the address is not valid, or is the path of a file other than a
+    socket.
+
+        OSError
+    If the address can't be listened on, e.g., if some service already
+    listens on it.
+    """
+
+    # A path, e.g., `./extractor.sock` or `/run/extractor.sock`.
+    if '/' in address or address.endswith('.sock'):
+        if path.exists(address):
+
+            # Never remove anything else, e.g., a mistyped path of some file.
+            if not S_ISSOCK(stat(address).st_mode):
+                raise ValueError('Not a socket')
+
+            probe = socket(AF_UNIX, SOCK_STREAM)
+
+            # Left by a service that stopped, so nothing accepts connections.
+            try:
+                probe.connect(address)
+
+            except ConnectionRefusedError:
+                remove(address)
+
+            # Some service is listening on it, as on a TCP port in use.
+            else:
+                raise OSError(EADDRINUSE, strerror(EADDRINUSE))
+
+            finally:
+                probe.close()
+
+        return UnixHTTPServer(address, handler)
+
+    host, _, port = address.rpartition(':')
+
+    if not port.isdigit():
+        raise ValueError('The address must be host:port or a socket path')
+
+    return ThreadingHTTPServer((host or '127.0.0.1', int(port)), handler)
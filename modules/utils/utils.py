@@ -1,19 +1,13 @@
-from itertools import cycle
-
 from os import name, system
 
-from sys import stdin, stdout
-
-from threading import current_thread
+from sys import stdin
 
-from time import sleep
-
-from typing import Optional
+from typing import List, Optional, Sequence
 
 from modules.formatter.formatter import Formatter as F
 
 from modules.utils.constants import (DEFAULT_MARGIN_H as def_h,
-                                     DEFAULT_MARGIN_V as def_v, ERASE_LINE)
+                                     DEFAULT_MARGIN_V as def_v)
 
 from modules.utils.settings import MESSAGE_FORMATTER as message
 
@@ -133,63 +127,6 @@ def clear() -> None:
         pass
 
 
-def ellipsis(string: str = '',
-             formatter: F = None,
-             max_points: int = 3,
-             freq: float = 2.0) -> None:
-    """
-    Show a ellipsis feedback animation while a process is running.
-
-    ---
-    Arguments
-    ---
-
-        string (str, '')
-    Some string to print before the ellipsis.
-
-        formatter (Formatter, None)
-    A Formatter for the final printed string.
-
-        max_points (int, 3)
-    Maximum number of points for the ellipsis.
-
-        freq (float, 2.0)
-    Frequency of the animation cycle.
-    """
-
-    # Get the current thread.
-    thread = current_thread()
-
-    # The threads start alive.
-    thread.alive = True
-
-    # If a Formatter was not provided,...
-    if formatter is None:
-
-        # ... instantiate a new one.
-        formatter = F()
-
-    # List the animation pieces.
-    chars = ['.' * i for i in range(1, max_points + 1)]
-
-    # The animation cycles through the elements of the pieces list.
-    for char in cycle(chars):
-
-        # If the thread has stopped,...
-        if not thread.alive:
-
-            # ... then stop the animation.
-            break
-
-        # Print the string followed by the current piece.
-        stdout.write('\r{}{}'.format(formatter.erase(string + char),
-                                     ERASE_LINE))
-        stdout.flush()
-
-        # Pause for a period.
-        sleep(1 / freq)
-
-
 def error(string: str) -> F:
     """
     Show a formatted error message.
@@ -446,6 +383,51 @@ def success(string: str) -> F:
     return message.erase().green(string)
 
 
+def table_lines(rows: List[Sequence[str]],
+                left_columns: Sequence[int] = (0, )) -> List[str]:
+    """
+    Format some rows as the lines of a table with aligned columns.
+
+    ---
+    Arguments
+    ---
+
+        rows (List[Sequence[str]])
+    The rows of the table, all with the same number of cells.
+
+        left_columns (Sequence[int], (0, ))
+    The indices of the columns aligned to the left. Negative indices count
+    from the last column. The others are aligned to the right.
+
+    ---
+    Returns
+    ---
+
+        List[str]
+    The formatted lines.
+    """
+
+    # Nothing to format.
+    if not rows:
+        return []
+
+    columns = len(rows[0])
+
+    # Get the width of each column.
+    widths = [max(len(row[i]) for row in rows) for i in range(columns)]
+
+    # Get the non-negative indices of the left aligned columns.
+    left_columns = [i % columns for i in left_columns]
+
+    # Return the joining of the aligned cells of each row.
+    return [
+        '  '.join(
+            cell.ljust(width) if i in left_columns else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(row, widths))).rstrip()
+        for row in rows
+    ]
+
+
 def warning(string: str) -> F:
     """
     Show a formatted warning message.
@@ -0,0 +1,85 @@
+from argparse import ArgumentParser
+
+from json import dumps
+
+from os import path
+
+from sys import exit
+
+from modules.extractor.constants import VIDEO_EXTENSIONS
+
+from modules.extractor.probe import probe_videos
+
+from modules.extractor.sources import find_videos
+
+from modules.utils.constants import EXIT_FAILURE, EXIT_INPUT, EXIT_SUCCESS
+
+
+def parse_arguments() -> dict:
+    """
+    Construct the arguments parser and parse them.
+
+    ---
+    Returns
+    ---
+
+        dict
+    The arguments values.
+    """
+
+    parser = ArgumentParser(
+        description='Prints the metadata of video files as JSON lines')
+
+    parser.add_argument('input',
+                        nargs='+',
+                        help='video file, folder, glob pattern or manifest '
+                        'file')
+
+    parser.add_argument('--no-cache',
+                        action='store_true',
+                        help='probe every video, without reading or updating '
+                        'the metadata cached in their folders')
+
+    return vars(parser.parse_args())
+
+
+def main() -> None:
+    """
+    Print the frames, the frame rate, the resolution, the duration and the
+    codec of each video, one JSON object per line.
+
+    The video library is imported only if some video is not cached yet.
+    """
+
+    args = parse_arguments()
+
+    video_files = []
+
+    for source in args['input']:
+
+        # A video file, instead of a manifest listing them.
+        if path.isfile(source) and path.splitext(
+                source)[1].lower() in VIDEO_EXTENSIONS:
+            video_files.append(path.abspath(source))
+
+        else:
+            video_files.extend(find_videos(source))
+
+    # Nothing to probe.
+    if not video_files:
+        print(dumps({'error': 'No video files found'}))
+
+        exit(EXIT_INPUT)
+
+    failed = False
+
+    for metadata in probe_videos(video_files, not args['no_cache']):
+        print(dumps(metadata))
+
+        failed = failed or 'error' in metadata
+
+    exit(EXIT_FAILURE if failed else EXIT_SUCCESS)
+
+
+if __name__ == '__main__':
+    main()
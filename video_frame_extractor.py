@@ -2,102 +2,164 @@ from argparse import ArgumentParser
 
 from datetime import datetime
 
-from imutils import is_cv2
+from errno import EACCES, EISDIR, ENOENT
 
-from os import W_OK, access, mkdir, path
+from json import dumps, loads
 
-from threading import Thread
+from os import (W_OK, access, cpu_count, makedirs, mkdir, path, remove,
+                strerror)
 
-import cv2
+from shutil import rmtree
 
-from modules.formatter.formatter import Formatter as F
+from signal import SIG_IGN, SIGINT, SIGTERM, signal
 
-from modules.utils.utils import (_l, _lt, ellipsis, error, header,
-                                 humanize_duration, info, press_enter_to,
-                                 success, warning)
+from sys import exit, stderr
 
+from tempfile import mkdtemp
 
-def can_extract_at(index: int) -> bool:
-    """
-    Check whether to extract the image from a frame at `index`.
+from typing import Callable, Optional
 
-    ---
-    Arguments
-    ---
+from modules.extractor.batch import BatchResult, run_batch, summary_table
 
-        index (int)
-    The current frame index.
+from modules.extractor.benchmark import (BENCHMARK_VIDEOS, DEFAULT_TOLERANCE,
+                                         QUICK_OFFSETS, QUICK_OUTPUTS,
+                                         QUICK_RATES, QUICK_VIDEOS,
+                                         benchmark_cases, compare_results,
+                                         make_videos, run_benchmark)
 
-    ---
-    Returns
-    ---
+from modules.extractor.cache import ResultCache
 
-        bool
-    True if the image from the frame can be extracted.
-    """
+from modules.extractor.codecs import (COMPARED_CODECS, IMAGE_FORMATS,
+                                     compare_codecs)
 
-    # Use the user inputs.
-    global extraction_rate, offset
+from modules.extractor.constants import (DEFAULT_CACHE_SIZE,
+                                         DEFAULT_CODEC_SAMPLES,
+                                         DEFAULT_DEDUP_CAPACITY,
+                                         DEFAULT_QUEUE_SIZE,
+                                         DEFAULT_SHARD_SIZE, DEFAULT_WRITERS,
+                                         MANIFEST_FILENAME)
 
-    return index >= offset and (index % extraction_rate) + offset == (
-        offset % extraction_rate) + offset
+from modules.extractor.decoders import DecodeError
 
+from modules.extractor.extractor import (DECODERS, READ_MODES,
+                                         FrameExtractor)
 
-def print_video_information() -> None:
-    """
-    Print some information about the video file.
-    """
+from modules.extractor.reader import ReadCounters
 
-    # Use the global variables.
-    global FRAMES, FPS, WIDTH, HEIGHT, VIDEO_STREAM
+from modules.extractor.metrics import (STAGES, MetricsExporter,
+                                       prometheus_text, write_textfile)
 
-    # Use the user input variables.
-    global video_file, extraction_rate, offset, output_dir
+from modules.extractor.output import OUTPUT_MODES, OutputOptions
 
-    print(_l('{} {}'.format(info('Input video:'), video_file)))
+from modules.extractor.schedule import (FrameSchedule, parse_ranges,
+                                        parse_time, read_ranges_file)
 
-    # Try to determine some information about the video file.
-    try:
+from modules.extractor.selection import (SCENE_METHODS, DuplicateFilter,
+                                        SceneDetector)
+
+from modules.extractor.sinks import STDOUT
+
+from modules.extractor.sources import (STDIN, StreamError, find_videos,
+                                       is_stream)
+
+from modules.extractor.transform import (FrameTransform, parse_geometry,
+                                         parse_size)
+
+from modules.extractor.writer import WriteError
+
+from modules.formatter.formatter import Formatter as F
+
+from modules.utils.constants import (DEFAULT_QUEUE_LIMIT,
+                                     DEFAULT_SERVICE_ADDRESS, EXIT_FAILURE,
+                                     EXIT_INPUT, EXIT_INTERRUPTED, EXIT_OUTPUT,
+                                     EXIT_SUCCESS, EXIT_USAGE, EXIT_WRITE)
+
+from modules.utils.events import EventStream
+
+from modules.utils.progress import ProgressRenderer
+
+from modules.utils.service import JobQueue, make_server, request_handler
+
+from modules.utils.utils import (_l, _lt, error, header, humanize_duration,
+                                 info, press_enter_to, success, table_lines,
+                                 warning)
+
+
+def print_video_information(extractor: FrameExtractor,
+                            extraction_rate: Optional[int] = None,
+                            offset: Optional[int] = None,
+                            output_dir: Optional[str] = None) -> None:
+    """
+    Print some information about the video file.
+
+    ---
+    Arguments
+    ---
+
+        extractor (FrameExtractor)
+    The extractor of the input video file.
 
-        # Get the total number of frames.
-        FRAMES = int(
-            VIDEO_STREAM.get(cv2.cv.CV_CAP_PROP_FRAME_COUNT if is_cv2(
-            ) else cv2.CAP_PROP_FRAME_COUNT))
+        extraction_rate (Optional[int], None)
+    The extraction rate, if already defined.
 
-        # Get the frame rate.
-        FPS = float(
-            VIDEO_STREAM.get(
-                cv2.cv.CV_CAP_PROP_FPS if is_cv2() else cv2.CAP_PROP_FPS))
+        offset (Optional[int], None)
+    The offset, if already defined.
 
-        # Get the frames width.
-        WIDTH = int(
-            VIDEO_STREAM.get(cv2.cv.CV_CAP_PROP_FRAME_WIDTH if is_cv2(
-            ) else cv2.CAP_PROP_FRAME_WIDTH))
+        output_dir (Optional[str], None)
+    The output folder, if already defined.
+    """
 
-        # Get the frames height.
-        HEIGHT = int(
-            VIDEO_STREAM.get(cv2.cv.CV_CAP_PROP_FRAME_HEIGHT if is_cv2(
-            ) else cv2.CAP_PROP_FRAME_HEIGHT))
+    print(_l('{} {}'.format(info('Input video:'), extractor.video_file)))
 
-        # Print these information.
+    # Print some information about the video file, if it could be determined.
+    if extractor.frames > 0 and extractor.fps > 0:
         print(
             _lt('{} {}'.format(info('Duration:'),
-                               humanize_duration(FRAMES / FPS))))
+                               humanize_duration(extractor.duration))))
+
+        print(_lt('{} {}'.format(info('Total of frames:'), extractor.frames)))
+        print(_l('{} {}'.format(info('Frame rate (FPS):'), extractor.fps)))
 
-        print(_lt('{} {}'.format(info('Total of frames:'), FRAMES)))
-        print(_l('{} {}'.format(info('Frame rate (FPS):'), FPS)))
+        # Show whether the total of frames and the times are exact.
+        if extractor.index is not None:
+            print(
+                _l('{} {}'.format(
+                    info('Frame index:'), 'yes ({} keyframes)'.format(
+                        extractor.index.keyframes.size) if extractor.index.
+                    keyframes is not None else 'yes')))
+
+        print(
+            _lt('{} {}x{}'.format(info('Resolution:'), extractor.width,
+                                  extractor.height)))
 
-        print(_lt('{} {}x{}'.format(info('Resolution:'), WIDTH, HEIGHT)))
+        # Show the resolution of the images, if they are resized or cropped.
+        if extractor.transform is not None:
+            print(
+                _l('{} {}x{}'.format(
+                    info('Output resolution:'),
+                    *extractor.transform.output_size(extractor.width,
+                                                     extractor.height))))
 
-    # An error occurred while trying to determine some information about the
-    # video.
-    except:
+    # It could not determine some information about the video.
+    else:
         print(
             _lt(warning(
                 'Could not determine any information about the video!')))
 
+    # Show the schedule, which replaces the extraction rate and the offset.
+    if extractor.schedule is not None:
+        print(
+            _lt('{} {}'.format(F().bold().magenta('Frame selection:'),
+                               extractor.schedule.describe())))
+
+        # Show the output path, if already defined.
+        if output_dir is not None:
+            print(
+                _lt('{} {}'.format(F().bold().magenta('Output folder:'),
+                                   output_dir)))
+
     # Show the extraction rate, if already defined.
-    if extraction_rate is not None:
+    elif extraction_rate is not None:
         print(
             _lt('{} {}'.format(F().bold().magenta('Extraction frame rate:'),
                                extraction_rate)))
@@ -115,343 +177,2063 @@ def print_video_information() -> None:
                                        output_dir)))
 
 
-# Construct the arguments parser and parse them.
-parser = ArgumentParser(
-    description='Extracts frames from an input video and exports them to images'
-)
+def argument_parser(add_help: bool = True) -> ArgumentParser:
+    """
+    Construct the arguments parser.
 
-parser.add_argument('-i', '--input', help='path to the input video file')
+    ---
+    Arguments
+    ---
 
-parser.add_argument('-r',
-                    '--extraction-rate',
-                    type=int,
-                    help='extraction frame rate')
+        add_help (bool, True)
+    Set whether to add the `-h` `--help` argument, which prints the usage and
+    exits.
 
-parser.add_argument('-o', '--offset', type=int, help='frame offset')
+    ---
+    Returns
+    ---
 
-parser.add_argument('-C',
-                    '--output',
-                    nargs='?',
-                    const='',
-                    help='output path for image files')
+        ArgumentParser
+    The arguments parser.
+    """
 
-args = vars(parser.parse_args())
+    parser = ArgumentParser(
+        description=
+        'Extracts frames from an input video and exports them to images',
+        add_help=add_help)
+
+    parser.add_argument('-i',
+                        '--input',
+                        help='path to the input video file, or - to read it '
+                        'from the standard input in headless mode')
+
+    parser.add_argument('-r',
+                        '--extraction-rate',
+                        type=int,
+                        help='extraction frame rate')
+
+    parser.add_argument('-o', '--offset', type=int, help='frame offset')
+
+    # The schedules replace the extraction rate and the offset.
+    schedule = parser.add_mutually_exclusive_group()
+
+    schedule.add_argument('--every',
+                          type=parse_time,
+                          help='extract a frame every this time, in seconds '
+                          'or as [hh:]mm:ss[.ms]')
+
+    schedule.add_argument('--at',
+                          help='comma separated times of the frames to '
+                          'extract, in seconds or as [hh:]mm:ss[.ms]')
+
+    schedule.add_argument('--frames',
+                          type=parse_ranges,
+                          help='comma separated indices or inclusive ranges '
+                          'of the frames to extract, as N, A-B or A-B:STEP')
+
+    schedule.add_argument('--frames-file',
+                          help='path to a text file listing the indices or '
+                          'ranges of the frames to extract, one per line')
+
+    parser.add_argument('-C',
+                        '--output',
+                        nargs='?',
+                        const='',
+                        help='output path for image files, or of the stream '
+                        'in the stream output mode, where - or none is the '
+                        'standard output')
+
+    parser.add_argument('--resume',
+                        action='store_true',
+                        help='keep the images written by a previous '
+                        'extraction to the output folder with the same '
+                        'parameters and extract only the missing ones')
+
+    parser.add_argument('--cache-dir',
+                        help='path to a cache of the images of previous '
+                        'extractions, linked instead of decoding the video '
+                        'again')
+
+    parser.add_argument(
+        '--cache-size',
+        type=float,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help='maximum size of the cache, in MB, evicting the least recently '
+        'used extractions (default: {})'.format(DEFAULT_CACHE_SIZE //
+                                                (1024 * 1024)))
+
+    parser.add_argument(
+        '--read-mode',
+        choices=READ_MODES,
+        default='auto',
+        help='how to reach the selected frames (default: auto)')
+
+    parser.add_argument(
+        '--decoder',
+        choices=DECODERS,
+        default='opencv',
+        help='backend decoding the video, where ffmpeg drops the frames not '
+        'selected before they leave the decoder (default: opencv)')
+
+    parser.add_argument(
+        '--decoder-threads',
+        type=int,
+        default=0,
+        help='number of threads of the ffmpeg decoder (default: 0, chosen by '
+        'ffmpeg)')
+
+    index = parser.add_mutually_exclusive_group()
+
+    index.add_argument('--index',
+                       action='store_true',
+                       help='index the frames of the video, unless indexed '
+                       'by a previous run, for the exact total of frames and '
+                       'times, and a keyframe-aware seeking')
+
+    index.add_argument('--no-index',
+                       action='store_true',
+                       help='ignore the frame index stored next to the video')
+
+    parser.add_argument(
+        '--writers',
+        type=int,
+        default=DEFAULT_WRITERS,
+        help='number of threads writing the images (default: {})'.format(
+            DEFAULT_WRITERS))
+
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help='maximum number of frames waiting to be written (default: {})'.
+        format(DEFAULT_QUEUE_SIZE))
+
+    parser.add_argument(
+        '--output-mode',
+        choices=OUTPUT_MODES,
+        default='files',
+        help='store the images as files, in tar shards, or the raw frames in '
+        'a single NPY dataset with an index (default: files)')
+
+    parser.add_argument(
+        '--shard-size',
+        type=float,
+        default=DEFAULT_SHARD_SIZE // (1024 * 1024),
+        help='maximum size of each tar shard, in MB (default: {})'.format(
+            DEFAULT_SHARD_SIZE // (1024 * 1024)))
+
+    parser.add_argument('-f',
+                        '--format',
+                        choices=IMAGE_FORMATS,
+                        default='jpg',
+                        help='format of the images (default: jpg)')
+
+    parser.add_argument('-q',
+                        '--quality',
+                        type=int,
+                        help='JPEG or WebP quality, from 0 to 100')
+
+    parser.add_argument('--png-compression',
+                        type=int,
+                        help='PNG compression level, from 0 to 9')
+
+    parser.add_argument('--jpeg-optimize',
+                        action='store_true',
+                        help='optimize the JPEG Huffman tables')
+
+    parser.add_argument('--jpeg-progressive',
+                        action='store_true',
+                        help='encode progressive JPEG images')
+
+    parser.add_argument(
+        '--compare-codecs',
+        type=int,
+        nargs='?',
+        const=DEFAULT_CODEC_SAMPLES,
+        help='compare the encode time and size of the image formats on a '
+        'sample of frames from the input video and exit (default: {} '
+        'frames)'.format(DEFAULT_CODEC_SAMPLES))
+
+    parser.add_argument(
+        '--resize',
+        type=parse_size,
+        help='target size of the images, as WxH, or W for the longest side, '
+        'without an offset, which is only set by --crop')
+
+    parser.add_argument('--scale',
+                        type=float,
+                        help='scale factor of the images, if no target size '
+                        'is defined')
+
+    parser.add_argument('--fit',
+                        action='store_true',
+                        help='fit the images into the target size, keeping '
+                        'the aspect ratio')
+
+    parser.add_argument('--crop',
+                        type=parse_geometry,
+                        help='region of the frames to keep, as WxH for the '
+                        'center or WxH+X+Y, before resizing')
+
+    parser.add_argument('--grayscale',
+                        action='store_true',
+                        help='convert the images to grayscale')
+
+    parser.add_argument(
+        '--scene-threshold',
+        type=float,
+        help='extract only the frames that differ from the previous one by '
+        'at least this score, from 0 to 1, among the ones selected by the '
+        'extraction rate')
+
+    parser.add_argument(
+        '--scene-method',
+        choices=SCENE_METHODS,
+        default='mad',
+        help='score of the difference between frames: mean absolute '
+        'difference or histogram distance (default: mad)')
+
+    parser.add_argument(
+        '--dedup-distance',
+        type=int,
+        help='skip the frames whose perceptual hash differs from the hash of '
+        'some extracted frame by at most this number of bits, from 0 to 15')
+
+    parser.add_argument(
+        '--dedup-capacity',
+        type=int,
+        default=DEFAULT_DEDUP_CAPACITY,
+        help='maximum number of extracted frames remembered to skip their '
+        'duplicates (default: {})'.format(DEFAULT_DEDUP_CAPACITY))
+
+    parser.add_argument('-j',
+                        '--jobs',
+                        type=int,
+                        help='number of processes extracting segments of the '
+                        'video, or videos in batch mode (default: 1, or the '
+                        'number of CPUs in batch mode)')
+
+    parser.add_argument('-b',
+                        '--batch',
+                        action='store_true',
+                        help='extract all videos from the input folder, glob '
+                        'pattern or manifest file, without any prompt')
+
+    parser.add_argument('--summary',
+                        help='path to save the summary table in batch mode')
+
+    parser.add_argument('--headless',
+                        action='store_true',
+                        help='never prompt, clear the screen or animate, '
+                        'print JSON lines events instead and fail fast with '
+                        'distinct exit codes')
+
+    parser.add_argument('--metrics',
+                        help='path to save the per-stage metrics as JSON at '
+                        'the end')
+
+    parser.add_argument('--prometheus',
+                        help='path to a Prometheus textfile rewritten with '
+                        'the metrics while extracting')
+
+    parser.add_argument(
+        '--benchmark',
+        help='run the benchmark on synthetic videos, written to the output '
+        'folder, save its results as JSON to this path and exit')
+
+    parser.add_argument('--quick',
+                        action='store_true',
+                        help='run a smaller benchmark')
+
+    parser.add_argument('--baseline',
+                        help='path to the results of a previous benchmark, '
+                        'to flag the slowdowns')
+
+    parser.add_argument('--tolerance',
+                        type=float,
+                        default=DEFAULT_TOLERANCE,
+                        help='fraction by which a speed may drop before '
+                        'being flagged as a slowdown (default: {:g})'.format(
+                            DEFAULT_TOLERANCE))
+
+    parser.add_argument('--repeat',
+                        type=int,
+                        default=1,
+                        help='number of runs of each benchmark case, keeping '
+                        'the fastest (default: 1)')
+
+    parser.add_argument(
+        '--serve',
+        nargs='?',
+        const=DEFAULT_SERVICE_ADDRESS,
+        help='run a service extracting the videos of the jobs posted to this '
+        'host:port or Unix socket path, with --jobs worker processes '
+        '(default: {})'.format(DEFAULT_SERVICE_ADDRESS))
+
+    parser.add_argument(
+        '--queue-limit',
+        type=int,
+        default=DEFAULT_QUEUE_LIMIT,
+        help='maximum number of jobs waiting in the service queue (default: '
+        '{})'.format(DEFAULT_QUEUE_LIMIT))
+
+    return parser
+
+
+def parse_arguments() -> dict:
+    """
+    Construct the arguments parser and parse them.
 
-# Store the arguments values in temporary variables.
-_video_file = args['input']
-_extraction_rate = args['extraction_rate']
-_offset = args['offset']
-_output_dir = args['output']
+    ---
+    Returns
+    ---
 
-# User input variables.
-video_file = extraction_rate = offset = output_dir = None
+        dict
+    The arguments values.
+    """
 
-# Global variables.
-FRAMES = FPS = WIDTH = HEIGHT = 0
+    return vars(argument_parser().parse_args())
 
-# Initialize the video stream variable.
-VIDEO_STREAM = None
 
-try:
-    input_message = _l(F().bold().cyan('Input video: '))
+def output_options(args: dict) -> OutputOptions:
+    """
+    Return the settings of how to encode and store the images.
 
-    while True:
-        print(F().blue(header()))
+    ---
+    Arguments
+    ---
 
-        if _video_file is None:
+        args (dict)
+    The arguments values.
 
-            # Let the user set the input video file.
-            _video_file = input(input_message)
-        else:
+    ---
+    Returns
+    ---
 
-            # Print in case of passing by argument.
-            print('{}{}'.format(input_message, _video_file))
+        OutputOptions
+    The output settings.
+    """
 
-        # Invalid input.
-        if not _video_file:
-            print(_lt(error('Invalid input!')))
-            press_enter_to('try again', F().red(), F().white())
+    return OutputOptions(args['writers'], args['queue_size'],
+                         args['output_mode'],
+                         int(args['shard_size'] * 1024 * 1024),
+                         args['format'], args['quality'],
+                         args['png_compression'], args['jpeg_optimize'],
+                         args['jpeg_progressive'])
 
-            _video_file = None
 
-            continue
+def result_cache(args: dict) -> Optional[ResultCache]:
+    """
+    Return the cache of the images of previous extractions.
 
-        # Input is not a file.
-        if not path.isfile(_video_file):
-            print(_lt(error('The input path is not a valid file!')))
-            press_enter_to('try again', F().red(), F().white())
+    ---
+    Arguments
+    ---
 
-            _video_file = None
+        args (dict)
+    The arguments values.
 
-            continue
+    ---
+    Returns
+    ---
 
-        print(F().blue(header()))
+        Optional[ResultCache]
+    The cache, or None to always read the video.
+    """
 
-        # Get the file absolute path.
-        _video_file = path.abspath(_video_file)
+    if args['cache_dir'] is None:
+        return None
 
-        print(_l('{} {}'.format(info('Input video:'), _video_file)))
+    return ResultCache(args['cache_dir'],
+                       int(args['cache_size'] * 1024 * 1024))
 
-        # Set the video stream and pointer to the input video file.
-        VIDEO_STREAM = cv2.VideoCapture(_video_file)
 
-        # Check whether the video file is valid.
-        if not VIDEO_STREAM.isOpened():
-            print(_lt(error('The input file is not a valid video file!')))
-            press_enter_to('try again', F().red(), F().white())
+def print_cache_statistics(cache: ResultCache) -> None:
+    """
+    Print the statistics shared by all the users of a cache.
 
-            _video_file = None
+    ---
+    Arguments
+    ---
 
-            continue
+        cache (ResultCache)
+    The cache of the images of previous extractions.
+    """
 
-        video_file = _video_file
+    stats = cache.stats()
 
-        break
+    print(
+        _l('{} {} extractions, {:.1f} MB, {} hits, {} misses, {} '
+           'evictions'.format(info('Cache:'), stats['entries'],
+                              stats['size'] / (1024 * 1024), stats['hits'],
+                              stats['misses'], stats['evictions'])))
 
-    input_message = _lt(F().bold().cyan('Extraction frame rate: '))
 
-    while True:
-        print(F().blue(header()))
-        print_video_information()
+def print_stage_times(metrics: dict) -> None:
+    """
+    Print the time spent in each stage of the pipeline.
 
-        try:
-            if _extraction_rate is None:
+    ---
+    Arguments
+    ---
 
-                # Let the user set the extraction rate.
-                _extraction_rate = int(input(input_message))
-            else:
+        metrics (dict)
+    The metrics of the extraction. See
+    `modules.extractor.metrics.extraction_metrics()`.
+    """
 
-                # Print in case of passing by argument.
-                print('{}{}'.format(input_message, _extraction_rate))
+    rows = [('Stage', 'Seconds', 'ms/frame')]
 
-            # Check whether the value is valid.
-            if _extraction_rate < 1:
-                print(_lt(error('This value must be greater than zero!')))
-                press_enter_to('try again', F().red(), F().white())
+    frames = metrics['frames']
 
-                _extraction_rate = None
+    # The frames each stage works on.
+    counts = {
+        'grab': frames['decoded'] + frames['skipped'],
+        'retrieve': frames['decoded'],
+        'selection': frames['decoded'],
+        'wait': frames['submitted'],
+        'encode': frames['submitted'],
+        'write': frames['submitted']
+    }
+
+    for stage in STAGES:
+        rows.append((stage, '{:.3f}'.format(metrics['stages'][stage]),
+                     '{:.2f}'.format(metrics['stages'][stage] * 1000 /
+                                     counts[stage]) if counts[stage] else '-'))
+
+    for line in table_lines(rows):
+        print(_l(line))
+
+    print(
+        _l('{} mean {:.1f}, max {}'.format(info('Writer queue depth:'),
+                                           metrics['queue']['mean'],
+                                           metrics['queue']['max'])))
+
+
+def save_metrics(file: str, metrics: dict) -> None:
+    """
+    Save some metrics as JSON.
+
+    ---
+    Arguments
+    ---
+
+        file (str)
+    The path of the JSON file.
+
+        metrics (dict)
+    The metrics.
+    """
+
+    with open(file, 'w') as stream:
+        stream.write(dumps(metrics, indent=2) + '\n')
 
-                continue
 
-        # Invalid value.
-        except ValueError:
-            print(_lt(error('Invalid value!')))
-            press_enter_to('try again', F().red(), F().white())
+def check_report_files(args: dict) -> None:
+    """
+    Check whether the metrics, the Prometheus textfile and the summary can be
+    written, before extracting anything.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values.
+
+    ---
+    Raises
+    ---
 
-            _extraction_rate = None
+        OSError
+    If the folder of some file doesn't exist, or some file can't be written.
+    """
 
+    for file in (args['metrics'], args['prometheus'], args['summary']):
+        if not file:
             continue
 
-        extraction_rate = _extraction_rate
+        folder = path.dirname(path.abspath(file))
 
-        break
+        if not path.isdir(folder):
+            raise FileNotFoundError(ENOENT, strerror(ENOENT), file)
 
-    input_message = _l(F().bold().cyan('Frame offset: '))
+        if path.isdir(file):
+            raise IsADirectoryError(EISDIR, strerror(EISDIR), file)
 
-    while True:
-        print(F().blue(header()))
-        print_video_information()
+        # The textfile is replaced by a temporary file in the same folder.
+        if not access(folder, W_OK) or (path.exists(file)
+                                        and not access(file, W_OK)):
+            raise PermissionError(EACCES, strerror(EACCES), file)
 
-        try:
-            if _offset is None:
 
-                # Let the user set the offset.
-                _offset = int(input(input_message))
-            else:
+def index_mode(args: dict) -> str:
+    """
+    Return how to use the frame index of the videos.
 
-                # Print in case of passing by argument.
-                print('{}{}'.format(input_message, _offset))
+    ---
+    Arguments
+    ---
 
-            # Check whether the value is positive.
-            if _offset < 0:
-                print(_lt(error('This value must be positive!')))
-                press_enter_to('try again', F().red(), F().white())
+        args (dict)
+    The arguments values.
 
-                _offset = None
+    ---
+    Returns
+    ---
 
-                continue
+        str
+    `'build'`, `'ignore'` or `'use'`.
+    """
 
-            # Check whether the value is lower than the total of frames.
-            if _offset >= FRAMES:
-                print(
-                    _lt(
-                        error('This value must be lower than {}!'.format(
-                            FRAMES))))
-                press_enter_to('try again', F().red(), F().white())
+    if args['index']:
+        return 'build'
 
-                _offset = None
+    return 'ignore' if args['no_index'] else 'use'
 
-                continue
 
-        # Invalid value.
-        except ValueError:
-            print(_lt(error('Invalid value!')))
-            press_enter_to('try again', F().red(), F().white())
+def index_video(extractor: FrameExtractor) -> None:
+    """
+    Index the frames of a video, showing the progress.
+
+    ---
+    Arguments
+    ---
+
+        extractor (FrameExtractor)
+    The extractor of the input video file.
+    """
 
-            _offset = None
+    counters = ReadCounters()
 
-            continue
+    # Only the frames read are known.
+    progress = ProgressRenderer(lambda: (counters.total, 0, 0, 0),
+                                extractor.frames, 'Indexing frames',
+                                F().bold().blue())
+    progress.start()
 
-        offset = _offset
+    try:
+        saved = extractor.build_index(counters)
 
-        break
+    finally:
+        progress.stop()
 
-    input_message = _lt(F().bold().cyan('Output folder (optional): '))
+    if not saved:
+        print(
+            _l(
+                warning('Could not store the frame index next to the video, '
+                        'it is used by this extraction only!')))
+        print()
 
-    while True:
-        print(F().blue(header()))
-        print_video_information()
 
+def frame_transform(args: dict) -> Optional[FrameTransform]:
+    """
+    Return the crop, resize and color conversion of the frames.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values.
+
+    ---
+    Returns
+    ---
+
+        Optional[FrameTransform]
+    The transform, or None to keep the frames untouched.
+    """
+
+    transform = FrameTransform(args['resize'], args['scale'], args['fit'],
+                               args['crop'], args['grayscale'])
+
+    return None if transform.is_identity else transform
+
+
+def frame_schedule(args: dict) -> Optional[FrameSchedule]:
+    """
+    Return the frame indices or times to extract, if defined by time or by
+    index.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values.
+
+    ---
+    Returns
+    ---
+
+        Optional[FrameSchedule]
+    The schedule, or None to use the extraction rate and the offset.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If some time or index is invalid, or the frames file can't be read.
+    """
+
+    if args['every'] is not None:
+        return FrameSchedule.every(args['every'])
+
+    if args['at'] is not None:
+        return FrameSchedule.at(
+            time for time in args['at'].split(',') if time.strip())
+
+    if args['frames'] is not None:
+        return FrameSchedule.from_ranges(args['frames'])
+
+    if args['frames_file'] is not None:
         try:
-            if _output_dir is None:
+            return FrameSchedule.from_ranges(
+                read_ranges_file(args['frames_file']))
 
-                # Let the user set the output folder.
-                _output_dir = input(input_message)
-            else:
+        except OSError as e:
+            raise ValueError('Could not read the frames file: {}'.format(
+                e.strerror or e))
 
-                # Print in case of passing by argument.
-                print('{}{}'.format(input_message, _output_dir))
+    return None
+
+
+def scene_detector(args: dict) -> Optional[SceneDetector]:
+    """
+    Return the detector of the frames that start a new scene.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values.
+
+    ---
+    Returns
+    ---
 
-            # If the user didn't pass any path,...
-            if not _output_dir:
+        Optional[SceneDetector]
+    The detector, or None to extract every selected frame.
+    """
 
-                # ... use the input video filename without its extension.
-                _output_dir = path.splitext(video_file)[0] + '_images'
+    if args['scene_threshold'] is None:
+        return None
 
-            # Check whether the folder exists and the user has write permission.
-            if path.isdir(_output_dir) and not access(_output_dir, W_OK):
-                raise PermissionError()
+    return SceneDetector(args['scene_threshold'], args['scene_method'])
 
-            # Try to make the folder.
-            mkdir(_output_dir)
 
-        # Ignore if the folder already exists.
-        except FileExistsError:
-            pass
+def duplicate_filter(args: dict) -> Optional[DuplicateFilter]:
+    """
+    Return the filter of the frames that look like an extracted one.
 
-        # The user doesn't have write permission.
-        except PermissionError:
-            print(_lt(error('Write permission denied!')))
-            press_enter_to('try again', F().red(), F().white())
+    ---
+    Arguments
+    ---
 
-            _output_dir = None
+        args (dict)
+    The arguments values.
+
+    ---
+    Returns
+    ---
+
+        Optional[DuplicateFilter]
+    The filter, or None to keep the duplicate frames.
+    """
+
+    if args['dedup_distance'] is None:
+        return None
+
+    return DuplicateFilter(args['dedup_distance'], args['dedup_capacity'])
 
-            continue
 
-        # Get the output folder absolute path.
-        output_dir = path.abspath(_output_dir)
+def run_codecs_comparison(args: dict) -> int:
+    """
+    Compare the encode time and the size of the image formats on a sample of
+    frames from the input video.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values.
+
+    ---
+    Returns
+    ---
 
-        break
+        int
+    The exit code.
+    """
 
     print(F().blue(header()))
-    print_video_information()
-    print()
 
-    # Start a counter for all frames read.
-    frame_index = -1
+    # The input can't be asked for.
+    if args['input'] is None or not path.isfile(args['input']):
+        print(_l(error('A valid input video file is required!')))
 
-    # Total of extracted frames.
-    extracted_frames = 0
+        return EXIT_USAGE
 
-    # Initialize the feedback animation thread variable.
-    thread = None
+    try:
+        with FrameExtractor(args['input']) as extractor:
+            print_video_information(extractor)
 
-    # Initial time to count elapsed time.
-    start_time = datetime.now()
+            images = extractor.sample(args['compare_codecs'])
 
-    # Loop over frames from the video file stream.
-    while True:
+    # The video file is not valid.
+    except ValueError:
+        print(_lt(error('The input file is not a valid video file!')))
 
-        # Read the next frame from the video file.
-        grabbed, frame = VIDEO_STREAM.read()
+        return EXIT_USAGE
 
-        # If it isn't successful, it has reached the end of the stream.
-        if not grabbed:
-            break
+    print(_lt('{} {}'.format(info('Sampled frames:'), len(images))))
+    print()
 
-        frame_index += 1
+    rows = [('Format', 'ms/frame', 'Bytes/frame')]
 
-        # Check whether to extract the image from the frame.
-        if not can_extract_at(frame_index):
-            continue
+    # The selected settings come first.
+    try:
+        codecs = [output_options(args).codec()] + list(COMPARED_CODECS)
 
-        # Get the current frame time.
-        current_time = (1 / FPS) * frame_index
+    # Some encoder setting is invalid.
+    except ValueError as e:
+        print(_l(error(str(e))))
 
-        # If there's a thread running,...
-        if thread is not None:
+        return EXIT_USAGE
 
-            # ... stop it to run it again.
-            thread.alive = False
+    for codec, milliseconds, size in compare_codecs(images, codecs):
+        rows.append((codec.label, '{:.2f}'.format(milliseconds),
+                     '{:.0f}'.format(size)))
 
-        # Show the current extracting frame...
-        thread = Thread(target=ellipsis,
-                        args=(_l('Extracting frame {} at {} (# {})'.format(
-                            extracted_frames + 1,
-                            humanize_duration(current_time),
-                            frame_index)), F().bold().blue()),
-                        daemon=True)
+    for line in table_lines(rows):
+        print(_l(line))
 
-        # ... and start the feedback animation.
-        thread.start()
+    print()
 
-        # Get hours.
-        hours = int(current_time // 3600)
-        current_time %= 3600
+    return EXIT_SUCCESS
 
-        # Get minutes.
-        minutes = int(current_time // 60)
-        current_time %= 60
 
-        # Get seconds.
-        seconds = int(current_time)
+def print_benchmark_result(result: dict) -> None:
+    """
+    Print the result of a benchmark case.
 
-        # Get milliseconds.
-        milliseconds = int((current_time - seconds) * 1000)
+    ---
+    Arguments
+    ---
 
-        # Save the current frame as a JPEG image.
-        cv2.imwrite(
-            '{}/{}_{}_{}_{:02d}_{:02d}_{:02d}_{:03d}.jpg'.format(
-                output_dir,
-                path.splitext(path.split(video_file)[1])[0], extracted_frames,
-                frame_index, hours, minutes, seconds, milliseconds), frame)
+        result (dict)
+    The result of the case. See `modules.extractor.benchmark.run_case()`.
+    """
 
-        extracted_frames += 1
+    print(
+        _l('{} {} ({:.0f} decoded/s, {:.0f} written/s)'.format(
+            info('Measured'), result['id'], result['decoded_fps'],
+            result['written_fps'])))
+
+
+def run_benchmark_mode(args: dict) -> int:
+    """
+    Measure the extraction of synthetic videos with many settings, and
+    compare the speeds with a previous benchmark, if any.
 
-    # Final time.
-    end_time = datetime.now()
+    ---
+    Arguments
+    ---
 
-    # If there was a thread running,...
-    if thread is not None:
+        args (dict)
+    The arguments values.
 
-        # ... stop it.
-        thread.alive = False
+    ---
+    Returns
+    ---
 
-    # Calculates the total process time.
-    total_time = end_time - start_time
+        int
+    The exit code: 1 if some case is slower than in the baseline.
+    """
 
     print(F().blue(header()))
-    print_video_information()
 
-    print(_lt(success('Success!')))
+    baseline = None
 
-    print(_lt('{} {}'.format(info('Extracted frames:'), extracted_frames)))
-    print(
-        _l('{} {}\n'.format(info('Elapsed time:'),
-                            humanize_duration(total_time.total_seconds()))))
+    # Read the baseline first, so a wrong path fails fast.
+    if args['baseline'] is not None:
+        try:
+            with open(args['baseline']) as file:
+                baseline = loads(file.read())
 
-# Ctrl+C pressed.
-except (EOFError, KeyboardInterrupt):
+        except (OSError, ValueError):
+            print(_l(error('The baseline is not a valid benchmark file!')))
 
-    # If there was a thread running,...
-    if 'thread' in locals() and thread is not None:
+            return EXIT_USAGE
 
-        # ... stop it.
-        thread.alive = False
+    work_dir = path.abspath(args['output'] or 'benchmark')
 
-    print(_lt(_lt(error('Operation canceled by the user!'))))
-    press_enter_to('quit', F().red(), F().white())
+    print(_l('{} {}'.format(info('Work folder:'), work_dir)))
+
+    if args['quick']:
+        video_files = make_videos(path.join(work_dir, 'videos'), QUICK_VIDEOS)
+        cases = benchmark_cases(video_files, QUICK_RATES, QUICK_OFFSETS,
+                                QUICK_OUTPUTS)
+
+    else:
+        video_files = make_videos(path.join(work_dir, 'videos'),
+                                  BENCHMARK_VIDEOS)
+        cases = benchmark_cases(video_files)
+
+    # No codec could write the videos.
+    if not cases:
+        print(_l(error('No synthetic video could be written!')))
+
+        return EXIT_USAGE
+
+    print(_l('{} {}'.format(info('Videos:'), len(video_files))))
+    print(_l('{} {}'.format(info('Cases:'), len(cases))))
+    print()
+
+    try:
+        results = run_benchmark(cases, path.join(work_dir, 'runs'),
+                                args['repeat'], print_benchmark_result)
+
+    # Ctrl+C pressed.
+    except KeyboardInterrupt:
+        print(_lt(error('Operation canceled by the user!')))
+        print()
+
+        return EXIT_INTERRUPTED
+
+    with open(args['benchmark'], 'w') as file:
+        file.write(dumps(results, indent=2) + '\n')
+
+    rows = [('Case', 'Decoded/s', 'Written/s', 'Peak RSS (MB)', 'Bytes')]
+
+    for result in results['results']:
+        rows.append((result['id'], '{:.1f}'.format(result['decoded_fps']),
+                     '{:.1f}'.format(result['written_fps']),
+                     '{:.1f}'.format(result['peak_rss_mb'])
+                     if result['peak_rss_mb'] is not None else '-',
+                     str(result['bytes'])))
+
+    print()
+
+    for line in table_lines(rows):
+        print(_l(line))
+
+    print()
+    print(_l('{} {}'.format(success('Results saved to'), args['benchmark'])))
+
+    if baseline is None:
+        return EXIT_SUCCESS
+
+    comparison = compare_results(results, baseline, args['tolerance'])
+
+    rows = [('Case', 'Measure', 'Baseline', 'Current', 'Change')]
+
+    for case_id, measure, before, after, _ in comparison:
+        rows.append((case_id, measure, '{:.1f}'.format(before),
+                     '{:.1f}'.format(after), '{:+.1%}'.format(
+                         after / before - 1) if before > 0 else '-'))
+
+    print()
+
+    for line in table_lines(rows, (0, 1)):
+        print(_l(line))
+
+    print()
+
+    slowdowns = [row for row in comparison if row[4]]
+
+    if slowdowns:
+        for case_id, measure, _, _, _ in slowdowns:
+            print(_l('{} {} ({})'.format(warning('Slowdown:'), case_id,
+                                         measure)))
+
+        print()
+
+        return EXIT_FAILURE
+
+    print(_l(success('No slowdown beyond the tolerance.')))
+    print()
+
+    return EXIT_SUCCESS
+
+
+def print_batch_result(result: BatchResult) -> None:
+    """
+    Print the result of the extraction of one video in batch mode.
+
+    ---
+    Arguments
+    ---
+
+        result (BatchResult)
+    The result of the extraction.
+    """
+
+    if result.error is None:
+        print(
+            _l('{} {} ({} frames)'.format(success('Extracted'),
+                                          result.video_file, result.frames)))
+    else:
+        print(
+            _l('{} {} ({})'.format(error('Failed'), result.video_file,
+                                   result.error)))
+
+
+def run_batch_mode(args: dict) -> int:
+    """
+    Extract all the videos from a folder, a glob pattern or a manifest file,
+    without any prompt.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values.
+
+    ---
+    Returns
+    ---
+
+        int
+    The exit code.
+    """
+
+    print(F().blue(header()))
+
+    extraction_rate = args['extraction_rate']
+    offset = args['offset'] or 0
+
+    try:
+        schedule = frame_schedule(args)
+        cache = result_cache(args)
+        output_options(args).validate()
+
+    # Some time, index or output setting is invalid.
+    except ValueError as e:
+        print(_l(error(str(e))))
+
+        return EXIT_USAGE
+
+    # The parameters can't be asked for.
+    if args['input'] is None or (extraction_rate is None
+                                 and schedule is None):
+        print(
+            _l(
+                error('The input and the extraction rate, or a schedule, are '
+                      'required in batch mode!')))
+
+        return EXIT_USAGE
+
+    # The extraction rate and the offset are replaced by the schedule.
+    if schedule is not None:
+        extraction_rate = 1
+
+    # Check whether the values are valid.
+    if extraction_rate < 1 or offset < 0:
+        print(
+            _l(
+                error('The extraction rate must be greater than zero and the '
+                      'offset must be positive!')))
+
+        return EXIT_USAGE
+
+    video_files = find_videos(args['input'])
+
+    # Nothing to extract.
+    if not video_files:
+        print(_l(error('No video files found!')))
+
+        return EXIT_USAGE
+
+    jobs = args['jobs'] or cpu_count() or 1
+
+    print(_l('{} {}'.format(info('Input videos:'), len(video_files))))
+    print(_l('{} {}'.format(info('Processes:'), jobs)))
+    print()
+
+    done = []
+
+    def on_done(result: BatchResult) -> None:
+        """
+        Print the result of a video and export the metrics of the videos done.
+        """
+
+        print_batch_result(result)
+
+        done.append(result)
+
+        if args['prometheus']:
+            write_textfile(
+                args['prometheus'],
+                prometheus_text(({
+                    'video': path.basename(result.video_file)
+                }, result.metrics) for result in done
+                                if result.metrics is not None))
+
+    try:
+        results = run_batch(video_files, args['output'], extraction_rate,
+                            offset, jobs, args['read_mode'],
+                            output_options(args), frame_transform(args),
+                            scene_detector(args), duplicate_filter(args),
+                            schedule, args['resume'], cache,
+                            index_mode(args), args['decoder'],
+                            args['decoder_threads'], on_done)
+
+    # Two videos would be extracted to the same folder.
+    except ValueError as e:
+        print(_l(error(str(e))))
+
+        return EXIT_USAGE
+
+    # Ctrl+C pressed.
+    except KeyboardInterrupt:
+        print(_lt(error('Operation canceled by the user!')))
+        print()
+
+        return EXIT_INTERRUPTED
+
+    table = summary_table(results)
+
+    print()
+
+    for line in table:
+        print(_l(line))
+
+    print()
+
+    # Show how much the cache was used by all extractions.
+    if cache is not None:
+        print_cache_statistics(cache)
+        print()
+
+    try:
+
+        # Save the table too, if requested.
+        if args['summary']:
+            with open(args['summary'], 'w') as file:
+                file.write('\n'.join(table) + '\n')
+
+        # Save the metrics of each video, if requested.
+        if args['metrics']:
+            save_metrics(
+                args['metrics'], {
+                    result.video_file: result.metrics
+                    for result in results if result.metrics is not None
+                })
+
+    # The folder was removed or the disk is full since checked.
+    except OSError as e:
+        print(_l(error('{}: {}'.format(e.strerror or e, e.filename))))
+        print()
+
+        return EXIT_OUTPUT
+
+    return EXIT_FAILURE if any(result.error is not None
+                            for result in results) else EXIT_SUCCESS
+
+
+def run_headless_mode(args: dict,
+                      events: EventStream,
+                      cancelled: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Extract a video without any prompt, screen clear or animation, reporting
+    the progress as JSON lines events.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values.
+
+        events (EventStream)
+    Where to emit the events.
+
+        cancelled (Optional[Callable[[], bool]], None)
+    Return whether to stop the extraction, as if interrupted. Checked before
+    each frame with a single job.
+
+    ---
+    Returns
+    ---
+
+        int
+    The exit code. See `modules.utils.constants`.
+    """
+
+    try:
+        transform = frame_transform(args)
+        detector = scene_detector(args)
+        deduplicator = duplicate_filter(args)
+        schedule = frame_schedule(args)
+        cache = result_cache(args)
+        options = output_options(args)
+
+    # Some setting is invalid.
+    except ValueError as e:
+        return events.error(EXIT_USAGE, str(e))
+
+    if args['extraction_rate'] is None and schedule is None:
+        return events.error(
+            EXIT_USAGE, 'The extraction rate, or a schedule, is required')
+
+    # A regular file, or a stream read once.
+    if args['input'] is None or not (path.isfile(args['input'])
+                                     or is_stream(args['input'])):
+        return events.error(EXIT_INPUT, 'The input path is not a valid file')
+
+    try:
+        extractor = FrameExtractor(args['input'],
+                                   args['extraction_rate'] if
+                                   args['extraction_rate'] is not None else 1,
+                                   args['offset'] or 0,
+                                   read_mode=args['read_mode'],
+                                   transform=transform,
+                                   scene_detector=detector,
+                                   duplicate_filter=deduplicator,
+                                   schedule=schedule,
+                                   use_index=not args['no_index'],
+                                   decoder=args['decoder'],
+                                   decoder_threads=args['decoder_threads'])
+
+    # The video file is not valid.
+    except ValueError as e:
+        return events.error(EXIT_INPUT, str(e))
+
+    jobs = args['jobs'] or 1
+
+    with extractor:
+
+        # Indexing would consume the stream.
+        if args['index'] and extractor.is_stream:
+            return events.error(EXIT_USAGE, 'A stream can\'t be indexed')
+
+        # Index the video, unless indexed by a previous run.
+        if args['index'] and extractor.index is None:
+            saved = extractor.build_index()
+
+            events.emit('indexed',
+                        frames=extractor.frames,
+                        keyframes=extractor.index.keyframes.size
+                        if extractor.index.keyframes is not None else None,
+                        saved=saved)
+
+        try:
+            extractor.validate()
+
+        # The extraction rate or the offset is out of range.
+        except ValueError as e:
+            return events.error(EXIT_USAGE, str(e))
+
+        # The standard output, unless the path of a file or named pipe is
+        # given.
+        if options.mode == 'stream':
+            output_dir = args['output'] or STDOUT
+
+        else:
+
+            # By default, next to the input video, as in the interactive mode,
+            # or in the current folder for the standard input.
+            output_dir = path.abspath(args['output'] or (
+                extractor.video_name if extractor.video_file == STDIN else
+                path.splitext(extractor.video_file)[0]) + '_images')
+
+            try:
+                makedirs(output_dir, exist_ok=True)
+
+                if not access(output_dir, W_OK):
+                    raise PermissionError('Write permission denied')
+
+            except OSError as e:
+                return events.error(EXIT_OUTPUT, '{}: {}'.format(
+                    e.strerror or e, output_dir))
+
+        try:
+            check_report_files(args)
+
+        except OSError as e:
+            return events.error(EXIT_OUTPUT, '{}: {}'.format(
+                e.strerror or e, e.filename))
+
+        events.emit('started',
+                    video=extractor.video_file,
+                    frames=extractor.frames,
+                    fps=extractor.fps,
+                    width=extractor.width,
+                    height=extractor.height,
+                    duration=extractor.duration,
+                    selection={'schedule': schedule.describe()}
+                    if schedule is not None else {
+                        'extraction_rate': extractor.extraction_rate,
+                        'offset': extractor.offset
+                    },
+                    output_dir=output_dir,
+                    jobs=jobs)
+
+        # With a pool of processes, only the elapsed time is known.
+        events.start_polling(
+            'progress', lambda: dict(
+                zip(('processed', 'decoded', 'written', 'bytes'),
+                    extractor.progress())) if jobs == 1 else {})
+
+        exporter = None
+
+        # Export the metrics while extracting, if requested.
+        if args['prometheus']:
+            exporter = MetricsExporter(extractor.metrics, args['prometheus'],
+                                       {'video': extractor.video_name})
+            exporter.start()
+
+        def on_frame(*_) -> None:
+            """
+            Stop the extraction, as if interrupted, if cancelled.
+            """
+
+            if cancelled():
+                raise KeyboardInterrupt()
+
+        try:
+            written, size = extractor.extract(
+                output_dir,
+                options,
+                jobs,
+                on_frame=on_frame if cancelled is not None else None,
+                resume=args['resume'],
+                cache=cache,
+                on_written=lambda extracted_index, frame_index, name, size:
+                events.emit('written',
+                            extracted_index=extracted_index,
+                            frame_index=frame_index,
+                            file=name,
+                            bytes=size))
+
+        # Some setting is invalid, e.g., the resume of a changed extraction.
+        except ValueError as e:
+            return events.error(EXIT_USAGE, str(e))
+
+        # The stream ended without any frame, or the decoder failed.
+        except (StreamError, DecodeError) as e:
+            return events.error(EXIT_INPUT, str(e))
+
+        # Some image could not be written.
+        except WriteError as e:
+            return events.error(EXIT_WRITE, str(e))
+
+        # Ctrl+C pressed.
+        except KeyboardInterrupt:
+            return events.error(EXIT_INTERRUPTED, 'Interrupted')
+
+        finally:
+            events.stop_polling()
+
+            if exporter is not None:
+                exporter.stop()
+
+        metrics = extractor.metrics()
+
+        try:
+            if args['metrics']:
+                save_metrics(args['metrics'], metrics)
+
+        except OSError as e:
+            return events.error(EXIT_OUTPUT, '{}: {}'.format(
+                e.strerror or e, args['metrics']))
+
+        events.emit('finished',
+                    written=written,
+                    bytes=size,
+                    seconds=metrics['seconds'],
+                    cached=cache is not None and cache.hits > 0,
+                    frames=metrics['frames'],
+                    seeks=metrics['seeks'])
+
+    return EXIT_SUCCESS
+
+
+def streams_to_stdout(args: dict) -> bool:
+    """
+    Check whether the images are streamed to the standard output, so nothing
+    else can be printed there.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values.
+
+    ---
+    Returns
+    ---
+
+        bool
+    True if they are.
+    """
+
+    return args['output_mode'] == 'stream' and args['output'] in ('', None,
+                                                                  STDOUT)
+
+
+def job_arguments(job: dict) -> dict:
+    """
+    Return the arguments values of a job posted to the service.
+
+    ---
+    Arguments
+    ---
+
+        job (dict)
+    The job, with its command line `args`, as a list of strings.
+
+    ---
+    Returns
+    ---
+
+        dict
+    The arguments values.
+
+    ---
+    Raises
+    ---
+
+        ValueError
+    If the arguments are invalid, or not of a single video extraction.
+    """
+
+    argv = job.get('args')
+
+    if not isinstance(argv, list) or not all(
+            isinstance(arg, str) for arg in argv):
+        raise ValueError('The job needs its "args", as a list of strings')
+
+    # The usage would be printed to the output of the service, which then
+    # exits, instead of answering the request.
+    parser = argument_parser(add_help=False)
+
+    def fail(message: str) -> None:
+        """
+        Raise the parsing error, instead of exiting.
+        """
+
+        raise ValueError(message)
+
+    parser.error = fail
+
+    args = vars(parser.parse_args(argv))
+
+    # The other modes have their own pools, or no job to run.
+    if args['batch'] or args['benchmark'] is not None or args[
+            'compare_codecs'] is not None or args['serve'] is not None:
+        raise ValueError('A job can only extract a single video')
+
+    # The service runs many jobs at once instead.
+    if (args['jobs'] or 1) > 1:
+        raise ValueError('A job can\'t use more than one process')
+
+    # A job has no standard input nor output of its own.
+    if args['input'] == STDIN or streams_to_stdout(args):
+        raise ValueError('A job can\'t use the standard input or output')
+
+    return args
+
+
+def run_job(args: dict, events_file: str,
+            cancelled: Callable[[], bool]) -> int:
+    """
+    Extract a video in a worker of the service, as in the headless mode.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values. See `job_arguments()`.
+
+        events_file (str)
+    The path of the file where to append the events.
+
+        cancelled (Callable[[], bool])
+    Return whether the job was cancelled.
+
+    ---
+    Returns
+    ---
+
+        int
+    The exit code. See `modules.utils.constants`.
+    """
+
+    with open(events_file, 'a') as stream:
+
+        # Cancelled while the worker was picking it up.
+        if cancelled():
+            return EventStream(stream).error(EXIT_INTERRUPTED, 'Interrupted')
+
+        return run_headless_mode(args, EventStream(stream), cancelled)
+
+
+def run_service_mode(args: dict) -> int:
+    """
+    Run the extraction service until interrupted, reporting its own events as
+    JSON lines.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values.
+
+    ---
+    Returns
+    ---
+
+        int
+    The exit code. See `modules.utils.constants`.
+    """
+
+    events = EventStream()
+
+    workers = args['jobs'] or cpu_count() or 1
+
+    if workers < 1 or args['queue_limit'] < 1:
+        return events.error(
+            EXIT_USAGE,
+            'The workers and the queue limit must be greater than zero')
+
+    events_dir = mkdtemp(prefix='video-frame-extractor-')
+
+    queue = JobQueue(run_job, workers, events_dir, args['queue_limit'])
+
+    try:
+        server = make_server(args['serve'],
+                             request_handler(queue, job_arguments))
+
+    # The address is invalid or already used.
+    except (ValueError, OSError) as e:
+        queue.stop()
+        rmtree(events_dir, ignore_errors=True)
+
+        return events.error(EXIT_USAGE, '{}: {}'.format(
+            getattr(e, 'strerror', None) or e, args['serve']))
+
+    # Stop as with Ctrl+C when asked to terminate.
+    def terminate(*_) -> None:
+        raise KeyboardInterrupt()
+
+    signal(SIGTERM, terminate)
+
+    events.emit('listening',
+                address=args['serve'],
+                workers=workers,
+                queue_limit=args['queue_limit'])
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+
+        # Stop only once, waiting for the running jobs, even if Ctrl+C is
+        # pressed again.
+        signal(SIGTERM, SIG_IGN)
+        signal(SIGINT, SIG_IGN)
+
+        server.server_close()
+
+        # Remove the Unix socket, so no client waits for the running jobs.
+        if isinstance(server.server_address, str) and path.exists(
+                server.server_address):
+            remove(server.server_address)
+
+        queue.stop()
+        rmtree(events_dir, ignore_errors=True)
+
+    events.emit('stopped')
+
+    return EXIT_SUCCESS
+
+
+def run_headless_batch(args: dict, events: EventStream) -> int:
+    """
+    Extract all the videos from a folder, a glob pattern or a manifest file,
+    reporting each one as a JSON lines event.
+
+    ---
+    Arguments
+    ---
+
+        args (dict)
+    The arguments values.
+
+        events (EventStream)
+    Where to emit the events.
+
+    ---
+    Returns
+    ---
+
+        int
+    The exit code. See `modules.utils.constants`.
+    """
+
+    try:
+        schedule = frame_schedule(args)
+        cache = result_cache(args)
+        options = output_options(args)
+        transform = frame_transform(args)
+        detector = scene_detector(args)
+        deduplicator = duplicate_filter(args)
+
+        options.validate()
+
+    # Some setting is invalid.
+    except ValueError as e:
+        return events.error(EXIT_USAGE, str(e))
+
+    # The videos are extracted at the same time, into their own folders.
+    if options.mode == 'stream':
+        return events.error(EXIT_USAGE,
+                            'The batch mode can\'t stream the images')
+
+    extraction_rate = args['extraction_rate']
+    offset = args['offset'] or 0
+
+    if extraction_rate is None and schedule is None:
+        return events.error(
+            EXIT_USAGE, 'The extraction rate, or a schedule, is required')
+
+    # The extraction rate and the offset are replaced by the schedule.
+    if schedule is not None:
+        extraction_rate = 1
+
+    if extraction_rate < 1 or offset < 0:
+        return events.error(
+            EXIT_USAGE, 'The extraction rate must be greater than zero and '
+            'the offset must be positive')
+
+    video_files = find_videos(args['input']) if args['input'] else []
+
+    if not video_files:
+        return events.error(EXIT_INPUT, 'No video files found')
+
+    try:
+        check_report_files(args)
+
+    except OSError as e:
+        return events.error(EXIT_OUTPUT, '{}: {}'.format(
+            e.strerror or e, e.filename))
+
+    jobs = args['jobs'] or cpu_count() or 1
+
+    events.emit('started', videos=len(video_files), jobs=jobs)
+
+    def on_done(result: BatchResult) -> None:
+        """
+        Report the result of a video.
+        """
+
+        events.emit('video',
+                    video=result.video_file,
+                    output_dir=result.output_dir,
+                    written=result.frames,
+                    bytes=result.bytes,
+                    seconds=result.seconds,
+                    error=result.error)
+
+    try:
+        results = run_batch(video_files, args['output'], extraction_rate,
+                            offset, jobs, args['read_mode'], options,
+                            transform, detector, deduplicator, schedule,
+                            args['resume'], cache, index_mode(args),
+                            args['decoder'], args['decoder_threads'],
+                            on_done)
+
+    # Two videos would be extracted to the same folder.
+    except ValueError as e:
+        return events.error(EXIT_USAGE, str(e))
+
+    # Ctrl+C pressed.
+    except KeyboardInterrupt:
+        return events.error(EXIT_INTERRUPTED, 'Interrupted')
+
+    try:
+        if args['metrics']:
+            save_metrics(
+                args['metrics'], {
+                    result.video_file: result.metrics
+                    for result in results if result.metrics is not None
+                })
+
+    except OSError as e:
+        return events.error(EXIT_OUTPUT, '{}: {}'.format(
+            e.strerror or e, args['metrics']))
+
+    failed = sum(result.error is not None for result in results)
+
+    events.emit('finished',
+                videos=len(results),
+                failed=failed,
+                written=sum(result.frames for result in results),
+                bytes=sum(result.bytes for result in results),
+                seconds=sum(result.seconds for result in results))
+
+    return EXIT_FAILURE if failed else EXIT_SUCCESS
+
+
+def main() -> None:
+    """
+    Run the interactive extraction of a video file.
+    """
+
+    args = parse_arguments()
+
+    # Run the jobs posted to the service.
+    if args['serve'] is not None:
+        exit(run_service_mode(args))
+
+    # Never prompt, just report the events, on the standard error if the
+    # images are streamed to the standard output.
+    if args['headless']:
+        events = EventStream(stderr) if streams_to_stdout(args) else (
+            EventStream())
+
+        exit(
+            run_headless_batch(args, events) if args['batch'] else
+            run_headless_mode(args, events))
+
+    # The prompts and the animations would be mixed with the stream.
+    if args['input'] == STDIN or args['output_mode'] == 'stream':
+        print(_lt(error('Streaming needs the headless mode!')))
+
+        exit(EXIT_USAGE)
+
+    try:
+        check_report_files(args)
+
+    except OSError as e:
+        print(_lt(error('{}: {}'.format(e.strerror or e, e.filename))))
+
+        exit(EXIT_OUTPUT)
+
+    # Extract many videos without any prompt.
+    if args['batch']:
+        exit(run_batch_mode(args))
+
+    # Just compare the image formats.
+    if args['compare_codecs'] is not None:
+        exit(run_codecs_comparison(args))
+
+    # Just measure the extraction speed.
+    if args['benchmark'] is not None:
+        exit(run_benchmark_mode(args))
+
+    # Store the arguments values in temporary variables.
+    _video_file = args['input']
+    _extraction_rate = args['extraction_rate']
+    _offset = args['offset']
+    _output_dir = args['output']
+
+    # Number of processes extracting segments of the video.
+    jobs = args['jobs'] or 1
+
+    # User input variables.
+    extraction_rate = offset = output_dir = None
+
+    # Initialize the extractor variable.
+    extractor = None
+
+    # Initialize the progress renderer variable.
+    progress = None
+
+    # Initialize the metrics exporter variable.
+    exporter = None
+
+    try:
+
+        # Check the frames transform and selection settings before any prompt.
+        transform = frame_transform(args)
+        detector = scene_detector(args)
+        deduplicator = duplicate_filter(args)
+        schedule = frame_schedule(args)
+        cache = result_cache(args)
+
+        input_message = _l(F().bold().cyan('Input video: '))
+
+        while True:
+            print(F().blue(header()))
+
+            if _video_file is None:
+
+                # Let the user set the input video file.
+                _video_file = input(input_message)
+            else:
+
+                # Print in case of passing by argument.
+                print('{}{}'.format(input_message, _video_file))
+
+            # Invalid input.
+            if not _video_file:
+                print(_lt(error('Invalid input!')))
+                press_enter_to('try again', F().red(), F().white())
+
+                _video_file = None
+
+                continue
+
+            # Input is not a file.
+            if not path.isfile(_video_file):
+                print(_lt(error('The input path is not a valid file!')))
+                press_enter_to('try again', F().red(), F().white())
+
+                _video_file = None
+
+                continue
+
+            print(F().blue(header()))
+
+            # Get the file absolute path.
+            _video_file = path.abspath(_video_file)
+
+            print(_l('{} {}'.format(info('Input video:'), _video_file)))
+
+            # Open the input video file and read its information.
+            try:
+                extractor = FrameExtractor(_video_file,
+                                           read_mode=args['read_mode'],
+                                           transform=transform,
+                                           scene_detector=detector,
+                                           duplicate_filter=deduplicator,
+                                           schedule=schedule,
+                                           use_index=not args['no_index'],
+                                           decoder=args['decoder'],
+                                           decoder_threads=args[
+                                               'decoder_threads'])
+
+            # The video file is not valid.
+            except ValueError:
+                print(_lt(error('The input file is not a valid video file!')))
+                press_enter_to('try again', F().red(), F().white())
+
+                _video_file = None
+
+                continue
+
+            break
+
+        # Index the video, unless indexed by a previous run.
+        if args['index'] and extractor.index is None:
+            print()
+            index_video(extractor)
+
+        input_message = _lt(F().bold().cyan('Extraction frame rate: '))
+
+        # The extraction rate and the offset are replaced by the schedule.
+        while schedule is None:
+            print(F().blue(header()))
+            print_video_information(extractor)
+
+            try:
+                if _extraction_rate is None:
+
+                    # Let the user set the extraction rate.
+                    _extraction_rate = int(input(input_message))
+                else:
+
+                    # Print in case of passing by argument.
+                    print('{}{}'.format(input_message, _extraction_rate))
+
+                # Check whether the value is valid.
+                if _extraction_rate < 1:
+                    print(_lt(error('This value must be greater than zero!')))
+                    press_enter_to('try again', F().red(), F().white())
+
+                    _extraction_rate = None
+
+                    continue
+
+            # Invalid value.
+            except ValueError:
+                print(_lt(error('Invalid value!')))
+                press_enter_to('try again', F().red(), F().white())
+
+                _extraction_rate = None
+
+                continue
+
+            extraction_rate = _extraction_rate
+
+            break
+
+        input_message = _l(F().bold().cyan('Frame offset: '))
+
+        while schedule is None:
+            print(F().blue(header()))
+            print_video_information(extractor, extraction_rate)
+
+            try:
+                if _offset is None:
+
+                    # Let the user set the offset.
+                    _offset = int(input(input_message))
+                else:
+
+                    # Print in case of passing by argument.
+                    print('{}{}'.format(input_message, _offset))
+
+                # Check whether the value is positive.
+                if _offset < 0:
+                    print(_lt(error('This value must be positive!')))
+                    press_enter_to('try again', F().red(), F().white())
+
+                    _offset = None
+
+                    continue
+
+                # Check whether the value is lower than the total of frames.
+                if _offset >= extractor.frames:
+                    print(
+                        _lt(
+                            error('This value must be lower than {}!'.format(
+                                extractor.frames))))
+                    press_enter_to('try again', F().red(), F().white())
+
+                    _offset = None
+
+                    continue
+
+            # Invalid value.
+            except ValueError:
+                print(_lt(error('Invalid value!')))
+                press_enter_to('try again', F().red(), F().white())
+
+                _offset = None
+
+                continue
+
+            offset = _offset
+
+            break
+
+        input_message = _lt(F().bold().cyan('Output folder (optional): '))
+
+        while True:
+            print(F().blue(header()))
+            print_video_information(extractor, extraction_rate, offset)
+
+            try:
+                if _output_dir is None:
+
+                    # Let the user set the output folder.
+                    _output_dir = input(input_message)
+                else:
+
+                    # Print in case of passing by argument.
+                    print('{}{}'.format(input_message, _output_dir))
+
+                # If the user didn't pass any path,...
+                if not _output_dir:
+
+                    # ... use the input video filename without its extension.
+                    _output_dir = path.splitext(
+                        extractor.video_file)[0] + '_images'
+
+                # Check whether the folder exists and the user has write
+                # permission.
+                if path.isdir(_output_dir) and not access(_output_dir, W_OK):
+                    raise PermissionError()
+
+                # Try to make the folder.
+                mkdir(_output_dir)
+
+            # Ignore if the folder already exists.
+            except FileExistsError:
+                pass
+
+            # The user doesn't have write permission.
+            except PermissionError:
+                print(_lt(error('Write permission denied!')))
+                press_enter_to('try again', F().red(), F().white())
+
+                _output_dir = None
+
+                continue
+
+            # Get the output folder absolute path.
+            output_dir = path.abspath(_output_dir)
+
+            break
+
+        print(F().blue(header()))
+        print_video_information(extractor, extraction_rate, offset,
+                                output_dir)
+        print()
+
+        # The images of a previous extraction are written again.
+        if not args['resume'] and path.isfile(
+                path.join(output_dir, MANIFEST_FILENAME)):
+            print(
+                _l(
+                    warning('Starting the extraction in this folder over, '
+                            'use --resume to continue it!')))
+            print()
+
+        if schedule is None:
+            extractor.extraction_rate = extraction_rate
+            extractor.offset = offset
+
+        # Initial time to count elapsed time.
+        start_time = datetime.now()
+
+        # Show the progress, polled from the extractor by a single thread.
+        # With a pool of processes, only the elapsed time is known.
+        progress = ProgressRenderer(
+            extractor.progress if jobs == 1 else None, extractor.frames,
+            'Extracting frames' if jobs == 1 else
+            'Extracting frames in {} processes'.format(jobs),
+            F().bold().blue())
+
+        progress.start()
+
+        # Export the metrics while extracting, if requested.
+        if args['prometheus']:
+            exporter = MetricsExporter(extractor.metrics, args['prometheus'],
+                                       {'video': extractor.video_name})
+            exporter.start()
+
+        # Save the selected frames as images.
+        written_frames, _ = extractor.extract(output_dir,
+                                              output_options(args),
+                                              jobs,
+                                              resume=args['resume'],
+                                              cache=cache)
+
+        # Final time.
+        end_time = datetime.now()
+
+        progress.stop()
+
+        if exporter is not None:
+            exporter.stop()
+
+        metrics = extractor.metrics()
+
+        if args['metrics']:
+            save_metrics(args['metrics'], metrics)
+
+        # Calculates the total process time.
+        total_time = end_time - start_time
+
+        print(F().blue(header()))
+        print_video_information(extractor, extraction_rate, offset,
+                                output_dir)
+
+        print(_lt(success('Success!')))
+
+        print(_lt('{} {}'.format(info('Extracted frames:'), written_frames)))
+
+        # Show whether the images were linked from the cache.
+        if cache is not None:
+            print(
+                _l('{} {}'.format(
+                    info('Cache hit:'), 'yes ({})'.format(cache.link_method)
+                    if cache.hits else 'no')))
+
+        # Show the frames kept from a previous extraction, if resumed.
+        if args['resume']:
+            print(
+                _l('{} {}'.format(info('Resumed frames:'),
+                                  extractor.counters.resumed)))
+
+        print(
+            _l('{} {}'.format(info('Decoded frames:'),
+                              extractor.counters.decoded)))
+        print(
+            _l('{} {}'.format(info('Skipped frames (grab only):'),
+                              extractor.counters.skipped)))
+        print(_l('{} {}'.format(info('Seeks:'), extractor.counters.seeks)))
+
+        # Show the frames of the same scene, if selected by the content.
+        if extractor.scene_detector is not None:
+            print(
+                _l('{} {}'.format(info('Rejected frames (same scene):'),
+                                  extractor.counters.rejected)))
+
+        # Show the duplicate frames, if skipped.
+        if extractor.duplicate_filter is not None:
+            print(
+                _l('{} {}'.format(info('Skipped duplicate frames:'),
+                                  extractor.counters.duplicates)))
+
+        print(
+            _l('{} {}\n'.format(
+                info('Elapsed time:'),
+                humanize_duration(total_time.total_seconds()))))
+
+        # Show where the time went, unless nothing was read.
+        if metrics['frames']['decoded'] + metrics['frames']['skipped'] > 0:
+            print_stage_times(metrics)
+            print()
+
+        # Show how much the cache was used by all extractions.
+        if cache is not None:
+            print_cache_statistics(cache)
+            print()
+
+    # Some setting is invalid or some image or metrics file could not be
+    # written.
+    except (ValueError, OSError) as e:
+
+        # If the progress is being shown,...
+        if progress is not None:
+
+            # ... stop it.
+            progress.stop()
+
+        # If the metrics are being exported,...
+        if exporter is not None:
+
+            # ... stop it, after a last export.
+            exporter.stop()
+
+        print(_lt(_lt(error(str(e)))))
+        press_enter_to('quit', F().red(), F().white())
+
+        print()
+
+    # Ctrl+C pressed.
+    except (EOFError, KeyboardInterrupt):
+
+        # If the progress is being shown,...
+        if progress is not None:
+
+            # ... stop it.
+            progress.stop()
+
+        # If the metrics are being exported,...
+        if exporter is not None:
+
+            # ... stop it, after a last export.
+            exporter.stop()
+
+        print(_lt(_lt(error('Operation canceled by the user!'))))
+        press_enter_to('quit', F().red(), F().white())
+
+        print()
+
+    finally:
+
+        # Close the video file.
+        if extractor is not None:
+            extractor.release()
 
-    print()
 
-    pass
+if __name__ == '__main__':
+    main()